@@ -1,10 +1,81 @@
 from django.contrib import admin
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 from .models import *
 
 admin.site.site_header = "Vendor Management System"
 admin.site.site_title = "Vendor Management System"
 admin.site.index_title = "Welcome to Vendor Management System Portal"
 
+
+# Paginator that stops counting at count_cap rows, so a changelist over millions of rows never runs an exact COUNT(*);
+# past the cap, count and num_pages are lower bounds and pages keep going for as long as they have rows
+class CappedCountPaginator(Paginator):
+    count_cap = 10000
+
+    @cached_property
+    def counted_rows(self):
+        # COUNT(*) over a LIMIT subquery reads at most count_cap + 1 rows, enough to tell whether the cap was hit
+        return self.object_list.order_by()[:self.count_cap + 1].count()
+
+    @cached_property
+    def count(self):
+        return min(self.counted_rows, self.count_cap)
+
+    @property
+    def is_capped(self):
+        return self.counted_rows > self.count_cap
+
+    # Function to tell whether a page past the counted ones has any rows
+    def page_has_rows(self, number):
+        bottom = (number - 1) * self.per_page
+        return self.object_list[bottom:bottom + 1].exists()
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.is_capped and int(number) > self.num_pages and self.page_has_rows(int(number)):
+                return int(number)
+            raise
+
+    def page(self, number):
+        if not self.is_capped:
+            return super().page(number)
+        # The last counted page is not the last page, so it is never cut short at count
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        yield from super().get_elided_page_range(number, on_each_side=on_each_side, on_ends=on_ends)
+        # Link one page past the last one shown while there are more rows
+        if self.is_capped and self.page_has_rows(max(number, self.num_pages) + 1):
+            yield max(number, self.num_pages) + 1
+
+
+# Admin options shared by the large tables: joined vendor, vendor lookup widget, capped counts and exact vendor_code search
+class LargeTableAdmin(admin.ModelAdmin):
+    list_select_related = ('vendor',)
+    autocomplete_fields = ('vendor',)
+    paginator = CappedCountPaginator
+    # Without this the changelist runs a second, unfiltered COUNT(*) next to the filtered one
+    show_full_result_count = False
+
+    # Function to match search terms exactly against indexed columns; icontains would scan the whole table
+    def indexed_search_filter(self, search_term):
+        vendor_ids = list(Vendor.objects.filter(vendor_code=search_term).values_list('pk', flat=True))
+        return Q(vendor_id__in=vendor_ids)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(self.indexed_search_filter(search_term)), False
+
+
 # Register Vendor model
 @admin.register(Vendor)
 class VendorAdmin(admin.ModelAdmin):
@@ -13,14 +84,20 @@ class VendorAdmin(admin.ModelAdmin):
 
 # Register PurchaseOrder model
 @admin.register(PurchaseOrder)
-class PurchaseOrderAdmin(admin.ModelAdmin):
+class PurchaseOrderAdmin(LargeTableAdmin):
     list_display = ('po_number', 'vendor', 'order_date', 'delivery_date', 'status')
-    search_fields = ('po_number', 'vendor__name')
+    # Exact matches on the unique po_number and vendor_code indexes
+    search_fields = ('=po_number', '=vendor__vendor_code')
+    search_help_text = "Exact PO number or vendor code."
     list_filter = ('status', 'order_date')
 
+    def indexed_search_filter(self, search_term):
+        return Q(po_number=search_term) | super().indexed_search_filter(search_term)
+
 # Register VendorPerformanceMetrics model
 @admin.register(VendorPerformanceMetrics)
-class VendorPerformanceMetricsAdmin(admin.ModelAdmin):
-    list_display = ('vendor', 'date', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
-    search_fields = ('vendor__name',)
-    list_filter = ('date',)
+class VendorPerformanceMetricsAdmin(LargeTableAdmin):
+    list_display = ('vendor', 'date', 'granularity', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+    search_fields = ('=vendor__vendor_code',)
+    search_help_text = "Exact vendor code."
+    list_filter = ('granularity', 'date')
@@ -0,0 +1,142 @@
+import numpy as np
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import connections
+from django.utils import timezone
+from .models import PurchaseOrder
+
+
+# Purchase order columns pulled for the fleet analytics, in values_list order
+ANALYTICS_COLUMNS = ('vendor_id', 'status', 'order_date', 'delivery_date', 'quality_rating', 'issue_date', 'acknowledgment_date')
+# Percentiles of the response time distributions and edges of the quality rating histogram
+RESPONSE_TIME_PERCENTILES = (50, 90, 95, 99)
+QUALITY_RATING_BINS = (0, 1, 2, 3, 4, 5)
+
+
+# Start of the Unix epoch, naive (UTC) and aware, for converting datetimes to microsecond counts
+EPOCH = datetime(1970, 1, 1)
+AWARE_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+NAT = np.iinfo(np.int64).min
+
+
+# Function to turn UTC datetimes (naive or aware) into a datetime64[us] array, with NaT for missing values
+def datetime_array(values):
+    first = next((value for value in values if value is not None), None)
+    epoch = AWARE_EPOCH if first is not None and first.tzinfo is not None else EPOCH
+    # Integer microseconds since the epoch are much cheaper for NumPy to take than datetime objects
+    return np.array([NAT if value is None else (value - epoch) // MICROSECOND for value in values], dtype=np.int64).view('datetime64[us]')
+
+# Function to run a values_list queryset and return its rows without the ORM's per-value converters
+def fetch_rows(queryset):
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+# Function to load the purchase order columns needed by the analytics into NumPy arrays with a single query
+def load_purchase_order_columns(queryset=None):
+    queryset = PurchaseOrder.objects.all() if queryset is None else queryset
+    # Ordered like the per-vendor helpers read their rows, so sums accumulate in the same order
+    rows = fetch_rows(queryset.order_by('vendor_id', 'id').values_list(*ANALYTICS_COLUMNS))
+    columns = list(zip(*rows)) if rows else [()] * len(ANALYTICS_COLUMNS)
+    vendor_id, status, order_date, delivery_date, quality_rating, issue_date, acknowledgment_date = columns
+    return {
+        'vendor_id': np.array(vendor_id, dtype=np.int64),
+        'completed': np.array(status, dtype=object) == 'completed',
+        'order_date': datetime_array(order_date),
+        'delivery_date': datetime_array(delivery_date),
+        'quality_rating': np.array(quality_rating, dtype=np.float64),
+        'issue_date': datetime_array(issue_date),
+        'acknowledgment_date': datetime_array(acknowledgment_date),
+    }
+
+# Function to pick the nearest-rank percentiles of every group at once; values must be sorted within each group
+def grouped_percentiles(counts, sorted_values, percentiles):
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = {}
+    for p in percentiles:
+        ranks = np.maximum(np.ceil(p / 100 * counts).astype(np.int64) - 1, 0)
+        picked = sorted_values[np.minimum(starts + ranks, max(len(sorted_values) - 1, 0))] if len(sorted_values) else np.zeros(len(counts))
+        result[p] = np.where(counts > 0, picked, np.nan)
+    return result
+
+# Function to convert a float array into a list of Python floats rounded like the utils helpers (None for NaN)
+def rounded(values, digits=2):
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+# Function to compute per-vendor metrics and fleet-wide distributions from the loaded columns
+def fleet_analytics(columns, now=None):
+    now = datetime_array([now or timezone.now()])[0]
+    vendors, group = np.unique(columns['vendor_id'], return_inverse=True)
+    size = len(vendors)
+
+    def count(mask):
+        return np.bincount(group[mask], minlength=size)
+
+    completed = columns['completed']
+    rated = completed & ~np.isnan(columns['quality_rating'])
+    acknowledged = completed & ~np.isnat(columns['acknowledgment_date'])
+    on_time = completed & (columns['delivery_date'] <= now)
+    # Hours between issue and acknowledgment, computed like timedelta.total_seconds() / 3600
+    response_hours = (columns['acknowledgment_date'][acknowledged] - columns['issue_date'][acknowledged]).astype(np.int64) / 10**6 / 3600
+
+    total_pos = np.bincount(group, minlength=size)
+    completed_pos = count(completed)
+    rated_pos = count(rated)
+    acknowledged_pos = count(acknowledged)
+    on_time_pos = count(on_time)
+    # bincount adds the weights one by one in row order, matching the helpers' sums
+    quality_rating_sum = np.bincount(group[rated], weights=columns['quality_rating'][rated], minlength=size)
+    response_time_sum = np.bincount(group[acknowledged], weights=response_hours, minlength=size)
+    fulfilled_pos = count(completed & ~rated)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {
+            'on_time_delivery_rate': np.where(completed_pos > 0, on_time_pos / completed_pos * 100, 0),
+            'quality_rating_avg': np.where(rated_pos > 0, quality_rating_sum / rated_pos, 0),
+            'average_response_time': np.where(acknowledged_pos > 0, response_time_sum / acknowledged_pos, 0),
+            'fulfillment_rate': np.where(total_pos > 0, fulfilled_pos / total_pos * 100, 0),
+        }
+
+    # Response time percentiles per vendor: sort by (vendor, hours) once and index into each group
+    acknowledged_group = group[acknowledged]
+    order = np.lexsort((response_hours, acknowledged_group))
+    vendor_percentiles = grouped_percentiles(acknowledged_pos, response_hours[order], RESPONSE_TIME_PERCENTILES)
+    fleet_percentiles = grouped_percentiles(np.array([len(response_hours)]), np.sort(response_hours), RESPONSE_TIME_PERCENTILES)
+
+    histogram, edges = np.histogram(columns['quality_rating'][rated], bins=QUALITY_RATING_BINS)
+
+    # On-time rate of completed purchase orders by the month they were ordered in
+    months = columns['order_date'][completed].astype('datetime64[M]')
+    month_values, month_group = np.unique(months, return_inverse=True)
+    month_completed = np.bincount(month_group, minlength=len(month_values))
+    month_on_time = np.bincount(month_group[on_time[completed]], minlength=len(month_values))
+
+    return {
+        'purchase_orders': int(len(group)),
+        'vendors': [
+            {
+                'vendor': int(vendor_id),
+                'total_pos': int(total_pos[i]),
+                **{field: round(float(values[i]), 2) for field, values in metrics.items()},
+                **{f'response_time_p{p}': rounded(vendor_percentiles[p][i:i + 1])[0] for p in RESPONSE_TIME_PERCENTILES},
+            }
+            for i, vendor_id in enumerate(vendors)
+        ],
+        'response_time_hours': {f'p{p}': rounded(fleet_percentiles[p])[0] for p in RESPONSE_TIME_PERCENTILES},
+        'quality_rating_histogram': [
+            {'from': int(edges[i]), 'to': int(edges[i + 1]), 'count': int(histogram[i])} for i in range(len(histogram))
+        ],
+        'on_time_rate_by_month': [
+            {
+                'month': str(month),
+                'completed': int(month_completed[i]),
+                'on_time_delivery_rate': round(float(month_on_time[i] / month_completed[i] * 100), 2),
+            }
+            for i, month in enumerate(month_values)
+        ],
+    }
+
+# Function to build the fleet report for the purchase orders of a queryset (all by default)
+def fleet_report(queryset=None, now=None):
+    return fleet_analytics(load_purchase_order_columns(queryset), now)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class VendorManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vendor_management'
+
+    def ready(self):
+        # Connect the metric signal handlers even when no URLconf has been loaded (shell, management commands)
+        from . import authentication, changes, line_items, signals, sqlite, views  # noqa: F401
@@ -0,0 +1,144 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+# Bounded in-process LRU of token key -> (expires_at, generation, (user, token))
+_local_tokens = OrderedDict()
+_local_tokens_lock = threading.Lock()
+
+
+# Function to return the shared cache tier for tokens, or None when only the in-process cache is used
+def token_shared_cache():
+    alias = getattr(settings, 'TOKEN_AUTH_SHARED_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+# Function to build the shared cache key of a token
+def token_cache_key(key):
+    return f'auth-token:{key}'
+
+# Function to build the shared cache key of a token's generation, bumped by every invalidation
+def token_generation_key(key):
+    return f'auth-token-generation:{key}'
+
+# Function to copy a cached (user, token) pair, so concurrent requests never share (and mutate) the same instances
+def copy_credentials(credentials):
+    user = copy.copy(credentials[0])
+    token = copy.copy(credentials[1])
+    token.user = user
+    return user, token
+
+# Function to read an authenticated (user, token) pair from the in-process cache, then the shared cache; returns it
+# (None on a miss) with the token's current generation, which a pair looked up after a miss must be cached under.
+# With a shared cache, cached pairs are only trusted while their generation is the current one, so an invalidation
+# in any process applies to all of them at once
+def get_cached_token(key):
+    now = time.monotonic()
+    with _local_tokens_lock:
+        entry = _local_tokens.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _local_tokens.move_to_end(key)
+            else:
+                del _local_tokens[key]
+                entry = None
+    shared = token_shared_cache()
+    if shared is None:
+        return (copy_credentials(entry[2]) if entry is not None else None), 0
+
+    if entry is not None:
+        generation = shared.get(token_generation_key(key), 0)
+        if entry[1] == generation:
+            return copy_credentials(entry[2]), generation
+        with _local_tokens_lock:
+            if _local_tokens.get(key) is entry:
+                del _local_tokens[key]
+        return None, generation
+
+    values = shared.get_many([token_cache_key(key), token_generation_key(key)])
+    generation = values.get(token_generation_key(key), 0)
+    cached = values.get(token_cache_key(key))
+    if cached is not None and cached[0] == generation:
+        remember_token_locally(key, generation, cached[1])
+        return copy_credentials(cached[1]), generation
+    return None, generation
+
+# Function to store an authenticated (user, token) pair in the in-process LRU, evicting the least recently used
+def remember_token_locally(key, generation, credentials):
+    timeout = getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 60)
+    size = getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+    with _local_tokens_lock:
+        _local_tokens[key] = (time.monotonic() + timeout, generation, credentials)
+        _local_tokens.move_to_end(key)
+        while len(_local_tokens) > size:
+            _local_tokens.popitem(last=False)
+
+# Function to store a copy of an authenticated (user, token) pair in both cache tiers, under the generation
+# read before the pair was looked up (an invalidation meanwhile makes the stored pair stale at once)
+def set_cached_token(key, credentials, generation=0):
+    credentials = copy_credentials(credentials)
+    remember_token_locally(key, generation, credentials)
+    shared = token_shared_cache()
+    if shared is not None:
+        shared.set(token_cache_key(key), (generation, credentials), timeout=getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 60))
+
+# Function to drop tokens from both cache tiers and bump their generations, which makes the copies other
+# processes hold in memory stale too
+def invalidate_tokens(*keys):
+    with _local_tokens_lock:
+        for key in keys:
+            _local_tokens.pop(key, None)
+    shared = token_shared_cache()
+    if shared is None or not keys:
+        return
+    shared.delete_many([token_cache_key(key) for key in keys])
+    # The markers only have to outlive the entries cached before them, which expire within the timeout
+    timeout = getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 60)
+    for key in keys:
+        shared.add(token_generation_key(key), 0, timeout=timeout)
+        try:
+            shared.incr(token_generation_key(key))
+        except ValueError:
+            # The marker expired between add() and incr()
+            shared.set(token_generation_key(key), 1, timeout=timeout)
+
+# Function to empty the in-process token cache (used by tests)
+def clear_local_token_cache():
+    with _local_tokens_lock:
+        _local_tokens.clear()
+
+
+# Token authentication answering repeated lookups of the same key from cache instead of the database
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        credentials, generation = get_cached_token(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            set_cached_token(key, credentials, generation)
+        return credentials
+
+
+# Signal handler to forget a deleted token (also runs for tokens removed with their user). Both handlers invalidate
+# once the transaction commits: a request authenticating before that still reads the old rows and would cache them again
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_tokens, instance.key))
+
+# Signal handler to forget a user's tokens whenever the user changes, so deactivation and permission changes apply at once
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    # The keys are read now, while the tokens of a user being deleted still exist
+    keys = list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+    transaction.on_commit(partial(invalidate_tokens, *keys))
@@ -0,0 +1,341 @@
+import itertools
+import json
+import os
+import random
+import re
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import timedelta
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from .middleware import percentile
+from .changes import record_changes
+from .line_items import create_line_items
+from .models import PurchaseOrder, Vendor
+from .sqlite import lock_retry_stats, run_with_lock_retry, sqlite_pragmas
+from .utils import VENDOR_METRIC_FIELDS
+
+
+# Function to bulk insert a synthetic dataset with realistic skew; yields progress after every batch
+def seed_synthetic_data(vendors, purchase_orders, seed=None, batch_size=5000, prefix='SYN'):
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:6]
+    now = timezone.now()
+
+    created_vendors = []
+    for start in range(0, vendors, batch_size):
+        batch = [
+            Vendor(
+                name=f'{prefix} Vendor {start + i}',
+                contact_details=f'vendor{start + i}@example.com',
+                address=f'{rng.randint(1, 999)} Synthetic Street',
+                vendor_code=f'{prefix}-{run}-{start + i}',
+            )
+            for i in range(min(batch_size, vendors - start))
+        ]
+        with transaction.atomic():
+            created_vendors.extend(Vendor.objects.bulk_create(batch))
+            record_changes('vendor', [vendor.pk for vendor in batch], 'create')
+        yield 'vendors', len(created_vendors)
+
+    # A few large vendors and a long tail of small ones (Zipf-like weights)
+    vendor_ids = [vendor.pk for vendor in created_vendors]
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(vendor_ids))]
+    created = 0
+    while created < purchase_orders:
+        count = min(batch_size, purchase_orders - created)
+        batch = []
+        for vendor_id, i in zip(rng.choices(vendor_ids, weights=weights, k=count), range(created, created + count)):
+            issue_date = now - timedelta(days=rng.uniform(0, 730))
+            status = rng.choices(['completed', 'pending', 'canceled'], weights=[70, 20, 10])[0]
+            acknowledged = status == 'completed' and rng.random() < 0.9 or status == 'pending' and rng.random() < 0.4
+            batch.append(PurchaseOrder(
+                po_number=f'{prefix}-{run}-PO-{i}',
+                vendor_id=vendor_id,
+                order_date=issue_date,
+                delivery_date=issue_date + timedelta(days=rng.uniform(2, 30)),
+                items=[{'name': f'SKU-{rng.randint(1, 5000)}', 'quantity': rng.randint(1, 20)} for _ in range(rng.randint(1, 4))],
+                quantity=rng.randint(1, 500),
+                status=status,
+                quality_rating=round(min(max(rng.gauss(4, 0.7), 0), 5), 1) if status == 'completed' and rng.random() < 0.8 else None,
+                issue_date=issue_date,
+                # Response times are log-normally distributed around a few hours
+                acknowledgment_date=issue_date + timedelta(hours=rng.lognormvariate(1.5, 1)) if acknowledged else None,
+            ))
+        with transaction.atomic():
+            PurchaseOrder.objects.bulk_create(batch)
+            create_line_items(batch)
+            record_changes('purchase_order', [purchase_order.pk for purchase_order in batch], 'create')
+        created += count
+        yield 'purchase_orders', created
+
+
+# Function to build a request for every endpoint in vendor_management/urls.py from the data in the database
+def benchmark_scenarios():
+    vendor_ids = list(Vendor.objects.order_by('?').values_list('pk', flat=True)[:100])
+    purchase_order_ids = list(PurchaseOrder.objects.order_by('?').values_list('pk', flat=True)[:100])
+    if not vendor_ids or not purchase_order_ids:
+        raise ValueError("The database needs vendors and purchase orders; run seed_synthetic_data first.")
+    counter = itertools.count()
+    run = uuid.uuid4().hex[:6]
+    rng = random.Random()
+    now = timezone.now().isoformat()
+
+    def purchase_order_payload(vendor_id):
+        return {
+            'po_number': f'BENCH-{run}-{next(counter)}', 'vendor': vendor_id, 'order_date': now, 'delivery_date': now,
+            'items': [{'name': 'SKU-1', 'quantity': 1}], 'quantity': 1, 'status': 'pending', 'issue_date': now,
+        }
+
+    def vendor_payload():
+        return {'name': 'Bench Vendor', 'contact_details': 'bench@example.com', 'address': 'Bench Street', 'vendor_code': f'BENCH-{run}-{next(counter)}'}
+
+    # Each scenario returns (method, path, json body); writes create their own rows so reads stay comparable
+    return {
+        'vendor-list-create': lambda: ('get', reverse('vendor-list-create'), None),
+        'vendor-list-create:post': lambda: ('post', reverse('vendor-list-create'), vendor_payload()),
+        'vendor-retrieve-update-destroy': lambda: ('get', reverse('vendor-retrieve-update-destroy', args=[rng.choice(vendor_ids)]), None),
+        'vendor-export': lambda: ('get', reverse('vendor-export'), None),
+        'vendor-leaderboard': lambda: ('get', reverse('vendor-leaderboard') + f'?metric={rng.choice(VENDOR_METRIC_FIELDS)}&min_pos=5', None),
+        'vendor-performance': lambda: ('get', reverse('vendor-performance', args=[rng.choice(vendor_ids)]), None),
+        'vendor-performance-history': lambda: ('get', reverse('vendor-performance-history', args=[rng.choice(vendor_ids)]), None),
+        'vendor-performance-cache-stats': lambda: ('get', reverse('vendor-performance-cache-stats'), None),
+        'vendor-metrics-queue-stats': lambda: ('get', reverse('vendor-metrics-queue-stats'), None),
+        'purchase-order-list-create': lambda: ('get', reverse('purchase-order-list-create') + f'?vendor={rng.choice(vendor_ids)}', None),
+        'purchase-order-list-create:post': lambda: ('post', reverse('purchase-order-list-create'), purchase_order_payload(rng.choice(vendor_ids))),
+        'purchase-order-bulk-ingest': lambda: ('post', reverse('purchase-order-bulk-ingest'), [purchase_order_payload(rng.choice(vendor_ids)) for _ in range(50)]),
+        'purchase-order-export': lambda: ('get', reverse('purchase-order-export') + f'?vendor={rng.choice(vendor_ids)}', None),
+        'purchase-order-retrieve-update-destroy': lambda: ('get', reverse('purchase-order-retrieve-update-destroy', args=[rng.choice(purchase_order_ids)]), None),
+        'purchase-order-acknowledge': lambda: ('post', reverse('purchase-order-acknowledge', args=[rng.choice(purchase_order_ids)]), None),
+        'purchase-order-batch-acknowledge': lambda: ('post', reverse('purchase-order-batch-acknowledge'), {'ids': rng.sample(purchase_order_ids, min(20, len(purchase_order_ids)))}),
+        'fleet-analytics': lambda: ('get', reverse('fleet-analytics'), None),
+        'line-item-summary': lambda: ('get', reverse('line-item-summary') + f'?sku=SKU-{rng.randint(1, 5000)}&group_by=vendor', None),
+        'line-item-trend': lambda: ('get', reverse('line-item-trend') + f'?sku=SKU-{rng.randint(1, 5000)}', None),
+        'change-feed': lambda: ('get', reverse('change-feed'), None),
+        'request-stats': lambda: ('get', reverse('request-stats'), None),
+    }
+
+
+# Client sending benchmark requests in-process through the Django handler, or over HTTP to base_url
+class BenchmarkClient:
+    def __init__(self, token, base_url=None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        if self.base_url:
+            import requests
+
+            self.session = requests.Session()
+            self.session.headers['Authorization'] = f'Token {token}'
+        else:
+            self.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def send(self, method, path, body):
+        if self.base_url:
+            response = self.session.request(method, self.base_url + path, json=body)
+            return response.status_code, response.headers.get('Server-Timing', '')
+        response = getattr(self.client, method)(path, data=json.dumps(body) if body is not None else None, content_type='application/json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, response.get('Server-Timing', '')
+
+
+# Function to run every scenario with concurrent clients and report throughput, latency, queries and peak RSS
+def run_benchmark(token, requests_per_endpoint=100, concurrency=4, base_url=None, endpoints=None):
+    scenarios = benchmark_scenarios()
+    if endpoints:
+        scenarios = {name: build for name, build in scenarios.items() if name in endpoints}
+
+    def client_loop(build, count, samples, failures):
+        client = BenchmarkClient(token, base_url)
+        try:
+            for _ in range(count):
+                method, path, body = build()
+                started = time.perf_counter()
+                try:
+                    status_code, timing = client.send(method, path, body)
+                except Exception as e:
+                    # An exception escaping the handler (e.g. a locked database) counts as a failed request
+                    status_code, timing = 599, ''
+                    failures.append(f'{type(e).__name__}: {e}')
+                queries = re.search(r'desc="(\d+) queries"', timing)
+                samples.append(((time.perf_counter() - started) * 1000, status_code, int(queries.group(1)) if queries else None))
+        finally:
+            if concurrency > 1:
+                # Each client thread opened its own database connections
+                connections.close_all()
+
+    results = {}
+    for name, build in scenarios.items():
+        samples = []
+        failures = []
+        started = time.perf_counter()
+        if concurrency > 1:
+            counts = [requests_per_endpoint // concurrency + (i < requests_per_endpoint % concurrency) for i in range(concurrency)]
+            threads = [threading.Thread(target=client_loop, args=(build, count, samples, failures)) for count in counts if count]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            client_loop(build, requests_per_endpoint, samples, failures)
+        wall = time.perf_counter() - started
+
+        latencies = [sample[0] for sample in samples]
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        results[name] = {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample[1] >= 400),
+            'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                **{f'p{p}': round(percentile(latencies, p), 3) if latencies else None for p in (50, 95, 99)},
+            },
+            'queries': {'p50': percentile(queries, 50), 'max': max(queries)} if queries else None,
+        }
+        if failures:
+            results[name]['exceptions'] = sorted(set(failures))
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'started_at': timezone.now().isoformat(),
+        'config': {'requests_per_endpoint': requests_per_endpoint, 'concurrency': concurrency, 'base_url': base_url},
+        'dataset': {'vendors': Vendor.objects.count(), 'purchase_orders': PurchaseOrder.objects.count()},
+        'endpoints': results,
+        'peak_rss_bytes': peak_rss if sys.platform == 'darwin' else peak_rss * 1024,
+    }
+
+
+# Function to build the connection settings of the SQLite benchmark profiles: SQLite's defaults and the configured profile
+def sqlite_benchmark_profiles():
+    configured = settings.DATABASES['default']
+    return {
+        # Rollback journal, full fsync, the 5s default busy timeout, a new connection per request and no retries
+        'defaults': {'PRAGMAS': {'journal_mode': 'delete', 'synchronous': 'full'}, 'CONN_MAX_AGE': 0, 'OPTIONS': {}, 'retry': False},
+        'tuned': {
+            'PRAGMAS': sqlite_pragmas(configured),
+            'CONN_MAX_AGE': configured.get('CONN_MAX_AGE', 0),
+            'OPTIONS': configured.get('OPTIONS', {}),
+            'retry': True,
+        },
+    }
+
+# Function to run concurrent readers and read-modify-write writers against a copy of the database under each profile
+def run_sqlite_benchmark(readers=4, writers=4, seconds=5.0, purchase_orders=2000, seed=None):
+    source = connections['default']
+    if source.vendor != 'sqlite' or source.is_in_memory_db():
+        raise ValueError("The SQLite benchmark needs the default database to be an SQLite file.")
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, profile in sqlite_benchmark_profiles().items():
+            alias = f'sqlite_benchmark_{name}'
+            path = os.path.join(directory, f'{name}.sqlite3')
+            # Copy the schema and data with the online backup API, then start from a rollback journal like a fresh file
+            source.ensure_connection()
+            with closing(sqlite3.connect(path)) as copy:
+                source.connection.backup(copy)
+                copy.execute('PRAGMA journal_mode = delete')
+            connections.settings[alias] = {
+                **connections.settings['default'], 'NAME': path,
+                'PRAGMAS': profile['PRAGMAS'], 'CONN_MAX_AGE': profile['CONN_MAX_AGE'], 'OPTIONS': profile['OPTIONS'],
+            }
+            try:
+                results[name] = run_sqlite_workload(alias, profile, readers, writers, seconds, purchase_orders, rng.getrandbits(32))
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+
+    defaults, tuned = results['defaults'], results['tuned']
+    return {
+        'config': {'readers': readers, 'writers': writers, 'seconds': seconds, 'purchase_orders': purchase_orders},
+        'profiles': results,
+        'speedup': {
+            kind: round(tuned[f'{kind}_per_second'] / defaults[f'{kind}_per_second'], 2) if defaults[f'{kind}_per_second'] else None
+            for kind in ('reads', 'writes')
+        },
+    }
+
+# Function to drive one database alias with reader and writer threads for a fixed time and summarise what they did
+def run_sqlite_workload(alias, profile, readers, writers, seconds, purchase_orders, seed):
+    now = timezone.now()
+    # bulk_create sends no signals, so nothing is written to the default database's change log
+    vendor = Vendor.objects.using(alias).bulk_create([
+        Vendor(name='SQLite Bench Vendor', contact_details='bench@example.com', address='Bench Street', vendor_code=f'SQLITE-{uuid.uuid4().hex[:8]}')
+    ])[0]
+    PurchaseOrder.objects.using(alias).bulk_create([
+        PurchaseOrder(
+            po_number=f'SQLITE-{vendor.pk}-{i}', vendor=vendor, order_date=now, delivery_date=now, items=[], quantity=1, issue_date=now,
+        )
+        for i in range(purchase_orders)
+    ])
+    purchase_order_ids = list(PurchaseOrder.objects.using(alias).filter(vendor=vendor).values_list('pk', flat=True))
+    connections[alias].close()
+    retries_before = lock_retry_stats()['retries']
+
+    def read(rng):
+        start = rng.choice(purchase_order_ids)
+        list(PurchaseOrder.objects.using(alias).filter(vendor=vendor, pk__gte=start).order_by('pk').values('pk', 'status', 'quantity')[:50])
+
+    def write(rng):
+        pk = rng.choice(purchase_order_ids)
+
+        # Read, then write in the same transaction: the pattern that needs the read lock upgraded to a write lock
+        def transition():
+            with transaction.atomic(using=alias):
+                quantity = PurchaseOrder.objects.using(alias).filter(pk=pk).values_list('quantity', flat=True).get()
+                PurchaseOrder.objects.using(alias).filter(pk=pk).update(quantity=quantity % 500 + 1)
+
+        if profile['retry']:
+            run_with_lock_retry(transition, alias)
+        else:
+            transition()
+
+    deadline = time.perf_counter() + seconds
+    samples = {'reads': [], 'writes': []}
+    failures = []
+
+    def worker(kind, operation, seed):
+        rng = random.Random(seed)
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation(rng)
+                    samples[kind].append((time.perf_counter() - started) * 1000)
+                except OperationalError as e:
+                    failures.append(f'{kind}: {e}')
+                if not profile['CONN_MAX_AGE']:
+                    # What the end of every request does when connections are not persistent
+                    connections[alias].close()
+        finally:
+            connections[alias].close()
+
+    seeds = random.Random(seed)
+    threads = [threading.Thread(target=worker, args=('reads', read, seeds.getrandbits(32))) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=('writes', write, seeds.getrandbits(32))) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'reads': len(samples['reads']),
+        'writes': len(samples['writes']),
+        'reads_per_second': round(len(samples['reads']) / seconds, 1),
+        'writes_per_second': round(len(samples['writes']) / seconds, 1),
+        'read_p95_ms': round(percentile(samples['reads'], 95), 3) if samples['reads'] else None,
+        'write_p95_ms': round(percentile(samples['writes'], 95), 3) if samples['writes'] else None,
+        'errors': len(failures),
+        'error_messages': sorted(set(failures)),
+        'lock_retries': lock_retry_stats()['retries'] - retries_before,
+    }
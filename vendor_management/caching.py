@@ -0,0 +1,85 @@
+import hashlib
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+# Function to return the cache backend holding vendor performance results
+def performance_cache():
+    return caches[getattr(settings, 'VENDOR_PERFORMANCE_CACHE_ALIAS', 'default')]
+
+# Function to build the cache key of a vendor's performance result (all time, or over a rolling window of days)
+def performance_cache_key(vendor_id, window=None):
+    return f'vendor-performance:{vendor_id}' if window is None else f'vendor-performance:{vendor_id}:{window}d'
+
+# Function to add to a counter kept in the cache, so every process sharing the cache sees the same total
+def increment_counter(key, amount=1):
+    cache = performance_cache()
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # First increment (or the counter was evicted); add() keeps a concurrent first increment from being lost
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+# Function to count a cache hit or miss
+def record_cache_event(event):
+    increment_counter(f'vendor-performance-stats:{event}')
+
+# Function to read a vendor's cached performance result (None on a miss)
+def get_cached_performance(vendor_id, window=None):
+    data = performance_cache().get(performance_cache_key(vendor_id, window))
+    record_cache_event('hits' if data is not None else 'misses')
+    return data
+
+# Function to cache a vendor's performance result
+def set_cached_performance(vendor_id, data, window=None):
+    timeout = getattr(settings, 'VENDOR_PERFORMANCE_CACHE_TIMEOUT', 300)
+    performance_cache().set(performance_cache_key(vendor_id, window), data, timeout=timeout)
+
+# Function to drop the cached performance results of the given vendors, including every rolling window, once the
+# current transaction commits (at once outside one): dropped earlier, a concurrent read could cache the old metrics again
+def invalidate_vendor_performance(*vendor_ids):
+    windows = [None, *getattr(settings, 'VENDOR_PERFORMANCE_WINDOWS', (30, 90, 365))]
+    keys = [performance_cache_key(vendor_id, window) for vendor_id in set(vendor_ids) for window in windows]
+    if keys:
+        transaction.on_commit(lambda: performance_cache().delete_many(keys))
+
+# Function to build the cache key of a leaderboard
+def leaderboard_cache_key(metric, limit, min_pos):
+    return f'vendor-leaderboard:{metric}:{limit}:{min_pos}'
+
+# Function to read a cached leaderboard (None on a miss)
+def get_cached_leaderboard(metric, limit, min_pos):
+    return performance_cache().get(leaderboard_cache_key(metric, limit, min_pos))
+
+# Function to cache a leaderboard; it is not invalidated on writes, so it may be up to the timeout old
+def set_cached_leaderboard(metric, limit, min_pos, data):
+    timeout = getattr(settings, 'VENDOR_LEADERBOARD_CACHE_TIMEOUT', 30)
+    performance_cache().set(leaderboard_cache_key(metric, limit, min_pos), data, timeout=timeout)
+
+# Function to build the cache key of a fleet report from its filter parameters, given as (name, values) pairs
+def fleet_report_cache_key(params):
+    digest = hashlib.sha1(urlencode(sorted(params), doseq=True).encode()).hexdigest()
+    return f'fleet-report:{digest}'
+
+# Function to read a cached fleet report (None on a miss)
+def get_cached_fleet_report(params):
+    return performance_cache().get(fleet_report_cache_key(params))
+
+# Function to cache a fleet report; like the leaderboard it is not invalidated on writes, so it may be up to the timeout old
+def set_cached_fleet_report(params, data):
+    timeout = getattr(settings, 'FLEET_REPORT_CACHE_TIMEOUT', 60)
+    performance_cache().set(fleet_report_cache_key(params), data, timeout=timeout)
+
+# Function to report the hit/miss counters of the performance cache
+def performance_cache_stats():
+    counters = performance_cache().get_many(['vendor-performance-stats:hits', 'vendor-performance-stats:misses'])
+    hits = counters.get('vendor-performance-stats:hits', 0)
+    misses = counters.get('vendor-performance-stats:misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
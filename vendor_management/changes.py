@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Max, Min
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import ChangeLogEntry, PurchaseOrder, Vendor
+
+
+# Change log object type of each tracked model
+CHANGE_LOG_OBJECT_TYPES = {
+    PurchaseOrder: 'purchase_order',
+    Vendor: 'vendor',
+}
+
+
+# Function to append one change log entry per object id with a single insert
+def record_changes(object_type, object_ids, action, now=None):
+    now = now or timezone.now()
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(object_type=object_type, object_id=object_id, action=action, changed_at=now)
+        for object_id in object_ids
+    ])
+
+# Function to read a page of changes after the given cursor; returns (entries, has_more)
+def read_changes(since, limit, object_type=None):
+    entries = ChangeLogEntry.objects.filter(id__gt=since).order_by('id')
+    if object_type:
+        entries = entries.filter(object_type=object_type)
+    entries = list(entries[:limit + 1])
+    return entries[:limit], len(entries) > limit
+
+# Function to return the cursor just before the oldest retained entry and the newest cursor (both 0 for an empty log)
+def change_log_bounds():
+    bounds = ChangeLogEntry.objects.aggregate(oldest=Min('id'), latest=Max('id'))
+    if bounds['oldest'] is None:
+        return 0, 0
+    return bounds['oldest'] - 1, bounds['latest']
+
+# Function to delete change log entries older than the retention window in batches; returns the number deleted
+def prune_change_log(days=None, batch_size=10000):
+    days = days if days is not None else getattr(settings, 'CHANGE_LOG_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    # The newest entry is always kept, so the oldest retained id still tells which cursors were pruned past
+    latest = change_log_bounds()[1]
+    removed = 0
+    while True:
+        ids = list(
+            ChangeLogEntry.objects.filter(changed_at__lt=cutoff, id__lt=latest).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        removed += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
+
+
+# Signal handler to log creates and updates made through save()
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Vendor)
+def log_saved_object(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record_changes(CHANGE_LOG_OBJECT_TYPES[sender], [instance.pk], 'create' if created else 'update')
+
+# Signal handler to log deletes, including purchase orders removed with their vendor
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Vendor)
+def log_deleted_object(sender, instance, **kwargs):
+    record_changes(CHANGE_LOG_OBJECT_TYPES[sender], [instance.pk], 'delete')
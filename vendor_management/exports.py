@@ -0,0 +1,72 @@
+import csv
+import json
+from datetime import date
+
+
+# Columns of each export, in output order; purchase order columns match what the bulk ingest endpoint reads back
+PURCHASE_ORDER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('po_number', 'po_number'),
+    ('vendor', 'vendor_id'),
+    ('order_date', 'order_date'),
+    ('delivery_date', 'delivery_date'),
+    ('items', 'items'),
+    ('quantity', 'quantity'),
+    ('status', 'status'),
+    ('quality_rating', 'quality_rating'),
+    ('issue_date', 'issue_date'),
+    ('acknowledgment_date', 'acknowledgment_date'),
+]
+VENDOR_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('contact_details', 'contact_details'),
+    ('address', 'address'),
+    ('vendor_code', 'vendor_code'),
+    ('on_time_delivery_rate', 'on_time_delivery_rate'),
+    ('quality_rating_avg', 'quality_rating_avg'),
+    ('average_response_time', 'average_response_time'),
+    ('fulfillment_rate', 'fulfillment_rate'),
+]
+EXPORT_OUTPUTS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Function to yield the rows of a queryset as plain tuples, fetched from the database in chunks
+def iter_export_rows(queryset, columns, chunk_size=2000):
+    # values_list skips model instantiation; iterator() keeps only one chunk in memory
+    return queryset.order_by('pk').values_list(*[lookup for name, lookup in columns]).iterator(chunk_size=chunk_size)
+
+# Function to turn a database value into something JSON and CSV can write
+def export_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+# File-like object handing back whatever the csv writer writes, so each row can be yielded as it is formatted
+class Echo:
+    def write(self, value):
+        return value
+
+# Function to encode export rows as CSV lines (header first); JSON fields are written as JSON inside their cell
+def encode_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, lookup in columns])
+    for row in rows:
+        yield writer.writerow([
+            '' if value is None else json.dumps(value) if isinstance(value, (list, dict)) else export_value(value)
+            for value in row
+        ])
+
+# Function to encode export rows as NDJSON, one object per line
+def encode_ndjson(rows, columns):
+    names = [name for name, lookup in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(export_value, row)))) + '\n'
+
+# Function to stream a queryset in the given output format ('csv' or 'ndjson')
+def stream_export(queryset, columns, output, chunk_size=2000):
+    encode = encode_csv if output == 'csv' else encode_ndjson
+    return encode(iter_export_rows(queryset, columns, chunk_size), columns)
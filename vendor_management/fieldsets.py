@@ -0,0 +1,65 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+# Function to read ?fields= or ?exclude= (comma separated) into the names to return, in the order of available;
+# None when neither is given (raises ValidationError on unknown names or when both are given)
+def requested_fields(params, available):
+    fields = params.get('fields', '').strip()
+    exclude = params.get('exclude', '').strip()
+    if fields and exclude:
+        raise serializers.ValidationError({'fields': ["Use either 'fields' or 'exclude', not both."]})
+    if not fields and not exclude:
+        return None
+    param = 'fields' if fields else 'exclude'
+    names = {name.strip() for name in (fields or exclude).split(',') if name.strip()}
+    unknown = sorted(names.difference(available))
+    if unknown:
+        raise serializers.ValidationError({param: [f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."]})
+    return [name for name in available if (name in names) == (param == 'fields')]
+
+# Function to keep only the requested keys of a serialized object (all of them when fields is None)
+def pick_fields(data, fields):
+    return data if fields is None else {name: data[name] for name in fields}
+
+# Function to map serializer field names to the model columns .only() should load; the primary key is always loaded
+def model_columns(model, fields):
+    concrete = {field.name for field in model._meta.concrete_fields}
+    return [model._meta.pk.name, *(name for name in fields if name in concrete and name != model._meta.pk.name)]
+
+
+# Serializer mixin taking a fields= keyword that limits the serialized fields to those names
+class SparseFieldsetSerializerMixin:
+    def __init__(self, *args, fields=None, **kwargs):
+        self.sparse_fields = fields
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.sparse_fields is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in self.sparse_fields}
+
+
+# View mixin applying ?fields= / ?exclude= to reads: only those fields are serialized and only their columns are selected
+class SparseFieldsetMixin:
+    def get_sparse_fields(self):
+        # Writes always load and return whole objects
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = requested_fields(self.request.query_params, list(self.get_serializer_class()().fields))
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        return queryset.only(*model_columns(queryset.model, fields))
@@ -0,0 +1,44 @@
+from rest_framework import serializers
+
+
+# Query parameters accepted for filtering purchase orders, mapped to ORM lookups
+PURCHASE_ORDER_FILTERS = {
+    'vendor': ('vendor_id', serializers.IntegerField()),
+    'status': ('status', serializers.ChoiceField(choices=['pending', 'completed', 'canceled'])),
+    'order_date_after': ('order_date__gte', serializers.DateTimeField()),
+    'order_date_before': ('order_date__lt', serializers.DateTimeField()),
+    'delivery_date_after': ('delivery_date__gte', serializers.DateTimeField()),
+    'delivery_date_before': ('delivery_date__lt', serializers.DateTimeField()),
+}
+
+# Query parameters accepted for filtering purchase order line items; sku comes first in both item indexes
+LINE_ITEM_FILTERS = {
+    'sku': ('sku', serializers.CharField(max_length=255)),
+    'vendor': ('vendor_id', serializers.IntegerField()),
+    'order_date_after': ('order_date__gte', serializers.DateTimeField()),
+    'order_date_before': ('order_date__lt', serializers.DateTimeField()),
+}
+
+# Function to apply the purchase order filters found in the query parameters (raises ValidationError on bad values)
+def filter_purchase_orders(queryset, params):
+    return apply_query_filters(queryset, params, PURCHASE_ORDER_FILTERS)
+
+# Function to apply the line item filters found in the query parameters (raises ValidationError on bad values)
+def filter_line_items(queryset, params):
+    return apply_query_filters(queryset, params, LINE_ITEM_FILTERS)
+
+# Function to validate the query parameters named in filters and apply them as ORM lookups
+def apply_query_filters(queryset, params, filters):
+    lookups = {}
+    errors = {}
+    for param, (lookup, field) in filters.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            lookups[lookup] = field.run_validation(value)
+        except serializers.ValidationError as e:
+            errors[param] = e.detail
+    if errors:
+        raise serializers.ValidationError(errors)
+    return queryset.filter(**lookups)
@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import PurchaseOrder, PurchaseOrderItem
+from .sqlite import run_with_lock_retry
+from .utils import LINE_ITEM_SOURCE_FIELDS, line_item_state, parse_line_items
+
+
+# Groupings and orderings accepted by the line item totals
+LINE_ITEM_GROUPINGS = {
+    'sku': ('sku',),
+    'vendor': ('vendor',),
+    'sku,vendor': ('sku', 'vendor'),
+}
+LINE_ITEM_ORDERINGS = ('total_quantity', 'total_value', 'lines', 'purchase_orders')
+
+
+# Function to build the line item rows of purchase orders that already have primary keys
+def build_line_items(purchase_orders):
+    return [
+        PurchaseOrderItem(
+            purchase_order_id=purchase_order.pk, vendor_id=purchase_order.vendor_id, order_date=purchase_order.order_date,
+            position=position, sku=sku, quantity=quantity, price=price,
+        )
+        for purchase_order in purchase_orders
+        for position, sku, quantity, price in parse_line_items(purchase_order.items)
+    ]
+
+# Function to insert the line items of newly created purchase orders (bulk_create sends no signals); returns the number inserted
+def create_line_items(purchase_orders, batch_size=1000):
+    return len(PurchaseOrderItem.objects.bulk_create(build_line_items(purchase_orders), batch_size=batch_size))
+
+# Function to replace the line items of purchase orders with ones built from their current items JSON; returns the number inserted
+def replace_line_items(purchase_orders, batch_size=1000):
+    PurchaseOrderItem.objects.filter(purchase_order_id__in=[purchase_order.pk for purchase_order in purchase_orders]).delete()
+    return create_line_items(purchase_orders, batch_size)
+
+# Function to rebuild the line items of all purchase orders in primary key order, one transaction per batch;
+# yields (last purchase order id, purchase orders, line items) after every batch so a run can be resumed with after=
+def backfill_line_items(batch_size=1000, after=0):
+    while True:
+        batch = list(
+            PurchaseOrder.objects.filter(pk__gt=after).order_by('pk').only('id', *LINE_ITEM_SOURCE_FIELDS)[:batch_size]
+        )
+        if not batch:
+            return
+
+        def write_batch():
+            with transaction.atomic():
+                return replace_line_items(batch, batch_size)
+
+        lines = run_with_lock_retry(write_batch)
+        after = batch[-1].pk
+        yield after, len(batch), lines
+
+# Function to compute the line item totals of a queryset grouped by SKU, vendor or both, in one grouped query
+def line_item_totals(queryset, group_by='sku', ordering='total_quantity', limit=100):
+    keys = LINE_ITEM_GROUPINGS[group_by]
+    return list(
+        queryset.order_by()
+        .values(*keys)
+        .annotate(**line_item_aggregates())
+        .order_by(F(ordering).desc(nulls_last=True), *keys)[:limit]
+    )
+
+# Function to compute the line item totals of a queryset per order date bucket, oldest first, in one grouped query
+def line_item_trend(queryset, bucket='month'):
+    return list(
+        queryset.annotate(bucket=Trunc('order_date', bucket))
+        .order_by()
+        .values('bucket')
+        .annotate(**line_item_aggregates())
+        .order_by('bucket')
+    )
+
+# Function to build the aggregate expressions shared by the line item totals and trend
+def line_item_aggregates():
+    value = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=24, decimal_places=2))
+    return {
+        'lines': Count('id'),
+        'purchase_orders': Count('purchase_order', distinct=True),
+        'total_quantity': Sum('quantity'),
+        # Lines without a price add to the quantity but not to the value
+        'total_value': Sum(value),
+        'first_order_date': Min('order_date'),
+        'last_order_date': Max('order_date'),
+    }
+
+
+# Signal handler to keep a purchase order's line items in step with its items, vendor and order date
+@receiver(post_save, sender=PurchaseOrder)
+def sync_saved_line_items(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if not created and update_fields is not None and not {'vendor', 'vendor_id', 'order_date', 'items'}.intersection(update_fields):
+        return
+    previous = None if created else getattr(instance, '_loaded_line_item_state', None)
+    current = line_item_state(instance)
+    instance._loaded_line_item_state = current
+    if previous == current:
+        return
+    if created:
+        create_line_items([instance])
+    elif previous is None or previous['items'] != current['items']:
+        # Instances built by hand, or whose items changed, rewrite their lines (the only place the items are parsed)
+        replace_line_items([instance])
+    else:
+        PurchaseOrderItem.objects.filter(purchase_order=instance).update(vendor_id=current['vendor_id'], order_date=current['order_date'])
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.metrics import advance_on_time_cutoff, on_time_cutoff
+
+
+# Command to count completed purchase orders as on time in the stored vendor metrics once their delivery date passes
+class Command(BaseCommand):
+    help = "Move the on-time cutoff of the stored vendor metrics up to now, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help="Keep advancing every this many seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError("--interval must be positive.")
+
+        while True:
+            started = time.perf_counter()
+            counted = advance_on_time_cutoff()
+            self.stdout.write(
+                f"Counted {counted} purchase order(s) as on time up to {on_time_cutoff().isoformat()} in {time.perf_counter() - started:.3f}s."
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
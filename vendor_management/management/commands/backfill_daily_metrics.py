@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.metrics import rebuild_daily_buckets
+from vendor_management.models import Vendor
+
+
+# Command to build the per-vendor daily metric buckets behind the rolling-window metrics from existing purchase orders
+class Command(BaseCommand):
+    help = "Rebuild VendorDailyMetrics for all vendors (or one) with grouped aggregate queries over their purchase orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, default=None, help="Only rebuild this vendor's buckets.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Vendors per grouped aggregate query (default 500).")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        vendors = Vendor.objects.order_by('pk')
+        if options['vendor'] is not None:
+            vendors = vendors.filter(pk=options['vendor'])
+        vendor_ids = list(vendors.values_list('pk', flat=True))
+        if options['vendor'] is not None and not vendor_ids:
+            raise CommandError(f"Vendor {options['vendor']} does not exist.")
+
+        started = time.perf_counter()
+        buckets = 0
+        for i in range(0, len(vendor_ids), options['chunk_size']):
+            buckets += rebuild_daily_buckets(vendor_ids[i:i + options['chunk_size']])
+        self.stdout.write(f"Wrote {buckets} daily bucket(s) for {len(vendor_ids)} vendor(s) in {time.perf_counter() - started:.2f}s.")
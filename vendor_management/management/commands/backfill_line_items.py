@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.line_items import backfill_line_items
+
+
+# Command to build the purchase order line item table from the items JSON of existing purchase orders
+class Command(BaseCommand):
+    help = "Rebuild PurchaseOrderItem rows from every purchase order's items JSON, in primary key order and one transaction per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Purchase orders per transaction (default 1000).")
+        parser.add_argument('--after', type=int, default=0, help="Only purchase orders with a greater id, to resume an interrupted run.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options['after'] < 0:
+            raise CommandError("--after must not be negative.")
+
+        started = time.perf_counter()
+        purchase_orders = lines = 0
+        for last_id, batch_purchase_orders, batch_lines in backfill_line_items(options['batch_size'], options['after']):
+            purchase_orders += batch_purchase_orders
+            lines += batch_lines
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Up to purchase order {last_id}: {purchase_orders} purchase order(s), {lines} line item(s).")
+        self.stdout.write(f"Wrote {lines} line item(s) for {purchase_orders} purchase order(s) in {time.perf_counter() - started:.2f}s.")
@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.benchmark import run_sqlite_benchmark
+
+
+# Command to compare concurrent read/write throughput on SQLite with its default settings and with the configured profile
+class Command(BaseCommand):
+    help = "Run concurrent readers and read-modify-write writers against copies of the SQLite database, once with SQLite's defaults and once with the configured pragmas, persistent connections and lock retries, and report both as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help="Reader threads (default 4).")
+        parser.add_argument('--writers', type=int, default=4, help="Writer threads (default 4).")
+        parser.add_argument('--seconds', type=float, default=5, help="Duration of each profile's run (default 5).")
+        parser.add_argument('--purchase-orders', type=int, default=2000, help="Purchase orders added to each copy for the workload (default 2000).")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed of the workload.")
+        parser.add_argument('--output', default=None, help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] < 1:
+            raise CommandError("--readers and --writers cannot be negative, and at least one thread is needed.")
+        if options['seconds'] <= 0 or options['purchase_orders'] < 1:
+            raise CommandError("--seconds and --purchase-orders must be positive.")
+        try:
+            report = run_sqlite_benchmark(
+                readers=options['readers'], writers=options['writers'], seconds=options['seconds'],
+                purchase_orders=options['purchase_orders'], seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(f"SQLite benchmark report written to {options['output']}.")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from vendor_management.metrics import compact_snapshot_batch, truncate_snapshot_date
+
+
+# Function to measure the database file size and the bytes held by free pages (SQLite only; None elsewhere)
+def database_space():
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA freelist_count')
+        return page_count * page_size, cursor.fetchone()[0] * page_size
+
+
+# Command to apply the retention policy of VendorPerformanceMetrics snapshots
+class Command(BaseCommand):
+    help = (
+        "Roll raw performance snapshots older than the raw retention window into daily summaries, "
+        "and daily summaries older than the daily retention window into monthly summaries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, default=getattr(settings, 'VENDOR_PERFORMANCE_RAW_RETENTION_DAYS', 30), help="Days of raw snapshots to keep.")
+        parser.add_argument('--daily-days', type=int, default=getattr(settings, 'VENDOR_PERFORMANCE_DAILY_RETENTION_DAYS', 365), help="Days of daily summaries to keep.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Snapshots compacted per transaction (default 1000).")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches; the next run continues from there.")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches to let other writers in.")
+        parser.add_argument('--vacuum', action='store_true', help="Run VACUUM afterwards so the freed space is returned to the file system.")
+
+    def handle(self, *args, **options):
+        if options['raw_days'] < 0 or options['daily_days'] < options['raw_days'] or options['batch_size'] < 1:
+            raise CommandError("Retention windows must satisfy 0 <= --raw-days <= --daily-days and --batch-size must be positive.")
+
+        now = timezone.now()
+        # Cutoffs are aligned to period starts so only complete periods get summarised
+        stages = [
+            ('raw', 'day', truncate_snapshot_date(now - timedelta(days=options['raw_days']), 'day')),
+            ('day', 'month', truncate_snapshot_date(now - timedelta(days=options['daily_days']), 'month')),
+        ]
+        free_before = database_space()
+        batches = 0
+        for source, target, cutoff in stages:
+            removed = written = 0
+            while options['max_batches'] is None or batches < options['max_batches']:
+                batch_removed, batch_written = compact_snapshot_batch(source, target, cutoff, options['batch_size'])
+                if not batch_removed:
+                    break
+                removed += batch_removed
+                written += batch_written
+                batches += 1
+                if options['pause']:
+                    time.sleep(options['pause'])
+            self.stdout.write(f"{source} -> {target}: removed {removed} row(s), wrote {written} new summary row(s) (cutoff {cutoff.isoformat()}).")
+
+        space = database_space()
+        if space is not None:
+            self.stdout.write(f"Space reclaimed: {max(space[1] - free_before[1], 0)} byte(s) of pages freed for reuse.")
+            if options['vacuum']:
+                with connection.cursor() as cursor:
+                    cursor.execute('VACUUM')
+                self.stdout.write(f"VACUUM returned {space[0] - database_space()[0]} byte(s) to the file system.")
+        elif options['vacuum']:
+            self.stderr.write("--vacuum is only supported on SQLite; rely on the database's own vacuuming elsewhere.")
+        if options['max_batches'] is not None and batches >= options['max_batches']:
+            self.stdout.write("Stopped at --max-batches; run again to continue.")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from vendor_management.exports import EXPORT_OUTPUTS, PURCHASE_ORDER_EXPORT_COLUMNS, VENDOR_EXPORT_COLUMNS, stream_export
+from vendor_management.filters import PURCHASE_ORDER_FILTERS, filter_purchase_orders
+from vendor_management.models import PurchaseOrder, Vendor
+
+
+# Command to stream purchase orders or vendors to a CSV or NDJSON file with flat memory use
+class Command(BaseCommand):
+    help = "Export purchase orders or vendors as CSV or NDJSON, reading the database in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['purchase_orders', 'vendors'], help="What to export.")
+        parser.add_argument('--output', choices=list(EXPORT_OUTPUTS), default='csv', help="Output format (default csv).")
+        parser.add_argument('--file', default=None, help="Write to this file instead of stdout.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched from the database at a time (default 2000).")
+        for param in PURCHASE_ORDER_FILTERS:
+            parser.add_argument(f"--{param.replace('_', '-')}", dest=param, default=None, help=f"Purchase orders only: the ?{param}= filter of the list endpoint.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if options['model'] == 'vendors':
+            queryset, columns = Vendor.objects.all(), VENDOR_EXPORT_COLUMNS
+        else:
+            try:
+                queryset = filter_purchase_orders(PurchaseOrder.objects.all(), options)
+            except serializers.ValidationError as e:
+                raise CommandError(e.detail)
+            columns = PURCHASE_ORDER_EXPORT_COLUMNS
+
+        out = open(options['file'], 'w', newline='', encoding='utf-8') if options['file'] else self.stdout
+        rows = -1 if options['output'] == 'csv' else 0
+        try:
+            for line in stream_export(queryset, columns, options['output'], options['chunk_size']):
+                out.write(line)
+                rows += 1
+        finally:
+            if options['file']:
+                out.close()
+        if options['file']:
+            self.stdout.write(f"Exported {rows} row(s) to {options['file']}.")
@@ -0,0 +1,61 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from vendor_management.analytics import fleet_analytics, load_purchase_order_columns
+from vendor_management.models import Vendor
+from vendor_management.utils import (
+    calculate_average_response_time, calculate_fulfillment_rate, calculate_on_time_delivery_rate, calculate_quality_rating_avg,
+)
+
+
+# Command to print the fleet analytics report, optionally benchmarking it against the per-vendor utils helpers
+class Command(BaseCommand):
+    help = "Compute per-vendor metrics and fleet-wide distributions with NumPy and print them as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--benchmark', action='store_true', help="Also run the calculate_* helpers for every vendor, check that both agree exactly and report the timings.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        started = time.perf_counter()
+        columns = load_purchase_order_columns()
+        loaded = time.perf_counter()
+        report = fleet_analytics(columns, now)
+        finished = time.perf_counter()
+
+        if options['benchmark']:
+            helpers = {
+                'on_time_delivery_rate': calculate_on_time_delivery_rate,
+                'quality_rating_avg': calculate_quality_rating_avg,
+                'average_response_time': calculate_average_response_time,
+                'fulfillment_rate': calculate_fulfillment_rate,
+            }
+            helpers_started = time.perf_counter()
+            mismatches = []
+            for row in report['vendors']:
+                vendor = Vendor(pk=row['vendor'])
+                for field, helper in helpers.items():
+                    expected = helper(vendor)
+                    if row[field] != expected:
+                        mismatches.append(f"vendor {row['vendor']} {field}: {row[field]} != {expected}")
+            helpers_elapsed = time.perf_counter() - helpers_started
+            report['benchmark'] = {
+                'purchase_orders': report['purchase_orders'],
+                'vendors': len(report['vendors']),
+                'load_seconds': round(loaded - started, 4),
+                'compute_seconds': round(finished - loaded, 4),
+                'helpers_seconds': round(helpers_elapsed, 4),
+                'speedup': round(helpers_elapsed / (finished - started), 1) if finished > started else None,
+            }
+            if mismatches:
+                raise CommandError("NumPy metrics differ from the utils helpers:\n" + '\n'.join(mismatches))
+
+        output = json.dumps(report, indent=2)
+        if options['file']:
+            with open(options['file'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(f"Fleet report written to {options['file']}.")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,63 @@
+import json
+import os
+import socket
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from vendor_management.metrics_queue import drain_vendor_metrics_queue, process_vendor_metrics_batch, vendor_metrics_queue_stats
+
+
+# Command to run the worker pool that recomputes metrics for vendors marked dirty by purchase order writes
+class Command(BaseCommand):
+    help = "Process the vendor metrics queue (VENDOR_METRICS_UPDATE_MODE = 'queue') with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Worker threads (default 1).")
+        parser.add_argument('--batch-size', type=int, default=100, help="Vendors claimed per batch (default 100).")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty (default 1).")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling forever.")
+        parser.add_argument('--stats', action='store_true', help="Print queue depth, lag and processing-time counters as JSON and exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(vendor_metrics_queue_stats()))
+            return
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be positive.")
+
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        stop = threading.Event()
+        processed = [0] * options['workers']
+
+        def work(index):
+            worker = f"{prefix}-{index}"
+            try:
+                while not stop.is_set():
+                    count = process_vendor_metrics_batch(worker, options['batch_size'])
+                    processed[index] += count
+                    if not count:
+                        if options['once']:
+                            return
+                        stop.wait(options['poll_interval'])
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        if options['workers'] == 1 and options['once']:
+            processed[0] = drain_vendor_metrics_queue(f"{prefix}-0", options['batch_size'])
+        else:
+            threads = [threading.Thread(target=work, args=(index,), daemon=True) for index in range(options['workers'])]
+            for thread in threads:
+                thread.start()
+            try:
+                while any(thread.is_alive() for thread in threads):
+                    for thread in threads:
+                        thread.join(timeout=0.5)
+            except KeyboardInterrupt:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Recomputed metrics for {sum(processed)} vendor(s) in {elapsed:.2f}s.")
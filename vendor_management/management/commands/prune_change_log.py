@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.changes import prune_change_log
+
+
+# Command to apply the retention policy of the change log behind the change feed
+class Command(BaseCommand):
+    help = "Delete change log entries older than the retention window; consumers behind it get 410 Gone and must resync."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'CHANGE_LOG_RETENTION_DAYS', 7), help="Days of changes to keep.")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Entries deleted per query (default 10000).")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days must not be negative and --batch-size must be positive.")
+        removed = prune_change_log(options['days'], options['batch_size'])
+        self.stdout.write(f"Removed {removed} change log entr{'y' if removed == 1 else 'ies'}.")
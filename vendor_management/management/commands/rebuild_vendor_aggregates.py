@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.metrics import advance_on_time_cutoff, calculate_metric_totals_by_vendor, on_time_cutoff, rebuild_vendor_aggregate
+from vendor_management.models import Vendor, VendorMetricAggregate
+from vendor_management.utils import *
+
+
+# Command to rebuild the running metric totals of every vendor from its purchase orders
+class Command(BaseCommand):
+    help = "Rebuild the per-vendor running metric totals from scratch and check them against the calculate_* helpers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, action='append', dest='vendors', help="Only rebuild this vendor id (repeatable).")
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Compare the stored totals with the purchase orders before rebuilding, and the rebuilt metrics with the calculate_* helpers; fail on mismatches.",
+        )
+
+    def handle(self, *args, **options):
+        vendors = Vendor.objects.order_by('pk')
+        if options['vendors']:
+            vendors = vendors.filter(pk__in=options['vendors'])
+        if options['check']:
+            # Count the delivery dates passed so far, so the stored totals and the helpers are on time as of the same moment
+            advance_on_time_cutoff()
+
+        rebuilt = 0
+        drifted = []
+        mismatches = []
+        for vendor in vendors.iterator():
+            if options['check']:
+                # The stored totals are checked before the rebuild replaces them, or drift would never show
+                stored = VendorMetricAggregate.objects.filter(vendor=vendor).values(*METRIC_TOTAL_FIELDS).first() or normalize_metric_totals({})
+                expected = calculate_metric_totals_by_vendor([vendor.pk], on_time_cutoff())[vendor.pk]
+                stored_metrics = Vendor.objects.filter(pk=vendor.pk).values(*VENDOR_METRIC_FIELDS).get()
+                if not metric_totals_match(stored, expected) or stored_metrics != metrics_from_totals(stored):
+                    drifted.append(vendor.pk)
+                    self.stderr.write(f"Vendor {vendor.pk}: stored totals {stored} and metrics {stored_metrics}, purchase orders give {expected}")
+
+            totals = rebuild_vendor_aggregate(vendor.pk)
+            rebuilt += 1
+            if options['check']:
+                expected = {
+                    'on_time_delivery_rate': calculate_on_time_delivery_rate(vendor),
+                    'quality_rating_avg': calculate_quality_rating_avg(vendor),
+                    'average_response_time': calculate_average_response_time(vendor),
+                    'fulfillment_rate': calculate_fulfillment_rate(vendor),
+                }
+                actual = metrics_from_totals(totals)
+                if actual != expected:
+                    mismatches.append(vendor.pk)
+                    self.stderr.write(f"Vendor {vendor.pk}: aggregates give {actual}, helpers give {expected}")
+
+        self.stdout.write(f"Rebuilt metric aggregates for {rebuilt} vendor(s).")
+        if drifted:
+            raise CommandError(f"{len(drifted)} vendor(s) had stored totals that did not match their purchase orders (now repaired).")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} vendor(s) do not match the calculate_* helpers.")
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from vendor_management.metrics import recompute_vendor_chunk
+from vendor_management.models import Vendor
+
+
+# Function to recompute one chunk of vendors on a worker thread, releasing its own connection afterwards
+def recompute_chunk_in_worker(vendor_ids, now, snapshots):
+    try:
+        return recompute_vendor_chunk(vendor_ids, now, snapshots)
+    finally:
+        connections.close_all()
+
+
+# Command to recompute the performance metrics of every vendor with grouped aggregate queries
+class Command(BaseCommand):
+    help = "Recompute the performance metrics of all vendors in chunks, optionally writing history snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Vendors per grouped aggregate query (default 1000).")
+        parser.add_argument('--workers', type=int, default=1, help="Threads recomputing chunks in parallel, each in its own transaction (default 1).")
+        parser.add_argument('--snapshots', action='store_true', help="Also write a VendorPerformanceMetrics row per vendor.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        if chunk_size < 1 or workers < 1:
+            raise CommandError("--chunk-size and --workers must be positive.")
+
+        now = timezone.now()
+        started = time.perf_counter()
+        vendor_ids = list(Vendor.objects.order_by('pk').values_list('pk', flat=True))
+        chunks = [vendor_ids[i:i + chunk_size] for i in range(0, len(vendor_ids), chunk_size)]
+
+        vendors_written = 0
+        purchase_orders_scanned = 0
+
+        def count(totals_by_vendor):
+            nonlocal vendors_written, purchase_orders_scanned
+            vendors_written += len(totals_by_vendor)
+            purchase_orders_scanned += sum(totals['total_pos'] for totals in totals_by_vendor.values())
+
+        # Each chunk is read and written in one transaction that locks its totals first, so purchase order
+        # deltas committed while the command runs are kept instead of being overwritten by an older read
+        if workers == 1:
+            for chunk in chunks:
+                count(recompute_vendor_chunk(chunk, now, options['snapshots']))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(recompute_chunk_in_worker, chunk, now, options['snapshots']) for chunk in chunks]
+                for future in as_completed(futures):
+                    count(future.result())
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Recomputed metrics for {vendors_written} vendor(s) covering {purchase_orders_scanned} purchase order(s) "
+            f"in {elapsed:.2f}s ({vendors_written / elapsed if elapsed else 0:.0f} vendors/s, "
+            f"{purchase_orders_scanned / elapsed if elapsed else 0:.0f} purchase orders/s)."
+        )
@@ -0,0 +1,52 @@
+import json
+import subprocess
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from vendor_management.benchmark import run_benchmark
+
+
+# Function to return the current git commit, so benchmark reports can be compared across commits
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Command to benchmark every API endpoint and write a machine-readable JSON report
+class Command(BaseCommand):
+    help = "Drive every endpoint of vendor_management/urls.py with concurrent clients and report throughput, latency percentiles, query counts and peak RSS as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help="Requests per endpoint (default 100).")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients (default 4).")
+        parser.add_argument('--base-url', default=None, help="Benchmark a running server at this root URL (e.g. http://127.0.0.1:8000) instead of in-process.")
+        parser.add_argument('--token', default=None, help="API token to use; by default a staff 'benchmark' user is created.")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Only run this scenario (repeatable).")
+        parser.add_argument('--output', default=None, help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        token = options['token']
+        if token is None:
+            user, created = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+            token = Token.objects.get_or_create(user=user)[0].key
+
+        try:
+            report = run_benchmark(
+                token, requests_per_endpoint=options['requests'], concurrency=options['concurrency'],
+                base_url=options['base_url'], endpoints=options['endpoints'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        report['git_revision'] = git_revision()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(f"Benchmark report written to {options['output']}.")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,35 @@
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.benchmark import seed_synthetic_data
+
+
+# Command to fill the database with a synthetic vendor and purchase order dataset for benchmarks
+class Command(BaseCommand):
+    help = "Bulk insert synthetic vendors and purchase orders with realistic status, rating and response-time distributions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000, help="Vendors to create (default 1000).")
+        parser.add_argument('--purchase-orders', type=int, default=100000, help="Purchase orders to create (default 100000).")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for a reproducible dataset.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert (default 5000).")
+        parser.add_argument('--prefix', default='SYN', help="Prefix of the generated vendor codes and po_numbers.")
+        parser.add_argument('--skip-metrics', action='store_true', help="Do not recompute vendor metrics and daily buckets afterwards.")
+
+    def handle(self, *args, **options):
+        if options['vendors'] < 1 or options['purchase_orders'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--vendors and --batch-size must be positive and --purchase-orders not negative.")
+
+        started = time.perf_counter()
+        for kind, count in seed_synthetic_data(
+            options['vendors'], options['purchase_orders'], seed=options['seed'],
+            batch_size=options['batch_size'], prefix=options['prefix'],
+        ):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{kind}: {count} ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+        # Bulk inserts bypass the purchase order signals, so refresh the metrics in one pass
+        if not options['skip_metrics']:
+            call_command('recompute_vendor_metrics', stdout=self.stdout)
+            call_command('backfill_daily_metrics', stdout=self.stdout)
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.2f}s.")
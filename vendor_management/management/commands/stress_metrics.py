@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from vendor_management.stress import run_stress_test
+
+
+# Command to check that concurrent purchase order writes leave the vendor metrics exactly as a full recompute would
+class Command(BaseCommand):
+    help = "Fire concurrent purchase order transitions at a few vendors from many threads, then compare the stored metric totals, daily buckets and vendor metrics with a full recompute."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transitions', type=int, default=2000, help="Purchase order transitions to fire (default 2000).")
+        parser.add_argument('--threads', type=int, default=8, help="Threads firing them, each with its own connection (default 8).")
+        parser.add_argument('--vendors', type=int, default=5, help="Vendors created for the test (default 5).")
+        parser.add_argument('--purchase-orders', type=int, default=50, help="Purchase orders created for the test (default 50).")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed, to replay the same transitions.")
+        parser.add_argument('--prefix', default='STRESS', help="Prefix of the vendor codes and PO numbers created (default STRESS).")
+        parser.add_argument('--keep', action='store_true', help="Keep the test vendors and purchase orders afterwards.")
+        parser.add_argument('--output', default=None, help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if min(options['transitions'], options['threads'], options['vendors'], options['purchase_orders']) < 1:
+            raise CommandError("--transitions, --threads, --vendors and --purchase-orders must be positive.")
+        report = run_stress_test(
+            transitions=options['transitions'], threads=options['threads'], vendors=options['vendors'],
+            purchase_orders=options['purchase_orders'], seed=options['seed'], prefix=options['prefix'], keep=options['keep'],
+        )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(f"Stress test report written to {options['output']}.")
+        else:
+            self.stdout.write(output)
+        if report['mismatches']:
+            raise CommandError(f"{len(report['mismatches'])} metric mismatch(es) after the concurrent writes.")
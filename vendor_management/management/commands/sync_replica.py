@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from vendor_management.routers import measure_replica_lag, replica_aliases, sync_sqlite_replica
+
+
+# Command to keep local SQLite read replicas up to date by copying the primary database into them
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the read replica files with the online backup API, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases', help="Replica alias to sync (repeatable; default all of DATABASE_REPLICAS).")
+        parser.add_argument('--interval', type=float, default=None, help="Keep syncing every this many seconds until interrupted.")
+        parser.add_argument('--status', action='store_true', help="Only print each replica's lag behind the primary.")
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or replica_aliases()
+        if not aliases:
+            raise CommandError("No replicas configured; add an alias to DATABASE_REPLICAS.")
+        for alias in aliases:
+            if alias not in connections.settings:
+                raise CommandError(f"Unknown database alias: {alias}.")
+            connection = connections[alias]
+            if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+                raise CommandError(f"Replica {alias} is not an SQLite file.")
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError("--interval must be positive.")
+
+        if options['status']:
+            for alias in aliases:
+                lag = measure_replica_lag(alias)
+                self.stdout.write(f"{alias}: " + ("never synced or unreachable" if lag is None else f"{lag:.3f}s behind"))
+            return
+
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                # Drop this process's connection first, so the next read opens the new copy
+                connections[alias].close()
+                try:
+                    sync_sqlite_replica(connections[alias].settings_dict['NAME'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"Synced {alias} in {time.perf_counter() - started:.3f}s.")
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
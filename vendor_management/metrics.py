@@ -0,0 +1,382 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import OnTimeCutoff, PurchaseOrder, Vendor, VendorDailyMetrics, VendorMetricAggregate, VendorPerformanceMetrics
+from .utils import *
+from .caching import invalidate_vendor_performance
+from .changes import record_changes
+from .sqlite import run_with_lock_retry
+
+
+# Function to return the time up to which the stored totals count completed POs as on time; with lock=True the
+# cutoff cannot move until the current transaction ends (the row is created on first use)
+def on_time_cutoff(lock=False):
+    cutoffs = OnTimeCutoff.objects.select_for_update() if lock else OnTimeCutoff.objects
+    cutoff = cutoffs.filter(pk=1).values_list('as_of', flat=True).first()
+    if cutoff is None:
+        cutoff = OnTimeCutoff.objects.get_or_create(pk=1, defaults={'as_of': timezone.now()})[0].as_of
+    return cutoff
+
+# Function to write the four performance metrics derived from metric totals onto the vendor row
+def update_vendor_metrics(vendor_id, totals):
+    metrics = metrics_from_totals(totals)
+    Vendor.objects.filter(pk=vendor_id).update(**metrics)
+    record_changes('vendor', [vendor_id], 'update')
+    return metrics
+
+# Function to rebuild a vendor's metric totals from scratch with a single aggregate query (on time as of the cutoff)
+def rebuild_vendor_aggregate(vendor_id):
+    with transaction.atomic():
+        try:
+            # Lock the totals row (creating it if needed) before reading the purchase orders, so deltas from
+            # concurrent PO writes wait for the rebuild and apply on top of it instead of being overwritten
+            VendorMetricAggregate.objects.select_for_update().get_or_create(vendor_id=vendor_id)
+        except IntegrityError:
+            # The vendor was deleted while its totals were being rebuilt
+            return normalize_metric_totals({})
+        totals = normalize_metric_totals(
+            PurchaseOrder.objects.filter(vendor_id=vendor_id).aggregate(**metric_totals_expressions(on_time_cutoff()))
+        )
+        VendorMetricAggregate.objects.filter(vendor_id=vendor_id).update(**totals)
+        update_vendor_metrics(vendor_id, totals)
+    return totals
+
+# Function to apply the difference between two contributions to a vendor's totals and refresh its metrics
+def apply_metric_delta(vendor_id, old=None, new=None):
+    zero = normalize_metric_totals({})
+    old = old or zero
+    new = new or zero
+    delta = {field: new[field] - old[field] for field in METRIC_TOTAL_FIELDS}
+    changes = {field: F(field) + value for field, value in delta.items() if value}
+    if not changes:
+        return None
+
+    with transaction.atomic():
+        updated = VendorMetricAggregate.objects.filter(vendor_id=vendor_id).update(**changes)
+        if not updated:
+            # No totals stored yet: the rebuild already reflects the purchase order being written
+            return rebuild_vendor_aggregate(vendor_id)
+        totals = VendorMetricAggregate.objects.filter(vendor_id=vendor_id).values(*METRIC_TOTAL_FIELDS).get()
+        update_vendor_metrics(vendor_id, totals)
+    return totals
+
+# Function to return the UTC day whose bucket holds a purchase order state (the day it was issued)
+def metric_bucket_day(state):
+    issue_date = state['issue_date']
+    if timezone.is_naive(issue_date):
+        issue_date = timezone.make_aware(issue_date, dt_timezone.utc)
+    return issue_date.astimezone(dt_timezone.utc).date()
+
+# Function to compute the metric totals of many vendors per issue day with one grouped query; keys are (vendor_id, day)
+def calculate_daily_totals(vendor_ids, now=None, day=None):
+    purchase_orders = PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+    if day is not None:
+        start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+        purchase_orders = purchase_orders.filter(issue_date__gte=start, issue_date__lt=start + timedelta(days=1))
+    rows = (
+        purchase_orders.annotate(day=TruncDate('issue_date', tzinfo=dt_timezone.utc))
+        .order_by()
+        .values('vendor_id', 'day')
+        .annotate(**metric_totals_expressions(now))
+    )
+    return {(row['vendor_id'], row['day']): normalize_metric_totals(row) for row in rows}
+
+# Function to rebuild the daily buckets of the given vendors (or of one day of them) from their purchase orders
+def rebuild_daily_buckets(vendor_ids, day=None, batch_size=500):
+    buckets = VendorDailyMetrics.objects.filter(vendor_id__in=vendor_ids)
+    if day is not None:
+        buckets = buckets.filter(day=day)
+    try:
+        with transaction.atomic():
+            # Deleting first locks the old buckets, so concurrent deltas wait for the rebuilt ones
+            buckets.delete()
+            totals_by_bucket = calculate_daily_totals(vendor_ids, on_time_cutoff(), day)
+            VendorDailyMetrics.objects.bulk_create([
+                VendorDailyMetrics(vendor_id=vendor_id, day=bucket_day, **totals)
+                for (vendor_id, bucket_day), totals in totals_by_bucket.items()
+            ], batch_size=batch_size)
+    except IntegrityError:
+        # A vendor was deleted meanwhile, or a concurrent writer rebuilt the same bucket first
+        return 0
+    return len(totals_by_bucket)
+
+# Function to apply the difference between two contributions to one daily bucket of a vendor
+def apply_daily_delta(vendor_id, day, old=None, new=None):
+    zero = normalize_metric_totals({})
+    old = old or zero
+    new = new or zero
+    changes = {field: F(field) + (new[field] - old[field]) for field in METRIC_TOTAL_FIELDS if new[field] != old[field]}
+    if not changes:
+        return
+    bucket = VendorDailyMetrics.objects.filter(vendor_id=vendor_id, day=day)
+    if not bucket.update(**changes):
+        # No bucket yet: building it from the purchase orders already reflects the write being recorded,
+        # unless a concurrent writer created it first, from purchase orders that did not include this write
+        if not rebuild_daily_buckets([vendor_id], day=day):
+            bucket.update(**changes)
+
+# Function to move a purchase order's contribution from its previous state to its current state (either may be None)
+def record_purchase_order_change(previous, current):
+    record_purchase_order_changes([(previous, current)])
+
+# Function to move the contributions of many purchase orders from their previous to their current states, given as
+# (previous, current) pairs (either may be None); the changes are summed per vendor and per daily bucket first, so
+# each vendor's totals and each bucket is updated once, and they are locked in id order so concurrent writers
+# (for example opposite reassignments) cannot deadlock
+def record_purchase_order_changes(changes):
+    completed = [
+        state for change in changes for state in change
+        if state is not None and state['status'] == 'completed' and state['delivery_date'] is not None
+    ]
+    cutoff = on_time_cutoff() if completed else None
+    if any(state['delivery_date'] > cutoff for state in completed):
+        # Whether these POs count as on time depends on the cutoff: hold it, so advance_on_time_cutoff either
+        # counts them after this write or waits for it
+        cutoff = on_time_cutoff(lock=True)
+
+    zero = normalize_metric_totals({})
+    by_vendor = {}
+    by_bucket = {}
+    for previous, current in changes:
+        for state, side in ((previous, 'old'), (current, 'new')):
+            if state is None:
+                continue
+            contribution = metric_contribution(state, cutoff)
+            # A daily bucket holds the POs issued to a vendor on one day, so it can differ from the old one in either
+            for sums in (
+                by_vendor.setdefault(state['vendor_id'], {'old': zero, 'new': zero}),
+                by_bucket.setdefault((state['vendor_id'], metric_bucket_day(state)), {'old': zero, 'new': zero}),
+            ):
+                sums[side] = add_metric_totals(sums[side], contribution)
+
+    for vendor_id, sums in sorted(by_vendor.items()):
+        apply_metric_delta(vendor_id, **sums)
+    for (vendor_id, day), sums in sorted(by_bucket.items()):
+        apply_daily_delta(vendor_id, day, **sums)
+
+# Function to sum a vendor's daily buckets over the last `days` days (today included)
+def calculate_window_totals(vendor_id, days, now=None):
+    now = now or timezone.now()
+    first_day = now.astimezone(dt_timezone.utc).date() - timedelta(days=days - 1)
+    # One transaction, so the cutoff cannot move between reading it and reading the buckets
+    with transaction.atomic():
+        cutoff = on_time_cutoff()
+        totals = normalize_metric_totals(
+            VendorDailyMetrics.objects.filter(vendor_id=vendor_id, day__gte=first_day)
+            .aggregate(**{field: Sum(field) for field in METRIC_TOTAL_FIELDS})
+        )
+        if now > cutoff:
+            # The buckets count POs as on time up to the cutoff; the ones delivered since are added, so a window
+            # counts on time against now, like the all-time metrics
+            totals['on_time_pos'] += PurchaseOrder.objects.filter(
+                vendor_id=vendor_id, status='completed', delivery_date__gt=cutoff, delivery_date__lte=now,
+                issue_date__gte=datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc),
+            ).count()
+    return totals
+
+# Function to compute the metric totals of many vendors with one grouped aggregate query
+def calculate_metric_totals_by_vendor(vendor_ids, now=None):
+    rows = (
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .order_by()
+        .values('vendor_id')
+        .annotate(**metric_totals_expressions(now))
+    )
+    totals_by_vendor = {vendor_id: normalize_metric_totals({}) for vendor_id in vendor_ids}
+    for row in rows:
+        totals_by_vendor[row['vendor_id']] = normalize_metric_totals(row)
+    return totals_by_vendor
+
+# Function to write the totals and derived metrics of many vendors back with bulk queries
+def bulk_write_vendor_metrics(totals_by_vendor, snapshots=False, now=None, batch_size=500):
+    now = now or timezone.now()
+    # No savepoint of its own: inside a chunk recompute any error rolls the whole chunk back anyway
+    with transaction.atomic(savepoint=False):
+        # The stored metrics and whether an aggregate exists, in one query; vendors deleted meanwhile are skipped
+        stored = {
+            row[0]: row[1:]
+            for row in Vendor.objects.filter(pk__in=totals_by_vendor).values_list('pk', 'metric_aggregate', *VENDOR_METRIC_FIELDS)
+        }
+        existing = {vendor_id for vendor_id, row in stored.items() if row[0] is not None}
+        vendors = []
+        aggregates = []
+        history = []
+        for vendor_id, totals in totals_by_vendor.items():
+            if vendor_id not in stored:
+                continue
+            metrics = metrics_from_totals(totals)
+            # Only vendors whose metrics change are written and logged, so a full recompute adds no no-op updates to the change feed
+            if tuple(metrics[field] for field in VENDOR_METRIC_FIELDS) != stored[vendor_id][1:]:
+                vendors.append(Vendor(pk=vendor_id, **metrics))
+            aggregates.append(VendorMetricAggregate(vendor_id=vendor_id, **totals))
+            if snapshots:
+                history.append(VendorPerformanceMetrics(vendor_id=vendor_id, date=now, **metrics))
+
+        if vendors:
+            Vendor.objects.bulk_update(vendors, VENDOR_METRIC_FIELDS, batch_size=batch_size)
+            record_changes('vendor', [vendor.pk for vendor in vendors], 'update', now)
+        VendorMetricAggregate.objects.bulk_update(
+            [aggregate for aggregate in aggregates if aggregate.vendor_id in existing], METRIC_TOTAL_FIELDS, batch_size=batch_size
+        )
+        VendorMetricAggregate.objects.bulk_create(
+            [aggregate for aggregate in aggregates if aggregate.vendor_id not in existing], batch_size=batch_size
+        )
+        if history:
+            VendorPerformanceMetrics.objects.bulk_create(history, batch_size=batch_size)
+    return len(aggregates)
+
+# Function to recompute one chunk of vendors from their purchase orders and write the result back; returns their totals.
+# The chunk's totals are locked before the purchase orders are read, and read and write share one (retried)
+# transaction, so a PO delta committed meanwhile is never overwritten by totals read before it
+def recompute_vendor_chunk(vendor_ids, now=None, snapshots=False):
+    now = now or timezone.now()
+
+    def write_chunk():
+        with transaction.atomic():
+            # A no-op UPDATE rather than select_for_update(): besides locking the rows it takes SQLite's write lock
+            # before the read, so concurrent writers wait for this transaction instead of invalidating its read
+            VendorMetricAggregate.objects.filter(vendor_id__in=vendor_ids).update(total_pos=F('total_pos'))
+            totals_by_vendor = calculate_metric_totals_by_vendor(vendor_ids, on_time_cutoff())
+            bulk_write_vendor_metrics(totals_by_vendor, snapshots=snapshots, now=now)
+        return totals_by_vendor
+
+    return run_with_lock_retry(write_chunk)
+
+# Function to recompute the totals and metrics of the given vendors from scratch, in chunks of grouped queries
+def recompute_vendor_metrics_now(vendor_ids, chunk_size=1000):
+    vendor_ids = sorted(set(vendor_ids))
+    now = timezone.now()
+    for i in range(0, len(vendor_ids), chunk_size):
+        chunk = vendor_ids[i:i + chunk_size]
+        recompute_vendor_chunk(chunk, now)
+        rebuild_daily_buckets(chunk)
+        # Only once the chunk's totals and buckets are written, or a read meanwhile caches the old ones again
+        invalidate_vendor_performance(*chunk)
+
+# Function to move the on-time cutoff up to now and count the completed POs whose delivery date passed meanwhile
+# as on time in their vendors' totals and daily buckets; returns the number of purchase orders counted
+def advance_on_time_cutoff(now=None):
+    now = now or timezone.now()
+
+    def advance():
+        with transaction.atomic():
+            cutoff = on_time_cutoff(lock=True)
+            if now <= cutoff:
+                return {}
+            # Moved before the deltas, so totals rebuilt by them count up to the new cutoff too
+            OnTimeCutoff.objects.filter(pk=1).update(as_of=now)
+            due = PurchaseOrder.objects.filter(status='completed', delivery_date__gt=cutoff, delivery_date__lte=now).order_by()
+            by_vendor = dict(due.values('vendor_id').annotate(count=Count('id')).values_list('vendor_id', 'count'))
+            by_bucket = {
+                (row['vendor_id'], row['day']): row['count']
+                for row in due.annotate(day=TruncDate('issue_date', tzinfo=dt_timezone.utc)).values('vendor_id', 'day').annotate(count=Count('id'))
+            }
+            for vendor_id, count in sorted(by_vendor.items()):
+                apply_metric_delta(vendor_id, new=normalize_metric_totals({'on_time_pos': count}))
+            for (vendor_id, day), count in sorted(by_bucket.items()):
+                apply_daily_delta(vendor_id, day, new=normalize_metric_totals({'on_time_pos': count}))
+        return by_vendor
+
+    by_vendor = run_with_lock_retry(advance)
+    invalidate_vendor_performance(*by_vendor)
+    return sum(by_vendor.values())
+
+# Function to store a performance snapshot, skipping it when nothing changed within the minimum interval
+def record_performance_snapshot(vendor, metrics, now=None):
+    now = now or timezone.now()
+    interval = timedelta(seconds=getattr(settings, 'VENDOR_PERFORMANCE_SNAPSHOT_INTERVAL', 3600))
+    latest = VendorPerformanceMetrics.objects.filter(vendor=vendor, granularity='raw').order_by('-date').first()
+    if (
+        latest is not None
+        and now - latest.date < interval
+        and all(getattr(latest, field) == metrics[field] for field in VENDOR_METRIC_FIELDS)
+    ):
+        return latest
+    return VendorPerformanceMetrics.objects.create(vendor=vendor, date=now, **metrics)
+
+# Function to truncate a snapshot date to the start of its day or month (in the current time zone)
+def truncate_snapshot_date(date, granularity):
+    date = timezone.localtime(date).replace(hour=0, minute=0, second=0, microsecond=0)
+    return date.replace(day=1) if granularity == 'month' else date
+
+# Function to roll one bounded batch of source snapshots older than cutoff into target summary rows
+def compact_snapshot_batch(source, target, cutoff, batch_size=1000):
+    with transaction.atomic():
+        rows = list(
+            VendorPerformanceMetrics.objects.filter(granularity=source, date__lt=cutoff)
+            .order_by('date', 'id')
+            .values('id', 'vendor_id', 'date', 'sample_count', *VENDOR_METRIC_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+
+        # Weighted sums per (vendor, period) for this batch
+        groups = {}
+        for row in rows:
+            key = (row['vendor_id'], truncate_snapshot_date(row['date'], target))
+            group = groups.setdefault(key, dict.fromkeys(('sample_count', *VENDOR_METRIC_FIELDS), 0))
+            group['sample_count'] += row['sample_count']
+            for field in VENDOR_METRIC_FIELDS:
+                group[field] += row[field] * row['sample_count']
+
+        # Merge into summary rows left by earlier batches or runs
+        existing = {
+            (summary.vendor_id, summary.date): summary
+            for summary in VendorPerformanceMetrics.objects.filter(
+                granularity=target,
+                vendor_id__in={vendor_id for vendor_id, date in groups},
+                date__in={date for vendor_id, date in groups},
+            )
+        }
+        updated = []
+        created = []
+        for (vendor_id, date), group in groups.items():
+            summary = existing.get((vendor_id, date))
+            if summary is None:
+                summary = VendorPerformanceMetrics(vendor_id=vendor_id, date=date, granularity=target, sample_count=0)
+                created.append(summary)
+                for field in VENDOR_METRIC_FIELDS:
+                    setattr(summary, field, 0)
+            else:
+                updated.append(summary)
+            samples = summary.sample_count + group['sample_count']
+            for field in VENDOR_METRIC_FIELDS:
+                setattr(summary, field, (getattr(summary, field) * summary.sample_count + group[field]) / samples)
+            summary.sample_count = samples
+
+        VendorPerformanceMetrics.objects.bulk_update(updated, ['sample_count', *VENDOR_METRIC_FIELDS])
+        VendorPerformanceMetrics.objects.bulk_create(created)
+        VendorPerformanceMetrics.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows), len(created)
+
+# Leaderboard order of each metric ('-' when higher is better) and the aggregate count it is computed over
+LEADERBOARD_METRICS = {
+    'on_time_delivery_rate': ('-', 'completed_pos'),
+    'quality_rating_avg': ('-', 'rated_pos'),
+    'average_response_time': ('', 'acknowledged_pos'),
+    'fulfillment_rate': ('-', 'total_pos'),
+}
+
+# Function to rank the top vendors by a metric, among vendors whose metric covers at least min_pos purchase orders
+def vendor_leaderboard(metric, limit=20, min_pos=1):
+    direction, sample_field = LEADERBOARD_METRICS[metric]
+    rows = (
+        Vendor.objects.filter(**{f'metric_aggregate__{sample_field}__gte': min_pos})
+        # Ties go to the lower (older) vendor id; the (metric, id) index yields rows in exactly this order
+        .order_by(f'{direction}{metric}', 'id')
+        .values('id', 'name', 'vendor_code', metric, f'metric_aggregate__{sample_field}')[:limit]
+    )
+    return [
+        {
+            'rank': rank,
+            'vendor': row['id'],
+            'name': row['name'],
+            'vendor_code': row['vendor_code'],
+            'value': row[metric],
+            'sample_size': row[f'metric_aggregate__{sample_field}'],
+        }
+        for rank, row in enumerate(rows, start=1)
+    ]
@@ -0,0 +1,101 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from .caching import increment_counter, performance_cache
+from .models import VendorMetricsQueueEntry
+from .sqlite import run_with_lock_retry
+
+
+# Function to tell whether vendor metric updates are deferred to the queue instead of applied in the request
+def metrics_queue_enabled():
+    return getattr(settings, 'VENDOR_METRICS_UPDATE_MODE', 'sync') == 'queue'
+
+# Function to mark vendors dirty; a vendor already waiting in the queue just has its trigger counted
+def enqueue_vendor_metrics(vendor_ids):
+    vendor_ids = set(vendor_ids)
+    if not vendor_ids:
+        return
+    now = timezone.now()
+    # The cached performance is left alone here: the worker drops it once its recompute commits
+
+    def enqueue():
+        with transaction.atomic():
+            queued = VendorMetricsQueueEntry.objects.filter(vendor_id__in=vendor_ids)
+            queued.update(updated_at=now, triggers=F('triggers') + 1)
+            missing = vendor_ids - set(queued.values_list('vendor_id', flat=True))
+            VendorMetricsQueueEntry.objects.bulk_create(
+                [VendorMetricsQueueEntry(vendor_id=vendor_id, enqueued_at=now, updated_at=now) for vendor_id in missing],
+                ignore_conflicts=True,
+            )
+
+    run_with_lock_retry(enqueue)
+
+# Function to claim up to batch_size unclaimed (or abandoned) vendors for a worker
+def claim_vendor_metrics(worker, batch_size=100):
+    now = timezone.now()
+    timeout = timedelta(seconds=getattr(settings, 'VENDOR_METRICS_QUEUE_CLAIM_TIMEOUT', 300))
+    claimable = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timeout)
+
+    def claim():
+        with transaction.atomic():
+            entries = VendorMetricsQueueEntry.objects.filter(claimable).order_by('enqueued_at')
+            if connection.features.has_select_for_update_skip_locked:
+                entries = entries.select_for_update(skip_locked=True)
+            vendor_ids = list(entries.values_list('vendor_id', flat=True)[:batch_size])
+            # The claimable filter is repeated so a concurrent worker's claim is never stolen on databases without row locks
+            VendorMetricsQueueEntry.objects.filter(claimable, vendor_id__in=vendor_ids).update(claimed_at=now, claimed_by=worker)
+
+    # Workers claim at the same moments, so on SQLite this is where they meet each other's write locks
+    run_with_lock_retry(claim)
+    return list(
+        VendorMetricsQueueEntry.objects.filter(claimed_by=worker, claimed_at=now).values_list('vendor_id', flat=True)
+    ), now
+
+# Function to recompute one claimed batch, then drop the entries that were not re-triggered meanwhile
+def process_vendor_metrics_batch(worker, batch_size=100):
+    from .metrics import recompute_vendor_metrics_now
+
+    vendor_ids, claimed_at = claim_vendor_metrics(worker, batch_size)
+    if not vendor_ids:
+        return 0
+    started = time.perf_counter()
+    # Also drops the vendors' cached performance once each chunk's totals and buckets are committed
+    recompute_vendor_metrics_now(vendor_ids)
+    claimed = VendorMetricsQueueEntry.objects.filter(vendor_id__in=vendor_ids, claimed_by=worker, claimed_at=claimed_at)
+    claimed.filter(updated_at__lte=claimed_at).delete()
+    # Triggered again while being processed: release it so the newer change is picked up
+    claimed.update(claimed_at=None, claimed_by='', enqueued_at=claimed_at)
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    increment_counter('metrics-queue:processed', len(vendor_ids))
+    increment_counter('metrics-queue:batches')
+    increment_counter('metrics-queue:processing_ms', elapsed_ms)
+    return len(vendor_ids)
+
+# Function to drain the queue on the calling thread (the synchronous mode used by tests and --once runs)
+def drain_vendor_metrics_queue(worker='sync', batch_size=100):
+    processed = 0
+    while True:
+        count = process_vendor_metrics_batch(worker, batch_size)
+        if not count:
+            return processed
+        processed += count
+
+# Function to report queue depth, lag and processing-time counters
+def vendor_metrics_queue_stats():
+    now = timezone.now()
+    queue = VendorMetricsQueueEntry.objects.aggregate(oldest=Min('enqueued_at'))
+    counters = performance_cache().get_many(['metrics-queue:processed', 'metrics-queue:batches', 'metrics-queue:processing_ms'])
+    processed = counters.get('metrics-queue:processed', 0)
+    processing_ms = counters.get('metrics-queue:processing_ms', 0)
+    return {
+        'depth': VendorMetricsQueueEntry.objects.count(),
+        'claimed': VendorMetricsQueueEntry.objects.filter(claimed_at__isnull=False).count(),
+        'lag_seconds': round((now - queue['oldest']).total_seconds(), 3) if queue['oldest'] else 0,
+        'processed': processed,
+        'batches': counters.get('metrics-queue:batches', 0),
+        'processing_ms': processing_ms,
+        'avg_ms_per_vendor': round(processing_ms / processed, 3) if processed else None,
+    }
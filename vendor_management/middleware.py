@@ -0,0 +1,146 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from .routers import replica_aliases, replica_reads
+
+logger = logging.getLogger('vendor_management.requests')
+
+# Recent request timings per route, kept in-process for the stats endpoint
+_route_timings = defaultdict(lambda: deque(maxlen=getattr(settings, 'REQUEST_TIMING_SAMPLES', 1000)))
+_route_timings_lock = threading.Lock()
+
+
+# Database execute wrapper counting the queries of one request and the time spent in them
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+# Function to pick the p-th percentile (nearest rank) of a list of numbers
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+# Function to summarise the recorded timings of every route
+def route_timing_stats():
+    with _route_timings_lock:
+        snapshot = {route: list(samples) for route, samples in _route_timings.items()}
+    stats = {}
+    for route, samples in sorted(snapshot.items()):
+        totals = [sample['total_ms'] for sample in samples]
+        queries = [sample['queries'] for sample in samples]
+        stats[route] = {
+            'count': len(samples),
+            'total_ms': {f'p{p}': percentile(totals, p) for p in (50, 95, 99)},
+            'db_ms': {f'p{p}': percentile([sample['db_ms'] for sample in samples], p) for p in (50, 95, 99)},
+            'render_ms': {f'p{p}': percentile([sample['render_ms'] for sample in samples], p) for p in (50, 95, 99)},
+            'queries': {'p50': percentile(queries, 50), 'max': max(queries)},
+        }
+    return stats
+
+# Function to forget every recorded timing (used by tests)
+def reset_route_timings():
+    with _route_timings_lock:
+        _route_timings.clear()
+
+
+# Middleware recording SQL count, DB time, render (serialization) time and total time of every request
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._render_ms = 0.0
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        db_ms = recorder.duration * 1000
+        render_ms = request._render_ms
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+            f'render;dur={render_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else None
+        sample = {
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(db_ms, 3),
+            'render_ms': round(render_ms, 3),
+            'total_ms': round(total_ms, 3),
+        }
+        logger.info(json.dumps(sample))
+        if route is not None:
+            with _route_timings_lock:
+                _route_timings[f'{request.method} {route}'].append(sample)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (serialized to JSON, etc.) after the view returns; time that step
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._render_ms += (time.perf_counter() - started) * 1000
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+# Function to iterate a streaming response's content with the request's replica routing in effect for each chunk
+def iter_with_replica_reads(content, enabled):
+    iterator = iter(content)
+    while True:
+        with replica_reads(enabled):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+# Middleware letting read-only requests read from a replica, and pinning clients that wrote to the primary for a while
+class ReplicaRoutingMiddleware:
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = getattr(settings, 'REPLICA_PIN_COOKIE', 'replica_pin')
+        # A client that wrote recently reads its own writes from the primary until the replicas have caught up
+        enabled = request.method in self.SAFE_METHODS and cookie not in request.COOKIES
+        with replica_reads(enabled) as request_wrote:
+            response = self.get_response(request)
+            wrote = request_wrote()
+        if response.streaming and enabled and not wrote:
+            response.streaming_content = iter_with_replica_reads(response.streaming_content, enabled)
+        if wrote and replica_aliases():
+            response.set_cookie(cookie, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5), httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:39
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorMetricAggregate',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metric_aggregate', serialize=False, to='vendor_management.vendor')),
+                ('total_pos', models.IntegerField(default=0)),
+                ('completed_pos', models.IntegerField(default=0)),
+                ('on_time_pos', models.IntegerField(default=0)),
+                ('rated_pos', models.IntegerField(default=0)),
+                ('quality_rating_sum', models.FloatField(default=0)),
+                ('acknowledged_pos', models.IntegerField(default=0)),
+                ('response_time_sum', models.DurationField(default=datetime.timedelta)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('completed', 'completed'), ('canceled', 'canceled')], default='pending', max_length=50),
+        ),
+    ]
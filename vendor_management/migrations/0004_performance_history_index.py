@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0003_purchase_order_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorperformancemetrics',
+            index=models.Index(fields=['vendor', 'date'], name='performance_vendor_date_idx'),
+        ),
+    ]
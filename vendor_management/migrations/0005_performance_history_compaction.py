@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0004_performance_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorperformancemetrics',
+            name='granularity',
+            field=models.CharField(choices=[('raw', 'raw'), ('day', 'day'), ('month', 'month')], default='raw', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vendorperformancemetrics',
+            name='sample_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='vendorperformancemetrics',
+            index=models.Index(fields=['granularity', 'date'], name='performance_granularity_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0005_performance_history_compaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorMetricsQueueEntry',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics_queue_entry', serialize=False, to='vendor_management.vendor')),
+                ('enqueued_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('triggers', models.PositiveIntegerField(default=1)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('claimed_by', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['claimed_at', 'enqueued_at'], name='metrics_queue_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0007_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['-on_time_delivery_rate', 'id'], name='vendor_on_time_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['-quality_rating_avg', 'id'], name='vendor_quality_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['average_response_time', 'id'], name='vendor_response_time_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['-fulfillment_rate', 'id'], name='vendor_fulfillment_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:06
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0008_vendor_metric_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total_pos', models.IntegerField(default=0)),
+                ('completed_pos', models.IntegerField(default=0)),
+                ('on_time_pos', models.IntegerField(default=0)),
+                ('rated_pos', models.IntegerField(default=0)),
+                ('quality_rating_sum', models.FloatField(default=0)),
+                ('acknowledged_pos', models.IntegerField(default=0)),
+                ('response_time_sum', models.DurationField(default=datetime.timedelta)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='vendor_management.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailymetrics',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day'), name='daily_metrics_vendor_day_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0009_vendor_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_date', models.DateTimeField()),
+                ('position', models.PositiveIntegerField()),
+                ('sku', models.CharField(max_length=255)),
+                ('quantity', models.IntegerField()),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='vendor_management.purchaseorder')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vendor_management.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sku', 'vendor'], name='po_item_sku_vendor_idx'), models.Index(fields=['sku', 'order_date'], name='po_item_sku_order_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='purchaseorderitem',
+            constraint=models.UniqueConstraint(fields=('purchase_order', 'position'), name='po_item_position_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_management', '0010_purchase_order_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnTimeCutoff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'delivery_date'], name='po_status_delivery_date_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 # models.py
-from django.db import models
+from datetime import timedelta
+from django.db import models, router, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .sqlite import run_with_lock_retry
+from .utils import LINE_ITEM_SKU_MAX_LENGTH, LINE_ITEM_SOURCE_FIELDS, METRIC_STATE_FIELDS, line_item_state
 
 
 # Vendor model with additional fields for performance metrics
@@ -15,6 +18,15 @@ class Vendor(models.Model):
     average_response_time = models.FloatField(default=0, validators=[MinValueValidator(0)])
     fulfillment_rate = models.FloatField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)])
 
+    class Meta:
+        # Indexes in leaderboard order (best first, ties by id) so the top N is read straight off the index
+        indexes = [
+            models.Index(fields=['-on_time_delivery_rate', 'id'], name='vendor_on_time_rank_idx'),
+            models.Index(fields=['-quality_rating_avg', 'id'], name='vendor_quality_rank_idx'),
+            models.Index(fields=['average_response_time', 'id'], name='vendor_response_time_rank_idx'),
+            models.Index(fields=['-fulfillment_rate', 'id'], name='vendor_fulfillment_rank_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -40,14 +52,120 @@ class PurchaseOrder(models.Model):
     issue_date = models.DateTimeField()
     acknowledgment_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # Composite indexes backing the list endpoint filters
+        indexes = [
+            models.Index(fields=['vendor', 'status'], name='po_vendor_status_idx'),
+            models.Index(fields=['vendor', 'order_date'], name='po_vendor_order_date_idx'),
+            models.Index(fields=['vendor', 'delivery_date'], name='po_vendor_delivery_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='po_status_order_date_idx'),
+            # Completed POs whose delivery date passed the on-time cutoff since it last moved
+            models.Index(fields=['status', 'delivery_date'], name='po_status_delivery_date_idx'),
+        ]
+
     def __str__(self):
         return self.po_number
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        # Remember the stored metric field values, so a save can tell whether any of them changed without a query
+        if not deferred.intersection(METRIC_STATE_FIELDS):
+            instance._loaded_metric_state = {name: getattr(instance, name) for name in METRIC_STATE_FIELDS}
+        # Likewise for the fields its line items are built from, so edits that leave them alone skip the line items
+        if not deferred.intersection(LINE_ITEM_SOURCE_FIELDS):
+            instance._loaded_line_item_state = line_item_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(PurchaseOrder, instance=self)
+
+        # The metric deltas applied by the save signals commit or roll back together with the row itself
+        def save_in_transaction():
+            with transaction.atomic(using=using, savepoint=False):
+                super(PurchaseOrder, self).save(*args, **kwargs)
+
+        run_with_lock_retry(save_in_transaction, using)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(PurchaseOrder, instance=self)
+
+        def delete_in_transaction():
+            with transaction.atomic(using=using, savepoint=False):
+                # Remove the contribution the row has now (locked), not the one it had when this instance was loaded
+                stored = PurchaseOrder.objects.using(using).select_for_update().filter(pk=self.pk).values(*METRIC_STATE_FIELDS).first()
+                if stored is not None:
+                    self._loaded_metric_state = stored
+                return super(PurchaseOrder, self).delete(using=using, keep_parents=keep_parents)
+
+        return run_with_lock_retry(delete_in_transaction, using)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_loaded_metric_state', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        # Optimistic check: only write if the metric fields still hold the values this instance was loaded with
+        if super()._do_update(base_qs.filter(**expected), using, pk_val, values, update_fields, forced_update):
+            return True
+        # A concurrent write changed them: lock the row and replace its current state instead, so the delta stays exact
+        stored = base_qs.select_for_update().filter(pk=pk_val).values(*METRIC_STATE_FIELDS).first()
+        if stored is None:
+            return False
+        self._loaded_metric_state = stored
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._loaded_metric_state = {name: getattr(self, name) for name in METRIC_STATE_FIELDS}
+            if not self.get_deferred_fields().intersection(LINE_ITEM_SOURCE_FIELDS):
+                self._loaded_line_item_state = line_item_state(self)
+        else:
+            fields = {'vendor_id' if name == 'vendor' else name for name in fields}
+            if hasattr(self, '_loaded_metric_state'):
+                self._loaded_metric_state.update({name: getattr(self, name) for name in METRIC_STATE_FIELDS if name in fields})
+            if fields.intersection(LINE_ITEM_SOURCE_FIELDS):
+                # The stored line items may no longer match what this instance was loaded with
+                self.__dict__.pop('_loaded_line_item_state', None)
+
+# One line of a purchase order's items; the PO's vendor and order date are copied in so item queries need no join
+class PurchaseOrderItem(models.Model):
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='line_items')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    order_date = models.DateTimeField()
+    # Index of the entry in the purchase order's items JSON
+    position = models.PositiveIntegerField()
+    sku = models.CharField(max_length=LINE_ITEM_SKU_MAX_LENGTH)
+    quantity = models.IntegerField()
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        # Indexes backing the per-SKU totals by vendor and over order date ranges
+        indexes = [
+            models.Index(fields=['sku', 'vendor'], name='po_item_sku_vendor_idx'),
+            models.Index(fields=['sku', 'order_date'], name='po_item_sku_order_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['purchase_order', 'position'], name='po_item_position_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.purchase_order_id} - {self.sku}"
+
 # Vendor Performance History model
 class VendorPerformanceMetrics(models.Model):
+    GRANULARITY_CHOICES = [
+        ('raw', 'raw'),
+        ('day', 'day'),
+        ('month', 'month'),
+    ]
     # Vendor and performance history information
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     date = models.DateTimeField()
+    # Compacted summary rows average sample_count snapshots of the day or month starting at date
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES, default='raw')
+    sample_count = models.PositiveIntegerField(default=1)
     
     # Performance Metrics (historical records)
     on_time_delivery_rate = models.FloatField()
@@ -55,5 +173,97 @@ class VendorPerformanceMetrics(models.Model):
     average_response_time = models.FloatField()
     fulfillment_rate = models.FloatField()
 
+    class Meta:
+        # Index backing the latest-snapshot lookup and the history time series
+        indexes = [
+            models.Index(fields=['vendor', 'date'], name='performance_vendor_date_idx'),
+            models.Index(fields=['granularity', 'date'], name='performance_granularity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor} - {self.date}"
+
+# Running totals behind the vendor performance metrics, maintained incrementally on every PO write
+class VendorMetricAggregate(models.Model):
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='metric_aggregate')
+    total_pos = models.IntegerField(default=0)
+    completed_pos = models.IntegerField(default=0)
+    on_time_pos = models.IntegerField(default=0)
+    rated_pos = models.IntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0)
+    acknowledged_pos = models.IntegerField(default=0)
+    response_time_sum = models.DurationField(default=timedelta)
+
+    def __str__(self):
+        return f"{self.vendor} - aggregates"
+
+
+# Metric totals of the purchase orders issued to a vendor on one (UTC) day; rolling windows sum these buckets
+class VendorDailyMetrics(models.Model):
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='daily_metrics')
+    day = models.DateField()
+    total_pos = models.IntegerField(default=0)
+    completed_pos = models.IntegerField(default=0)
+    on_time_pos = models.IntegerField(default=0)
+    rated_pos = models.IntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0)
+    acknowledged_pos = models.IntegerField(default=0)
+    response_time_sum = models.DurationField(default=timedelta)
+
+    class Meta:
+        # Also the index behind the (vendor, day range) window sums
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='daily_metrics_vendor_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor} - {self.day}"
+
+
+# Time up to which the stored metric totals count completed purchase orders as on time (a single row); moved
+# forward by advance_on_time_cutoff as delivery dates pass
+class OnTimeCutoff(models.Model):
+    as_of = models.DateTimeField()
+
+    def __str__(self):
+        return f"On time as of {self.as_of}"
+
+
+# Pending metric recomputation for a vendor; repeated triggers coalesce into its single row
+class VendorMetricsQueueEntry(models.Model):
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='metrics_queue_entry')
+    # First trigger since the vendor was last processed (drives the queue lag) and the latest one
+    enqueued_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    triggers = models.PositiveIntegerField(default=1)
+    # Set while a worker is recomputing the vendor
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['claimed_at', 'enqueued_at'], name='metrics_queue_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor} - queued"
+
+
+# Create, update or delete of a purchase order or vendor; the auto-increment id is the change feed cursor
+class ChangeLogEntry(models.Model):
+    OBJECT_TYPE_CHOICES = [
+        ('purchase_order', 'purchase_order'),
+        ('vendor', 'vendor'),
+    ]
+    ACTION_CHOICES = [
+        ('create', 'create'),
+        ('update', 'update'),
+        ('delete', 'delete'),
+    ]
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(db_index=True)
+
     def __str__(self):
-        return f"{self.vendor} - {self.date}"
\ No newline at end of file
+        return f"{self.object_type} {self.object_id} - {self.action}"
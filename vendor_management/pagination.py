@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+# Keyset pagination on the primary key, so page 10,000 costs the same index seek as page 1
+class IdCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
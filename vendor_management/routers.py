@@ -0,0 +1,141 @@
+import contextvars
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max
+from django.utils import timezone
+
+
+# Apps whose reads always go to the primary: a stale copy must never accept a revoked token or an old session
+PRIMARY_ONLY_APP_LABELS = {'auth', 'authtoken', 'sessions', 'contenttypes', 'admin'}
+
+# Models whose writes add no change log entry, so the change log lag cannot tell how stale a replica's copy is:
+# metric totals and buckets, the on-time cutoff, performance snapshots and the metrics queue are read from the primary
+PRIMARY_ONLY_MODELS = {
+    'vendor_management.vendormetricaggregate',
+    'vendor_management.vendordailymetrics',
+    'vendor_management.ontimecutoff',
+    'vendor_management.vendorperformancemetrics',
+    'vendor_management.vendormetricsqueueentry',
+}
+
+# Whether reads of the current request may go to a replica, and whether the request has written yet
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_request_wrote = contextvars.ContextVar('request_wrote', default=False)
+
+# Last measured lag of each replica: alias -> (monotonic time measured, lag in seconds or None when unreachable)
+_replica_lags = {}
+_replica_lags_lock = threading.Lock()
+
+
+# Function to return the replica aliases reads can be routed to
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+# Function to date the oldest primary change after a change log id: seconds since it, or 0 when there is none
+def change_log_lag(since_id, now=None):
+    from .models import ChangeLogEntry
+
+    # The change log orders every logged write, so the oldest entry missing from a copy dates how stale it is
+    oldest_missing = (
+        ChangeLogEntry.objects.using(DEFAULT_DB_ALIAS).filter(id__gt=since_id)
+        .order_by('id').values_list('changed_at', flat=True).first()
+    )
+    return 0.0 if oldest_missing is None else max(((now or timezone.now()) - oldest_missing).total_seconds(), 0.0)
+
+# Function to measure how far a replica is behind the primary, in seconds of primary changes it has not seen yet
+def measure_replica_lag(alias, now=None):
+    from .models import ChangeLogEntry
+
+    try:
+        replicated = ChangeLogEntry.objects.using(alias).aggregate(latest=Max('id'))['latest'] or 0
+    except DatabaseError:
+        # Never synced (no tables yet) or unreachable
+        return None
+    return change_log_lag(replicated, now)
+
+# Function to return a replica's lag, measured at most once every REPLICA_LAG_CHECK_INTERVAL seconds per process
+def replica_lag(alias):
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 1)
+    with _replica_lags_lock:
+        checked = _replica_lags.get(alias)
+    if checked is not None and time.monotonic() - checked[0] < interval:
+        return checked[1]
+    lag = measure_replica_lag(alias)
+    with _replica_lags_lock:
+        _replica_lags[alias] = (time.monotonic(), lag)
+    return lag
+
+# Function to forget the measured lags, so the next read checks again (after a sync, and in tests)
+def forget_replica_lags():
+    with _replica_lags_lock:
+        _replica_lags.clear()
+
+# Function to return the replicas close enough to the primary to serve reads
+def healthy_replicas():
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+    return [alias for alias in replica_aliases() if (lag := replica_lag(alias)) is not None and lag <= max_lag]
+
+# Context manager letting the reads inside it go to a replica (until the first write); returns a function telling whether a write happened
+@contextmanager
+def replica_reads(enabled=True):
+    reads_token = _replica_reads.set(enabled)
+    wrote_token = _request_wrote.set(False)
+    try:
+        yield _request_wrote.get
+    finally:
+        _replica_reads.reset(reads_token)
+        _request_wrote.reset(wrote_token)
+
+# Context manager sending the reads inside it to the primary, for computations whose results are cached or written back;
+# writes inside it are bookkeeping and do not pin the client to the primary
+@contextmanager
+def primary_reads():
+    with replica_reads(False):
+        yield
+
+# Function to copy the primary SQLite database into a replica file with the online backup API
+def sync_sqlite_replica(path, source=DEFAULT_DB_ALIAS):
+    connection = connections[source]
+    if connection.vendor != 'sqlite':
+        raise ValueError("Only SQLite primaries can be synced by file copy.")
+    connection.ensure_connection()
+    timeout = connection.settings_dict.get('OPTIONS', {}).get('timeout', 5)
+    with closing(sqlite3.connect(path, timeout=timeout)) as replica:
+        # Readers of the replica see the previous copy until the backup finishes, then the new one
+        connection.connection.backup(replica)
+    forget_replica_lags()
+
+
+# Database router sending reads of read-only requests to a healthy replica and everything else to the primary
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or model._meta.app_label in PRIMARY_ONLY_APP_LABELS or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return None
+        # Reads inside a transaction must see that transaction's own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes: once a request writes, the rest of it reads from the primary
+        _replica_reads.set(False)
+        _request_wrote.set(True)
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replica_aliases():
+            # An object read from a replica is written back to the primary
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary made by sync_replica, never migrated on their own
+        return db not in replica_aliases()
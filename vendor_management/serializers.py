@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from .models import *
+from .utils import VENDOR_METRIC_FIELDS
+from .fieldsets import SparseFieldsetSerializerMixin
+from .line_items import LINE_ITEM_GROUPINGS, LINE_ITEM_ORDERINGS
 
 # Serializer for Vendor model
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
         fields = '__all__'  # Serialize all fields of the Vendor model
@@ -14,14 +17,23 @@ class VendorSerializer(serializers.ModelSerializer):
             'fulfillment_rate': {'required': False},
         }
 
+    # Write back only the submitted fields, leaving out the metrics: once the vendor exists they are maintained from
+    # its purchase orders, and a client echoing stale values must not overwrite what concurrent PO writes stored
+    def update(self, instance, validated_data):
+        fields = [name for name in validated_data if name not in VENDOR_METRIC_FIELDS]
+        for name in fields:
+            setattr(instance, name, validated_data[name])
+        instance.save(update_fields=fields)
+        return instance
+
 # Serializer for VendorPerformanceMetrics model
-class VendorPerformanceMetricsSerializer(serializers.ModelSerializer):
+class VendorPerformanceMetricsSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = VendorPerformanceMetrics
         fields = '__all__'  # Serialize all fields of the VendorPerformanceMetrics model
 
 # Serializer for PurchaseOrder model
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = '__all__'  # Serialize all fields of the PurchaseOrder model
@@ -29,4 +41,81 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'quality_rating': {'required': False},
             'acknowledgment_date': {'required': False},
-        }
\ No newline at end of file
+        }
+
+# Vendor field that resolves primary keys from vendors preloaded for the whole batch
+class PreloadedVendorField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        vendors = self.context.get('vendors')
+        if vendors is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            vendor = vendors.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if vendor is None:
+            self.fail('does_not_exist', pk_value=data)
+        return vendor
+
+# Serializer for rows of a bulk purchase order ingest, validated without per-row queries
+class PurchaseOrderIngestSerializer(PurchaseOrderSerializer):
+    vendor = PreloadedVendorField(queryset=Vendor.objects.all())
+
+    class Meta(PurchaseOrderSerializer.Meta):
+        extra_kwargs = {
+            **PurchaseOrderSerializer.Meta.extra_kwargs,
+            # po_number uniqueness is checked once per batch by the ingest view
+            'po_number': {'validators': []},
+        }
+
+
+# Serializer for the query parameters of the performance history endpoint
+class VendorPerformanceHistoryQuerySerializer(serializers.Serializer):
+    to = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=['hour', 'day', 'week', 'month'], default='day')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" is a Python keyword, so it cannot be declared as a class attribute
+        fields['from'] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if 'from' in attrs and 'to' in attrs and attrs['from'] >= attrs['to']:
+            raise serializers.ValidationError({'from': ["Must be earlier than 'to'."]})
+        return attrs
+
+# Serializer for the body of the batch acknowledge endpoint: a list of ids or a list of po_numbers
+class PurchaseOrderBatchAcknowledgeSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, min_length=1, max_length=1000)
+    po_numbers = serializers.ListField(child=serializers.CharField(max_length=100), required=False, min_length=1, max_length=1000)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('po_numbers' in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'po_numbers'.")
+        return attrs
+
+# Serializer for the query parameters of the vendor leaderboard endpoint
+class VendorLeaderboardQuerySerializer(serializers.Serializer):
+    metric = serializers.ChoiceField(choices=VENDOR_METRIC_FIELDS)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    min_pos = serializers.IntegerField(min_value=1, default=1)
+
+# Serializer for the query parameters of the change feed endpoint
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500)
+    type = serializers.ChoiceField(choices=ChangeLogEntry.OBJECT_TYPE_CHOICES, required=False)
+
+# Serializer for the query parameters of the line item totals endpoint
+class LineItemSummaryQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=list(LINE_ITEM_GROUPINGS), default='sku')
+    ordering = serializers.ChoiceField(choices=LINE_ITEM_ORDERINGS, default='total_quantity')
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+# Serializer for the query parameters of the line item trend endpoint; the SKU is required so the query stays on an index
+class LineItemTrendQuerySerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=255)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month', 'quarter', 'year'], default='month')
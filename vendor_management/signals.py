@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from typing import Optional
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from .models import PurchaseOrder
+from .utils import METRIC_STATE_FIELDS, purchase_order_metric_state
+
+
+# A change of the metric fields of one purchase order; previous is None for a create and current is None for a delete
+@dataclass(frozen=True)
+class PurchaseOrderMetricChange:
+    purchase_order: PurchaseOrder
+    previous: Optional[dict]
+    current: Optional[dict]
+    changed_fields: frozenset
+    # The object whose deletion removed the purchase order (the PO itself, a queryset, or a vendor on cascade)
+    origin: object = None
+
+    @property
+    def vendor_ids(self):
+        return {state['vendor_id'] for state in (self.previous, self.current) if state is not None}
+
+
+# Sent with change=PurchaseOrderMetricChange only when a save or delete affects the vendor performance metrics
+purchase_order_metrics_changed = Signal()
+
+
+# Function to tell which metric fields a save with update_fields writes (None when it writes every field)
+def saved_metric_fields(update_fields):
+    if update_fields is None:
+        return None
+    return {'vendor_id' if name == 'vendor' else name for name in update_fields}.intersection(METRIC_STATE_FIELDS)
+
+# Signal handler to look up the stored metric fields of a purchase order that was not loaded from the database
+@receiver(pre_save, sender=PurchaseOrder)
+def capture_unloaded_metric_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or hasattr(instance, '_loaded_metric_state'):
+        return
+    if saved_metric_fields(update_fields) == set():
+        return
+    # Only instances built by hand or loaded with deferred metric fields get here; loaded ones cost no query
+    stored = PurchaseOrder.objects.filter(pk=instance.pk).values(*METRIC_STATE_FIELDS).first()
+    instance._loaded_metric_state = stored
+
+# Signal handler to send purchase_order_metrics_changed when a save created the PO or changed one of its metric fields
+@receiver(post_save, sender=PurchaseOrder)
+def detect_metric_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    saved = None if created else saved_metric_fields(update_fields)
+    if saved == set():
+        return
+    previous = None if created else getattr(instance, '_loaded_metric_state', None)
+    current = purchase_order_metric_state(instance, stored=previous)
+    if saved is not None and previous is not None:
+        # Fields left out of update_fields were not written, whatever the instance holds for them
+        current = {name: current[name] if name in saved else previous[name] for name in METRIC_STATE_FIELDS}
+    instance._loaded_metric_state = dict(current)
+    if previous is None:
+        changed_fields = frozenset(METRIC_STATE_FIELDS)
+    else:
+        changed_fields = frozenset(name for name in METRIC_STATE_FIELDS if previous[name] != current[name])
+        if not changed_fields:
+            return
+    purchase_order_metrics_changed.send(
+        sender=PurchaseOrder, change=PurchaseOrderMetricChange(instance, previous, current, changed_fields),
+    )
+
+# Signal handler to send purchase_order_metrics_changed for every deleted PO, with the state it had in the database
+@receiver(post_delete, sender=PurchaseOrder)
+def detect_metric_removal(sender, instance, origin=None, **kwargs):
+    previous = getattr(instance, '_loaded_metric_state', None) or purchase_order_metric_state(instance)
+    purchase_order_metrics_changed.send(
+        sender=PurchaseOrder,
+        change=PurchaseOrderMetricChange(instance, previous, None, frozenset(METRIC_STATE_FIELDS), origin),
+    )
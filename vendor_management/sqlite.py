@@ -0,0 +1,64 @@
+import logging
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger('vendor_management.db')
+
+# Write transactions retried after lock contention and those that still failed, since process start
+_lock_retry_stats = {'retries': 0, 'failures': 0}
+_lock_retry_stats_lock = threading.Lock()
+
+
+# Function to return the pragmas of a database: its own PRAGMAS entry, else the SQLITE_PRAGMAS setting
+def sqlite_pragmas(settings_dict):
+    pragmas = settings_dict.get('PRAGMAS')
+    return getattr(settings, 'SQLITE_PRAGMAS', {}) if pragmas is None else pragmas
+
+# Function to tell whether a database error is SQLite refusing a lock (SQLITE_BUSY or SQLITE_LOCKED)
+def is_lock_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message or 'database is busy' in message
+
+# Function to run a write transaction, retrying it with jittered exponential backoff while SQLite reports lock contention
+def run_with_lock_retry(func, using=None, attempts=None, delay=None):
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    attempts = attempts or getattr(settings, 'DATABASE_LOCK_RETRY_ATTEMPTS', 5)
+    delay = getattr(settings, 'DATABASE_LOCK_RETRY_DELAY', 0.05) if delay is None else delay
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as e:
+            # Only the outermost transaction can be retried; an inner block would rerun half of a rolled-back write
+            if connection.vendor != 'sqlite' or connection.in_atomic_block or not is_lock_error(e):
+                raise
+            with _lock_retry_stats_lock:
+                _lock_retry_stats['retries' if attempt < attempts - 1 else 'failures'] += 1
+            if attempt == attempts - 1:
+                raise
+            logger.info("Database locked, retrying write (attempt %d of %d)", attempt + 2, attempts)
+        time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+# Function to return the lock retry counters of this process
+def lock_retry_stats():
+    with _lock_retry_stats_lock:
+        return dict(_lock_retry_stats)
+
+
+# Signal handler to apply the configured pragmas to every new SQLite connection
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(sqlite_pragmas(connection.settings_dict))
+    if connection.is_in_memory_db():
+        # In-memory databases have no journal file to switch to WAL
+        pragmas.pop('journal_mode', None)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
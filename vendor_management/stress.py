@@ -0,0 +1,168 @@
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import connections, transaction
+from django.utils import timezone
+from .changes import record_changes
+from .line_items import create_line_items
+from .metrics import advance_on_time_cutoff, calculate_daily_totals, calculate_metric_totals_by_vendor, on_time_cutoff, recompute_vendor_metrics_now
+from .models import PurchaseOrder, Vendor, VendorDailyMetrics, VendorMetricAggregate
+from .serializers import VendorSerializer
+from .utils import METRIC_TOTAL_FIELDS, VENDOR_METRIC_FIELDS, metric_totals_match, metrics_from_totals, normalize_metric_totals
+
+
+# Transitions fired by the stress test and their relative weights; all but edit_items and edit_vendor move metrics
+# (advance_cutoff counts the delivery dates passed during the run as on time)
+STRESS_TRANSITIONS = {
+    'complete': 25,
+    'rate': 15,
+    'acknowledge': 15,
+    'reopen': 10,
+    'cancel': 10,
+    'reassign': 10,
+    'edit_items': 10,
+    'edit_vendor': 5,
+    'advance_cutoff': 5,
+}
+
+
+# Function to insert the vendors and pending purchase orders the stress test works on; returns their ids
+def create_stress_dataset(vendors, purchase_orders, rng, prefix='STRESS'):
+    run = uuid.uuid4().hex[:6]
+    now = timezone.now()
+    with transaction.atomic():
+        created_vendors = Vendor.objects.bulk_create([
+            Vendor(name=f'{prefix} Vendor {i}', contact_details=f'stress{i}@example.com', address='Stress Street', vendor_code=f'{prefix}-{run}-{i}')
+            for i in range(vendors)
+        ])
+        vendor_ids = [vendor.pk for vendor in created_vendors]
+        created_purchase_orders = []
+        for i in range(purchase_orders):
+            issue_date = now - timedelta(days=rng.uniform(1, 30))
+            created_purchase_orders.append(PurchaseOrder(
+                po_number=f'{prefix}-{run}-PO-{i}',
+                vendor_id=rng.choice(vendor_ids),
+                order_date=issue_date,
+                # Some delivery dates pass while the test runs, so on-time counts move under the concurrent writes
+                delivery_date=rng.choice([issue_date + timedelta(hours=rng.uniform(1, 24)), now + timedelta(seconds=rng.uniform(0, 10))]),
+                items=[{'name': 'SKU-1', 'quantity': 1}],
+                quantity=1,
+                issue_date=issue_date,
+            ))
+        purchase_order_ids = [purchase_order.pk for purchase_order in PurchaseOrder.objects.bulk_create(created_purchase_orders)]
+        create_line_items(created_purchase_orders)
+        record_changes('vendor', vendor_ids, 'create')
+        record_changes('purchase_order', purchase_order_ids, 'create')
+    recompute_vendor_metrics_now(vendor_ids)
+    return vendor_ids, purchase_order_ids
+
+# Function to apply one transition the way the API does: load the row, change it and save it
+def apply_transition(kind, purchase_order_id, vendor_ids, rng):
+    if kind == 'edit_vendor':
+        vendor = Vendor.objects.get(pk=rng.choice(vendor_ids))
+        # A full PUT echoing the metrics as loaded, like a client editing the vendor it just fetched
+        serializer = VendorSerializer(vendor, data={**VendorSerializer(vendor).data, 'address': f'{rng.randint(1, 999)} Stress Street'})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return
+    if kind == 'advance_cutoff':
+        advance_on_time_cutoff()
+        return
+
+    purchase_order = PurchaseOrder.objects.get(pk=purchase_order_id)
+    if kind == 'complete':
+        purchase_order.status = 'completed'
+        purchase_order.quality_rating = rng.choice([None, round(rng.uniform(1, 5), 1)])
+    elif kind == 'rate':
+        purchase_order.quality_rating = round(rng.uniform(0, 5), 1)
+    elif kind == 'acknowledge':
+        purchase_order.acknowledgment_date = purchase_order.issue_date + timedelta(hours=rng.uniform(0.5, 72))
+    elif kind == 'reopen':
+        purchase_order.status = 'pending'
+    elif kind == 'cancel':
+        purchase_order.status = 'canceled'
+    elif kind == 'reassign':
+        purchase_order.vendor_id = rng.choice(vendor_ids)
+    else:
+        purchase_order.quantity = rng.randint(1, 500)
+    purchase_order.save()
+
+# Function to run a share of the transitions on a worker thread; failed transitions roll back and are counted
+def run_transitions(plan, vendor_ids):
+    errors = Counter()
+    try:
+        for kind, purchase_order_id, seed in plan:
+            try:
+                apply_transition(kind, purchase_order_id, vendor_ids, random.Random(seed))
+            except Exception as e:
+                errors[f'{type(e).__name__}: {e}'] += 1
+    finally:
+        connections.close_all()
+    return errors
+
+# Function to check the stored totals, daily buckets and vendor metrics of vendors against a full recompute,
+# after moving the on-time cutoff up to now
+def find_metric_mismatches(vendor_ids):
+    advance_on_time_cutoff()
+    cutoff = on_time_cutoff()
+    zero = normalize_metric_totals({})
+    mismatches = []
+
+    expected = calculate_metric_totals_by_vendor(vendor_ids, cutoff)
+    stored = {
+        row.pop('vendor_id'): row
+        for row in VendorMetricAggregate.objects.filter(vendor_id__in=vendor_ids).values('vendor_id', *METRIC_TOTAL_FIELDS)
+    }
+    vendors = {row.pop('id'): row for row in Vendor.objects.filter(pk__in=vendor_ids).values('id', *VENDOR_METRIC_FIELDS)}
+    for vendor_id in sorted(expected):
+        totals = stored.get(vendor_id, zero)
+        if not metric_totals_match(totals, expected[vendor_id]):
+            mismatches.append({'vendor': vendor_id, 'day': None, 'check': 'totals'})
+        # The vendor row must hold the metrics of its stored totals, whatever vendor updates happened meanwhile
+        if vendors[vendor_id] != metrics_from_totals(totals):
+            mismatches.append({'vendor': vendor_id, 'day': None, 'check': 'metrics'})
+
+    expected_daily = calculate_daily_totals(vendor_ids, cutoff)
+    stored_daily = {
+        (row.pop('vendor_id'), row.pop('day')): row
+        for row in VendorDailyMetrics.objects.filter(vendor_id__in=vendor_ids).values('vendor_id', 'day', *METRIC_TOTAL_FIELDS)
+    }
+    for vendor_id, day in sorted(set(expected_daily) | set(stored_daily)):
+        if not metric_totals_match(stored_daily.get((vendor_id, day), zero), expected_daily.get((vendor_id, day), zero)):
+            mismatches.append({'vendor': vendor_id, 'day': day.isoformat(), 'check': 'daily'})
+    return mismatches
+
+# Function to fire concurrent purchase order transitions at a few vendors and check the metrics against a recompute
+def run_stress_test(transitions=2000, threads=8, vendors=5, purchase_orders=50, seed=None, prefix='STRESS', keep=False):
+    rng = random.Random(seed)
+    vendor_ids, purchase_order_ids = create_stress_dataset(vendors, purchase_orders, rng, prefix)
+    # Few purchase orders and vendors for many threads, so the same rows are written concurrently all the time
+    kinds = rng.choices(list(STRESS_TRANSITIONS), weights=list(STRESS_TRANSITIONS.values()), k=transitions)
+    plan = [(kind, rng.choice(purchase_order_ids), rng.getrandbits(32)) for kind in kinds]
+
+    started = time.perf_counter()
+    errors = Counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for thread_errors in executor.map(run_transitions, [plan[i::threads] for i in range(threads)], [vendor_ids] * threads):
+            errors.update(thread_errors)
+    elapsed = time.perf_counter() - started
+
+    mismatches = find_metric_mismatches(vendor_ids)
+    if not keep:
+        Vendor.objects.filter(pk__in=vendor_ids).delete()
+    failed = sum(errors.values())
+    return {
+        'transitions': transitions,
+        'threads': threads,
+        'vendors': vendors,
+        'purchase_orders': purchase_orders,
+        'applied': transitions - failed,
+        'failed': failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'transitions_per_second': round((transitions - failed) / elapsed, 1) if elapsed else None,
+        'errors': dict(errors.most_common()),
+        'mismatches': mismatches,
+    }
@@ -0,0 +1,15 @@
+from contextlib import contextmanager
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+# Mixin for test cases that assert an upper bound on the SQL queries a block of code may run
+class QueryBudgetMixin:
+    @contextmanager
+    def assertQueryBudget(self, budget, using='default'):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, start=1))
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{queries}")
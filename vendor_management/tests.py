@@ -1,12 +1,44 @@
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APIClient
 from .models import *
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from .utils import *
+from .authentication import CachedTokenAuthentication, _local_tokens, clear_local_token_cache
+from .caching import get_cached_performance, performance_cache_stats, set_cached_performance
+from .metrics import advance_on_time_cutoff, calculate_daily_totals, calculate_metric_totals_by_vendor, on_time_cutoff, rebuild_daily_buckets
+from .signals import purchase_order_metrics_changed
+from .middleware import percentile, reset_route_timings
+from .analytics import fleet_report
+from .testing import QueryBudgetMixin
+from .admin import CappedCountPaginator, PurchaseOrderAdmin
+from .line_items import line_item_totals
+from .sqlite import lock_retry_stats, run_with_lock_retry
+from .routers import change_log_lag, forget_replica_lags, healthy_replicas, measure_replica_lag, replica_reads, sync_sqlite_replica
+from .benchmark import benchmark_scenarios
+from . import urls
+from .metrics_queue import drain_vendor_metrics_queue, process_vendor_metrics_batch, vendor_metrics_queue_stats
 from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import EmptyPage
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connection, connections, router, transaction
+from unittest import mock
+from django.test.utils import CaptureQueriesContext
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from contextlib import closing
+from io import StringIO
+import csv
+import os
+import random
+import json
+import sqlite3
+import tempfile
 
 class VendorModelTestCase(TestCase):
     def setUp(self):
@@ -344,4 +376,1893 @@ class PurchaseOrderListCreateAPIViewTestCase(TestCase):
             # Missing required fields
         }
         response = self.client.post(url, invalid_data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class VendorMetricAggregateTestCase(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='other@example.com', address='Other Address', vendor_code='TEST002')
+        self.now = timezone.now()
+
+    def create_purchase_order(self, po_number, **kwargs):
+        data = {
+            'po_number': po_number,
+            'vendor': self.vendor,
+            'order_date': self.now - timedelta(days=10),
+            'delivery_date': self.now - timedelta(days=1),
+            'items': [{'name': 'Item', 'quantity': 1}],
+            'quantity': 1,
+            'status': 'pending',
+            'issue_date': self.now - timedelta(days=10),
+        }
+        data.update(kwargs)
+        return PurchaseOrder.objects.create(**data)
+
+    def assertMetricsMatchHelpers(self, vendor):
+        # The incrementally maintained metrics must equal a full recalculation
+        vendor.refresh_from_db()
+        self.assertEqual(vendor.on_time_delivery_rate, calculate_on_time_delivery_rate(vendor))
+        self.assertEqual(vendor.quality_rating_avg, calculate_quality_rating_avg(vendor))
+        self.assertEqual(vendor.average_response_time, calculate_average_response_time(vendor))
+        self.assertEqual(vendor.fulfillment_rate, calculate_fulfillment_rate(vendor))
+
+    def test_metrics_follow_purchase_order_writes(self):
+        self.create_purchase_order('PO-1')
+        completed = self.create_purchase_order('PO-2', status='completed', quality_rating=4, acknowledgment_date=self.now - timedelta(days=9, hours=6))
+        self.create_purchase_order('PO-3', status='completed', delivery_date=self.now + timedelta(days=3))
+        self.assertMetricsMatchHelpers(self.vendor)
+        self.assertEqual(self.vendor.metric_aggregate.total_pos, 3)
+        self.assertEqual(self.vendor.metric_aggregate.completed_pos, 2)
+
+        # Rating change, status rollback and deletion are all applied as deltas
+        completed.quality_rating = 2.5
+        completed.save()
+        self.assertMetricsMatchHelpers(self.vendor)
+        completed.status = 'pending'
+        completed.save()
+        self.assertMetricsMatchHelpers(self.vendor)
+        completed.delete()
+        self.assertMetricsMatchHelpers(self.vendor)
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).total_pos, 2)
+
+    def test_reassigned_purchase_order_moves_between_vendors(self):
+        purchase_order = self.create_purchase_order('PO-1', status='completed', acknowledgment_date=self.now - timedelta(days=8))
+        purchase_order.vendor = self.other_vendor
+        purchase_order.save()
+        self.assertMetricsMatchHelpers(self.vendor)
+        self.assertMetricsMatchHelpers(self.other_vendor)
+        self.assertEqual(self.vendor.metric_aggregate.total_pos, 0)
+        self.assertEqual(self.other_vendor.metric_aggregate.acknowledged_pos, 1)
+
+    def test_irrelevant_edit_leaves_totals_untouched(self):
+        purchase_order = self.create_purchase_order('PO-1', status='completed', quality_rating=5)
+        purchase_order.quantity = 20
+        with self.assertNumQueries(2):
+            # Only the PO update itself and its change log entry
+            purchase_order.save()
+
+    def test_rebuild_command_repairs_drifted_totals(self):
+        self.create_purchase_order('PO-1', status='completed', quality_rating=3, acknowledgment_date=self.now - timedelta(days=9))
+        VendorMetricAggregate.objects.filter(vendor=self.vendor).update(completed_pos=7, rated_pos=0)
+        stderr = StringIO()
+        # The drift is reported, not hidden by the rebuild
+        with self.assertRaisesMessage(CommandError, '1 vendor(s) had stored totals'):
+            call_command('rebuild_vendor_aggregates', '--check', stdout=StringIO(), stderr=stderr)
+        self.assertIn(f'Vendor {self.vendor.pk}: stored totals', stderr.getvalue())
+        call_command('rebuild_vendor_aggregates', '--check', stdout=StringIO(), stderr=StringIO())
+        aggregate = VendorMetricAggregate.objects.get(vendor=self.vendor)
+        self.assertEqual(aggregate.completed_pos, 1)
+        self.assertEqual(aggregate.rated_pos, 1)
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_future_delivery_dates_count_as_on_time_once_the_cutoff_passes_them(self):
+        purchase_order = self.create_purchase_order('PO-1', status='completed', delivery_date=self.now + timedelta(days=3))
+        self.create_purchase_order('PO-2', status='completed', delivery_date=self.now + timedelta(days=10))
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).on_time_pos, 0)
+
+        self.assertEqual(advance_on_time_cutoff(self.now + timedelta(days=5)), 1)
+        self.assertEqual(on_time_cutoff(), self.now + timedelta(days=5))
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).on_time_pos, 1)
+        bucket = VendorDailyMetrics.objects.get(vendor=self.vendor)
+        self.assertEqual((bucket.completed_pos, bucket.on_time_pos), (2, 1))
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.on_time_delivery_rate, 50)
+
+        # Writes after the move are counted against the new cutoff, and a cutoff never moves back
+        purchase_order.status = 'pending'
+        purchase_order.save()
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).on_time_pos, 0)
+        self.assertEqual(advance_on_time_cutoff(self.now), 0)
+        self.assertEqual(on_time_cutoff(), self.now + timedelta(days=5))
+        self.assertEqual(
+            VendorMetricAggregate.objects.filter(vendor=self.vendor).values(*METRIC_TOTAL_FIELDS).get(),
+            calculate_metric_totals_by_vendor([self.vendor.pk], on_time_cutoff())[self.vendor.pk],
+        )
+
+    def test_advance_command(self):
+        self.create_purchase_order('PO-1', status='completed', delivery_date=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).on_time_pos, 0)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=2)):
+            stdout = StringIO()
+            call_command('advance_on_time_cutoff', stdout=stdout)
+        self.assertIn('Counted 1 purchase order(s) as on time', stdout.getvalue())
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).on_time_pos, 1)
+
+    def test_vendor_delete_cascades_cleanly(self):
+        self.create_purchase_order('PO-1', status='completed')
+        self.vendor.delete()
+        self.assertFalse(VendorMetricAggregate.objects.filter(vendor_id=self.vendor.pk).exists())
+
+
+class CalculateVendorMetricsTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.vendors = [
+            Vendor.objects.create(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'RAND{i:03}')
+            for i in range(4)
+        ]
+
+    def create_random_purchase_orders(self, rng, count):
+        # Random mix of statuses, ratings, acknowledgments and delivery dates around now
+        for i in range(count):
+            issue_date = self.now - timedelta(days=rng.randint(1, 60), seconds=rng.randint(0, 86399), microseconds=rng.randint(0, 999999))
+            acknowledged = rng.random() < 0.7
+            PurchaseOrder.objects.create(
+                po_number=f'PO-RAND-{i}',
+                vendor=rng.choice(self.vendors[:3]),
+                order_date=issue_date,
+                delivery_date=self.now + timedelta(days=rng.randint(-30, 30), seconds=rng.randint(0, 86399)),
+                items=[{'name': 'Item', 'quantity': 1}],
+                quantity=rng.randint(1, 50),
+                status=rng.choice(['pending', 'completed', 'completed', 'canceled']),
+                quality_rating=round(rng.uniform(0, 5), 1) if rng.random() < 0.6 else None,
+                issue_date=issue_date,
+                acknowledgment_date=issue_date + timedelta(seconds=rng.randint(60, 5 * 86400), microseconds=rng.randint(0, 999999)) if acknowledged else None,
+            )
+
+    def test_matches_calculate_helpers_on_random_data(self):
+        for seed in range(5):
+            PurchaseOrder.objects.all().delete()
+            self.create_random_purchase_orders(random.Random(seed), 80)
+            for vendor in self.vendors:
+                expected = {
+                    'on_time_delivery_rate': calculate_on_time_delivery_rate(vendor),
+                    'quality_rating_avg': calculate_quality_rating_avg(vendor),
+                    'average_response_time': calculate_average_response_time(vendor),
+                    'fulfillment_rate': calculate_fulfillment_rate(vendor),
+                }
+                self.assertEqual(calculate_vendor_metrics(vendor), expected, f'seed {seed}, vendor {vendor.pk}')
+
+    def test_single_query(self):
+        self.create_random_purchase_orders(random.Random(42), 20)
+        with self.assertNumQueries(1):
+            calculate_vendor_metrics(self.vendors[0])
+
+    def test_vendor_without_purchase_orders(self):
+        self.assertEqual(calculate_vendor_metrics(self.vendors[3]), {
+            'on_time_delivery_rate': 0,
+            'quality_rating_avg': 0,
+            'average_response_time': 0,
+            'fulfillment_rate': 0,
+        })
+
+
+class PurchaseOrderDirtyTrackingTestCase(TestCase):
+    create_purchase_order = VendorMetricAggregateTestCase.create_purchase_order
+    assertMetricsMatchHelpers = VendorMetricAggregateTestCase.assertMetricsMatchHelpers
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.now = timezone.now()
+        self.changes = []
+        receiver = lambda sender, change, **kwargs: self.changes.append(change)
+        purchase_order_metrics_changed.connect(receiver, sender=PurchaseOrder, weak=False)
+        self.addCleanup(purchase_order_metrics_changed.disconnect, receiver, sender=PurchaseOrder)
+
+    def test_only_metric_fields_send_the_event(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        self.assertEqual(self.changes[-1].previous, None)
+        loaded = PurchaseOrder.objects.get(pk=purchase_order.pk)
+        loaded.items = [{'name': 'Other', 'quantity': 2}]
+        loaded.quantity = 2
+        loaded.save()
+        self.assertEqual(len(self.changes), 1)
+        loaded.status = 'completed'
+        loaded.quality_rating = 4
+        loaded.save()
+        change = self.changes[-1]
+        self.assertEqual(change.changed_fields, {'status', 'quality_rating'})
+        self.assertEqual((change.previous['status'], change.current['status']), ('pending', 'completed'))
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_status_rollback_and_deletes(self):
+        purchase_order = self.create_purchase_order('PO-1', status='completed', quality_rating=5, acknowledgment_date=self.now)
+        self.create_purchase_order('PO-2', status='completed', quality_rating=1)
+        purchase_order.status = 'pending'
+        purchase_order.save()
+        self.assertMetricsMatchHelpers(self.vendor)
+        purchase_order.delete()
+        self.assertEqual(self.changes[-1].current, None)
+        self.assertMetricsMatchHelpers(self.vendor)
+        PurchaseOrder.objects.filter(vendor=self.vendor).delete()
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_unloaded_instances_look_up_their_stored_state(self):
+        purchase_order = self.create_purchase_order('PO-1', status='completed', quality_rating=5)
+        # A hand-built instance and one loaded with deferred metric fields both need the stored values once
+        rebuilt = PurchaseOrder(**{field.attname: getattr(purchase_order, field.attname) for field in PurchaseOrder._meta.concrete_fields})
+        rebuilt.quality_rating = 2
+        rebuilt.save()
+        self.assertEqual(self.changes[-1].previous['quality_rating'], 5)
+        deferred = PurchaseOrder.objects.only('id', 'po_number').get(pk=purchase_order.pk)
+        deferred.quantity = 3
+        with self.assertNumQueries(2):
+            # The update and its change log entry; no metric field is saved, so the stored ones are not needed
+            deferred.save(update_fields=['quantity'])
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_update_fields_limit_the_compared_fields(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        count = len(self.changes)
+        # Changed in memory but not saved: the row stays pending and unrated
+        purchase_order.status = 'completed'
+        purchase_order.quality_rating = 3
+        purchase_order.quantity = 2
+        purchase_order.save(update_fields=['quantity'])
+        self.assertEqual(len(self.changes), count)
+        self.assertMetricsMatchHelpers(self.vendor)
+        purchase_order.save(update_fields=['status'])
+        change = self.changes[-1]
+        self.assertEqual(change.changed_fields, {'status'})
+        self.assertEqual(change.current['quality_rating'], None)
+        self.assertMetricsMatchHelpers(self.vendor)
+        purchase_order.save()
+        self.assertEqual(self.changes[-1].changed_fields, {'quality_rating'})
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_refresh_from_db_resets_the_tracked_state(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        PurchaseOrder.objects.filter(pk=purchase_order.pk).update(status='completed')
+        purchase_order.refresh_from_db()
+        count = len(self.changes)
+        purchase_order.save()
+        self.assertEqual(len(self.changes), count)
+
+
+class ConcurrentMetricWritesTestCase(TestCase):
+    create_purchase_order = VendorMetricAggregateTestCase.create_purchase_order
+    assertMetricsMatchHelpers = VendorMetricAggregateTestCase.assertMetricsMatchHelpers
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='other@example.com', address='Other Address', vendor_code='TEST002')
+        self.now = timezone.now()
+
+    def assertBucketsMatchPurchaseOrders(self):
+        expected = calculate_daily_totals([self.vendor.pk, self.other_vendor.pk])
+        stored = {
+            (row.pop('vendor_id'), row.pop('day')): row
+            for row in VendorDailyMetrics.objects.values('vendor_id', 'day', *METRIC_TOTAL_FIELDS)
+        }
+        for key, totals in stored.items():
+            self.assertEqual(totals, expected.get(key, normalize_metric_totals({})))
+
+    def test_stale_instance_replaces_the_stored_state(self):
+        purchase_order = self.create_purchase_order('PO-1', acknowledgment_date=self.now - timedelta(days=9))
+        first = PurchaseOrder.objects.get(pk=purchase_order.pk)
+        second = PurchaseOrder.objects.get(pk=purchase_order.pk)
+        first.status = 'completed'
+        first.quality_rating = 4
+        first.save()
+        # second was loaded before the completion; its save must take the completed PO off the vendor, not a pending one
+        second.vendor = self.other_vendor
+        second.save()
+        self.assertMetricsMatchHelpers(self.vendor)
+        self.assertMetricsMatchHelpers(self.other_vendor)
+        self.assertEqual(self.vendor.metric_aggregate.completed_pos, 0)
+        self.assertBucketsMatchPurchaseOrders()
+
+    def test_stale_instance_delete_removes_the_stored_state(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        stale = PurchaseOrder.objects.get(pk=purchase_order.pk)
+        purchase_order.vendor = self.other_vendor
+        purchase_order.status = 'completed'
+        purchase_order.save()
+        stale.delete()
+        self.assertMetricsMatchHelpers(self.vendor)
+        self.assertMetricsMatchHelpers(self.other_vendor)
+        self.assertEqual(self.other_vendor.metric_aggregate.total_pos, 0)
+        self.assertBucketsMatchPurchaseOrders()
+
+    def test_failed_metric_update_rolls_back_the_save(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        purchase_order.status = 'completed'
+        with mock.patch('vendor_management.views.record_purchase_order_changes', side_effect=DatabaseError('deadlock detected')):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                purchase_order.save()
+        self.assertEqual(PurchaseOrder.objects.get(pk=purchase_order.pk).status, 'pending')
+        self.assertMetricsMatchHelpers(self.vendor)
+
+    def test_vendor_update_leaves_the_metrics_alone(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='testuser', password='password'))
+        url = reverse('vendor-retrieve-update-destroy', args=[self.vendor.pk])
+        loaded = client.get(url).data
+        self.create_purchase_order('PO-1', status='completed')
+        # A PUT echoing the metrics read before the completion must not overwrite them
+        response = client.put(url, {**loaded, 'name': 'Renamed Vendor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.name, 'Renamed Vendor')
+        self.assertEqual(self.vendor.fulfillment_rate, 100)
+        self.assertMetricsMatchHelpers(self.vendor)
+
+
+class StressMetricsCommandTestCase(TransactionTestCase):
+    def test_concurrent_transitions_match_a_full_recompute(self):
+        out = StringIO()
+        # Raises CommandError on any mismatch between the maintained and recomputed metrics
+        call_command('stress_metrics', '--transitions', '60', '--threads', '3', '--vendors', '2', '--purchase-orders', '6', '--seed', '7', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['mismatches'], [])
+        self.assertGreater(report['applied'], 0)
+        self.assertFalse(Vendor.objects.exists())
+
+
+class RecomputeVendorMetricsCommandTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.vendors = [
+            Vendor.objects.create(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'BULK{i:03}')
+            for i in range(5)
+        ]
+        for i, vendor in enumerate(self.vendors[:4]):
+            PurchaseOrder.objects.create(
+                po_number=f'PO-BULK-{i}', vendor=vendor, order_date=now, delivery_date=now - timedelta(hours=1),
+                items=[], quantity=1, status='completed', quality_rating=i, issue_date=now - timedelta(hours=i + 1),
+                acknowledgment_date=now,
+            )
+        # Simulate stale metrics and aggregates written outside the ORM
+        Vendor.objects.update(on_time_delivery_rate=0, quality_rating_avg=0, average_response_time=0, fulfillment_rate=0)
+        VendorMetricAggregate.objects.all().delete()
+
+    def test_recompute_all_vendors(self):
+        out = StringIO()
+        call_command('recompute_vendor_metrics', '--chunk-size', '2', '--snapshots', stdout=out)
+        self.assertIn('5 vendor(s)', out.getvalue())
+        self.assertIn('purchase orders/s', out.getvalue())
+        for vendor in self.vendors:
+            vendor.refresh_from_db()
+            self.assertEqual(
+                [vendor.on_time_delivery_rate, vendor.quality_rating_avg, vendor.average_response_time, vendor.fulfillment_rate],
+                list(calculate_vendor_metrics(vendor).values()),
+            )
+        self.assertEqual(VendorMetricAggregate.objects.count(), 5)
+        self.assertEqual(VendorPerformanceMetrics.objects.count(), 5)
+        self.assertEqual(Vendor.objects.get(pk=self.vendors[3].pk).average_response_time, 4)
+
+    def test_query_count_is_independent_of_vendor_count(self):
+        # Vendor ids, then per chunk: savepoint, totals lock, on-time cutoff, grouped aggregate, stored metrics and
+        # aggregates, vendor bulk update, change log insert, aggregate bulk create and savepoint release
+        with self.assertNumQueries(10):
+            call_command('recompute_vendor_metrics', '--chunk-size', '10', stdout=StringIO())
+
+    def test_only_changed_vendors_are_logged(self):
+        before = ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first()
+        call_command('recompute_vendor_metrics', stdout=StringIO())
+        # The vendor without purchase orders already had zero metrics
+        logged = set(ChangeLogEntry.objects.filter(id__gt=before, object_type='vendor').values_list('object_id', flat=True))
+        self.assertEqual(logged, {vendor.pk for vendor in self.vendors[:4]})
+        before = ChangeLogEntry.objects.count()
+        call_command('recompute_vendor_metrics', stdout=StringIO())
+        self.assertEqual(ChangeLogEntry.objects.count(), before)
+        self.assertEqual(VendorMetricAggregate.objects.count(), 5)
+
+
+class RecomputeVendorMetricsWorkersTestCase(TransactionTestCase):
+    def test_parallel_workers(self):
+        now = timezone.now()
+        vendors = [
+            Vendor.objects.create(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'PAR{i:03}')
+            for i in range(6)
+        ]
+        for i, vendor in enumerate(vendors):
+            PurchaseOrder.objects.create(
+                po_number=f'PO-PAR-{i}', vendor=vendor, order_date=now, delivery_date=now, items=[], quantity=1,
+                status='completed', issue_date=now,
+            )
+        Vendor.objects.update(fulfillment_rate=0)
+        call_command('recompute_vendor_metrics', '--chunk-size', '2', '--workers', '3', stdout=StringIO())
+        self.assertEqual(set(Vendor.objects.values_list('fulfillment_rate', flat=True)), {100})
+
+    def test_totals_are_read_inside_the_write_transaction(self):
+        # Totals read outside the transaction that writes them would overwrite any PO delta committed in between
+        vendor = Vendor.objects.create(name='Vendor', contact_details='test@example.com', address='Test Address', vendor_code='PAR000')
+        calculate_totals = calculate_metric_totals_by_vendor
+        read_in_transaction = []
+
+        def calculate(vendor_ids, now=None):
+            read_in_transaction.append(connection.in_atomic_block)
+            return calculate_totals(vendor_ids, now)
+
+        with mock.patch('vendor_management.metrics.calculate_metric_totals_by_vendor', side_effect=calculate):
+            call_command('recompute_vendor_metrics', stdout=StringIO())
+        self.assertEqual(read_in_transaction, [True])
+        self.assertTrue(VendorMetricAggregate.objects.filter(vendor=vendor).exists())
+
+
+class PurchaseOrderBulkIngestAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.url = reverse('purchase-order-bulk-ingest')
+
+    def row(self, po_number, **kwargs):
+        data = {
+            'po_number': po_number,
+            'vendor': self.vendor.pk,
+            'order_date': '2024-04-30T12:00:00Z',
+            'delivery_date': '2024-05-05T12:00:00Z',
+            'items': [{'name': 'Item', 'quantity': 2}],
+            'quantity': 2,
+            'status': 'completed',
+            'issue_date': '2024-04-30T12:00:00Z',
+            'acknowledgment_date': '2024-04-30T14:00:00Z',
+        }
+        data.update(kwargs)
+        return data
+
+    def test_json_array(self):
+        rows = [self.row(f'PO-{i}') for i in range(5)]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(response.data['failed'], 0)
+        self.assertIn('rows_per_second', response.data)
+        # Metrics take the rows as deltas even though bulk_create bypasses the signals
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.average_response_time, 2)
+        self.assertEqual(self.vendor.fulfillment_rate, 100)
+        self.assertEqual(self.vendor.metric_aggregate.total_pos, 5)
+
+    def test_rows_are_applied_as_deltas(self):
+        other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='other@example.com', address='Other Address', vendor_code='TEST002')
+        PurchaseOrder.objects.create(**{**self.row('PO-EXISTING', quality_rating=2), 'vendor': self.vendor})
+        rows = [self.row('PO-1', quality_rating=4), self.row('PO-2', status='pending'), self.row('PO-3', vendor=other_vendor.pk, issue_date='2024-05-01T12:00:00Z')]
+        with mock.patch('vendor_management.metrics.rebuild_daily_buckets', wraps=rebuild_daily_buckets) as rebuild, \
+                mock.patch('vendor_management.metrics.recompute_vendor_chunk') as recompute:
+            self.assertEqual(self.client.post(self.url, rows, format='json').data['created'], 3)
+        # Nothing is recomputed from scratch; only the bucket that did not exist yet is built, for its one day
+        self.assertFalse(recompute.called)
+        self.assertEqual([call.kwargs['day'] for call in rebuild.call_args_list], [date(2024, 5, 1)])
+        vendor_ids = [self.vendor.pk, other_vendor.pk]
+        self.assertEqual(
+            {row.pop('vendor_id'): row for row in VendorMetricAggregate.objects.filter(vendor_id__in=vendor_ids).values('vendor_id', *METRIC_TOTAL_FIELDS)},
+            calculate_metric_totals_by_vendor(vendor_ids),
+        )
+        self.assertEqual(
+            {(row.pop('vendor_id'), row.pop('day')): row for row in VendorDailyMetrics.objects.values('vendor_id', 'day', *METRIC_TOTAL_FIELDS)},
+            calculate_daily_totals(vendor_ids),
+        )
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.quality_rating_avg, 3)
+
+    def test_ndjson_reports_row_errors(self):
+        PurchaseOrder.objects.create(**{**self.row('PO-EXISTING'), 'vendor': self.vendor})
+        lines = [
+            json.dumps(self.row('PO-1')),
+            json.dumps(self.row('PO-EXISTING')),
+            '{not json',
+            json.dumps(self.row('PO-1')),
+            json.dumps(self.row('PO-2', vendor=99999)),
+            json.dumps(self.row('PO-3', quantity=0)),
+            json.dumps(self.row('PO-4')),
+        ]
+        response = self.client.post(self.url + '?batch_size=3', '\n'.join(lines), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rows'], 7)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4, 5, 6])
+        self.assertIn('po_number', response.data['errors'][0]['errors'])
+        self.assertIn('vendor', response.data['errors'][3]['errors'])
+        self.assertIn('quantity', response.data['errors'][4]['errors'])
+        self.assertEqual(PurchaseOrder.objects.count(), 3)
+
+    def test_csv(self):
+        body = (
+            'po_number,vendor,order_date,delivery_date,items,quantity,status,quality_rating,issue_date,acknowledgment_date\n'
+            f'PO-1,{self.vendor.pk},2024-04-30T12:00:00Z,2024-05-05T12:00:00Z,"[{{""name"": ""Item""}}]",1,completed,4,2024-04-30T12:00:00Z,\n'
+            f'PO-2,{self.vendor.pk},2024-04-30T12:00:00Z,2024-05-05T12:00:00Z,[],1,pending,,2024-04-30T12:00:00Z,\n'
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(PurchaseOrder.objects.get(po_number='PO-1').items, [{'name': 'Item'}])
+        self.assertIsNone(PurchaseOrder.objects.get(po_number='PO-2').quality_rating)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.quality_rating_avg, 4)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def ingest(prefix, count):
+            rows = [self.row(f'{prefix}-{i}') for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(self.url, rows, format='json')
+            return len(queries)
+        # The first request also looks up (and caches) the token
+        ingest('W', 1)
+        self.assertEqual(ingest('A', 2), ingest('B', 50))
+
+    def test_invalid_body(self):
+        response = self.client.post(self.url, {'po_number': 'PO-1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, 'x', content_type='text/plain')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ListPaginationAndFilteringTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='other@example.com', address='Other Address', vendor_code='TEST002')
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        for i in range(12):
+            PurchaseOrder.objects.create(
+                po_number=f'PO-{i:02}', vendor=self.vendor if i % 3 else self.other_vendor,
+                order_date=start + timedelta(days=i), delivery_date=start + timedelta(days=i + 5),
+                items=[], quantity=1, status='completed' if i % 2 else 'pending', issue_date=start + timedelta(days=i),
+            )
+        self.url = reverse('purchase-order-list-create')
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        seen = []
+        url = self.url + '?page_size=5'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 5)
+            seen.extend(row['po_number'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [f'PO-{i:02}' for i in reversed(range(12))])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {'vendor': self.vendor.pk, 'status': 'completed'})
+        self.assertEqual({row['po_number'] for row in response.data['results']}, {'PO-01', 'PO-05', 'PO-07', 'PO-11'})
+        response = self.client.get(self.url, {'order_date_after': '2024-01-03T00:00:00Z', 'order_date_before': '2024-01-05T00:00:00Z'})
+        self.assertEqual({row['po_number'] for row in response.data['results']}, {'PO-02', 'PO-03'})
+        response = self.client.get(self.url, {'delivery_date_after': '2024-01-16T00:00:00Z'})
+        self.assertEqual({row['po_number'] for row in response.data['results']}, {'PO-10', 'PO-11'})
+
+    def test_invalid_filter_values(self):
+        response = self.client.get(self.url, {'status': 'shipped', 'order_date_after': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data)
+        self.assertIn('order_date_after', response.data)
+
+    def test_vendor_list_is_paginated(self):
+        response = self.client.get(reverse('vendor-list-create'), {'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+
+class VendorPerformanceCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.url = reverse('vendor-performance', args=[self.vendor.pk])
+        now = timezone.now()
+        self.purchase_order = PurchaseOrder.objects.create(
+            po_number='PO-001', vendor=self.vendor, order_date=now, delivery_date=now, items=[], quantity=1,
+            status='completed', quality_rating=4, issue_date=now,
+        )
+
+    def test_repeated_reads_hit_the_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.data['quality_rating_avg'], 4)
+        with self.assertNumQueries(0):
+            # The token is cached too; no metric queries and no snapshot insert
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(VendorPerformanceMetrics.objects.count(), 1)
+        self.assertEqual(performance_cache_stats()['hits'], 1)
+        self.assertEqual(performance_cache_stats()['misses'], 1)
+
+    def test_purchase_order_write_invalidates(self):
+        self.client.get(self.url)
+        self.purchase_order.quality_rating = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            self.purchase_order.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['quality_rating_avg'], 2)
+        self.assertEqual(VendorPerformanceMetrics.objects.count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.purchase_order.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['quality_rating_avg'], 0)
+
+    def test_read_during_the_write_is_invalidated_on_commit(self):
+        stale = self.client.get(self.url).data
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.purchase_order.quality_rating = 2
+            self.purchase_order.save()
+            # A concurrent request still reads the committed metrics and caches them before the save commits
+            set_cached_performance(self.vendor.pk, stale)
+            set_cached_performance(self.vendor.pk, stale, 30)
+        self.assertIsNone(get_cached_performance(self.vendor.pk))
+        self.assertIsNone(get_cached_performance(self.vendor.pk, 30))
+        self.assertEqual(self.client.get(self.url).data['quality_rating_avg'], 2)
+
+    def test_unchanged_values_reuse_the_latest_snapshot(self):
+        self.client.get(self.url)
+        cache.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(VendorPerformanceMetrics.objects.count(), 1)
+        with override_settings(VENDOR_PERFORMANCE_SNAPSHOT_INTERVAL=0):
+            cache.clear()
+            self.client.get(self.url)
+        self.assertEqual(VendorPerformanceMetrics.objects.count(), 2)
+
+    def test_cache_stats_endpoint_is_admin_only(self):
+        url = reverse('vendor-performance-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_ratio'})
+
+
+class VendorPerformanceHistoryAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.url = reverse('vendor-performance-history', args=[self.vendor.pk])
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        # Four snapshots per day over three days; the rate climbs by one per snapshot
+        for i in range(12):
+            VendorPerformanceMetrics.objects.create(
+                vendor=self.vendor, date=start + timedelta(hours=6 * i), on_time_delivery_rate=i,
+                quality_rating_avg=4, average_response_time=10 - i / 2, fulfillment_rate=50,
+            )
+
+    def get_series(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_daily_buckets(self):
+        data = self.get_series(**{'from': '2024-01-01T00:00:00Z', 'to': '2024-02-01T00:00:00Z', 'bucket': 'day'})
+        self.assertEqual(data['bucket'], 'day')
+        rows = [dict(zip(data['columns'], row)) for row in data['series']]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['bucket'], '2024-01-02T00:00:00+00:00')
+        self.assertEqual(rows[1]['samples'], 4)
+        self.assertEqual(rows[1]['on_time_delivery_rate_min'], 4)
+        self.assertEqual(rows[1]['on_time_delivery_rate_avg'], 5.5)
+        self.assertEqual(rows[1]['on_time_delivery_rate_max'], 7)
+        self.assertEqual(rows[1]['on_time_delivery_rate_last'], 7)
+        self.assertEqual(rows[1]['average_response_time_last'], 6.5)
+
+    def test_bounds_and_month_bucket(self):
+        data = self.get_series(**{'from': '2024-01-02T00:00:00Z', 'to': '2024-01-03T00:00:00Z', 'bucket': 'month'})
+        self.assertEqual(len(data['series']), 1)
+        self.assertEqual(data['series'][0][:2], ['2024-01-01T00:00:00+00:00', 4])
+
+    def test_query_count_does_not_depend_on_snapshot_count(self):
+        # Token lookup, vendor lookup, bucket aggregate and one "last" lookup per chunk of buckets
+        with self.assertNumQueries(4):
+            self.get_series(**{'from': '2024-01-01T00:00:00Z', 'to': '2024-02-01T00:00:00Z', 'bucket': 'hour'})
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'bucket': 'year'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'from': '2024-02-01T00:00:00Z', 'to': '2024-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('vendor-performance-history', args=[99999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CompactPerformanceHistoryCommandTestCase(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        now = timezone.now()
+        self.recent_day = now - timedelta(days=2)
+        self.old_day = (now - timedelta(days=60)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.ancient_day = (now - timedelta(days=500)).replace(day=10, hour=0, minute=0, second=0, microsecond=0)
+        for day in (self.recent_day, self.old_day, self.ancient_day):
+            for hour, rate in ((1, 80), (5, 90), (9, 100)):
+                VendorPerformanceMetrics.objects.create(
+                    vendor=self.vendor, date=day + timedelta(hours=hour), on_time_delivery_rate=rate,
+                    quality_rating_avg=4, average_response_time=rate / 10, fulfillment_rate=50,
+                )
+
+    def compact(self, *args):
+        out = StringIO()
+        call_command('compact_performance_history', '--raw-days', '30', '--daily-days', '365', *args, stdout=out)
+        return out.getvalue()
+
+    def test_rolls_old_snapshots_into_summaries(self):
+        output = self.compact('--batch-size', '2')
+        self.assertIn('raw -> day: removed 6 row(s)', output)
+        self.assertIn('Space reclaimed', output)
+        rows = VendorPerformanceMetrics.objects.filter(vendor=self.vendor)
+        self.assertEqual(rows.filter(granularity='raw').count(), 3)
+        daily = rows.get(granularity='day')
+        self.assertEqual(daily.date, self.old_day)
+        self.assertEqual(daily.sample_count, 3)
+        self.assertAlmostEqual(daily.on_time_delivery_rate, 90)
+        monthly = rows.get(granularity='month')
+        self.assertEqual(monthly.date, self.ancient_day.replace(day=1))
+        self.assertEqual(monthly.sample_count, 3)
+        self.assertAlmostEqual(monthly.average_response_time, 9)
+
+    def test_resumes_where_it_stopped(self):
+        output = self.compact('--batch-size', '2', '--max-batches', '1')
+        self.assertIn('run again', output)
+        self.assertEqual(VendorPerformanceMetrics.objects.filter(granularity='raw').count(), 7)
+        self.compact('--batch-size', '2')
+        self.compact('--batch-size', '2')
+        self.assertEqual(VendorPerformanceMetrics.objects.filter(granularity='raw').count(), 3)
+        self.assertEqual(VendorPerformanceMetrics.objects.get(granularity='day').sample_count, 3)
+        self.assertEqual(VendorPerformanceMetrics.objects.get(granularity='month').sample_count, 3)
+
+    def test_history_weighs_summaries_by_sample_count(self):
+        self.compact()
+        VendorPerformanceMetrics.objects.create(
+            vendor=self.vendor, date=self.old_day + timedelta(hours=12), on_time_delivery_rate=50,
+            quality_rating_avg=4, average_response_time=1, fulfillment_rate=50,
+        )
+        client = APIClient()
+        user = User.objects.create_user(username='testuser', password='password')
+        client.force_authenticate(user)
+        response = client.get(reverse('vendor-performance-history', args=[self.vendor.pk]), {
+            'from': self.old_day.isoformat(), 'to': (self.old_day + timedelta(days=1)).isoformat(),
+        })
+        data = json.loads(b''.join(response.streaming_content))
+        row = dict(zip(data['columns'], data['series'][0]))
+        self.assertEqual(row['samples'], 4)
+        self.assertEqual(row['on_time_delivery_rate_avg'], 80)
+
+
+@override_settings(VENDOR_METRICS_UPDATE_MODE='queue')
+class VendorMetricsQueueTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.now = timezone.now()
+
+    def create_purchase_order(self, po_number, **kwargs):
+        data = {
+            'po_number': po_number, 'vendor': self.vendor, 'order_date': self.now, 'delivery_date': self.now - timedelta(days=1),
+            'items': [], 'quantity': 1, 'status': 'completed', 'quality_rating': 3, 'issue_date': self.now - timedelta(hours=2),
+            'acknowledgment_date': self.now,
+        }
+        data.update(kwargs)
+        return PurchaseOrder.objects.create(**data)
+
+    def test_writes_only_mark_the_vendor_dirty(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        purchase_order.quality_rating = 5
+        purchase_order.save()
+        self.create_purchase_order('PO-2')
+        # Three triggers coalesce into one pending recomputation and the vendor is untouched until it runs
+        entry = VendorMetricsQueueEntry.objects.get(vendor=self.vendor)
+        self.assertEqual(entry.triggers, 3)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.quality_rating_avg, 0)
+        self.assertEqual(vendor_metrics_queue_stats()['depth'], 1)
+
+        self.assertEqual(drain_vendor_metrics_queue(), 1)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.quality_rating_avg, 4)
+        self.assertEqual(self.vendor.average_response_time, 2)
+        self.assertEqual(self.vendor.metric_aggregate.total_pos, 2)
+        stats = vendor_metrics_queue_stats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['lag_seconds'], 0)
+        self.assertGreaterEqual(stats['processed'], 1)
+
+    def test_delete_and_bulk_paths_enqueue(self):
+        purchase_order = self.create_purchase_order('PO-1')
+        drain_vendor_metrics_queue()
+        purchase_order.delete()
+        self.assertTrue(VendorMetricsQueueEntry.objects.filter(vendor=self.vendor).exists())
+        drain_vendor_metrics_queue()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.quality_rating_avg, 0)
+
+    def test_cached_performance_is_dropped_when_the_worker_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_purchase_order('PO-1')
+        # A read between the enqueue and the worker's commit caches the not yet recomputed totals
+        set_cached_performance(self.vendor.pk, {'quality_rating_avg': 0})
+        set_cached_performance(self.vendor.pk, {'quality_rating_avg': 0}, window=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            drain_vendor_metrics_queue()
+        self.assertIsNone(get_cached_performance(self.vendor.pk))
+        self.assertIsNone(get_cached_performance(self.vendor.pk, window=30))
+
+    def test_retriggered_entry_is_released_not_dropped(self):
+        self.create_purchase_order('PO-1')
+        VendorMetricsQueueEntry.objects.update(updated_at=self.now + timedelta(minutes=5))
+        process_vendor_metrics_batch('worker-1')
+        entry = VendorMetricsQueueEntry.objects.get(vendor=self.vendor)
+        self.assertIsNone(entry.claimed_at)
+
+    def test_command(self):
+        self.create_purchase_order('PO-1')
+        out = StringIO()
+        call_command('process_metrics_queue', '--once', stdout=out)
+        self.assertIn('1 vendor(s)', out.getvalue())
+        out = StringIO()
+        call_command('process_metrics_queue', '--stats', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['depth'], 0)
+
+
+class RequestTimingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        reset_route_timings()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('vendor-list-create'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[0-9.]+;desc="\d+ queries"')
+        self.assertIn('render;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    def test_request_stats_endpoint(self):
+        for _ in range(3):
+            self.client.get(reverse('vendor-list-create'))
+        with self.assertLogs('vendor_management.requests', level='INFO') as logs:
+            response = self.client.get(reverse('request-stats'))
+        self.assertEqual(json.loads(logs.records[0].getMessage())['route'], 'api/stats/requests/')
+        stats = response.data['GET api/vendors/']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(set(stats['total_ms']), {'p50', 'p95', 'p99'})
+        self.assertEqual(stats['queries']['max'], 2)
+
+    def test_request_stats_endpoint_is_admin_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('request-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EndpointQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        now = timezone.now()
+        # Enough rows that any per-row query would blow the budgets below
+        self.vendors = [
+            Vendor.objects.create(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'BUDGET{i:03}')
+            for i in range(10)
+        ]
+        for i in range(30):
+            PurchaseOrder.objects.create(
+                po_number=f'PO-BUDGET-{i}', vendor=self.vendors[i % 10], order_date=now, delivery_date=now, items=[],
+                quantity=1, status='completed', quality_rating=4, issue_date=now, acknowledgment_date=now,
+            )
+        self.vendor = self.vendors[0]
+        self.purchase_order = PurchaseOrder.objects.filter(vendor=self.vendor).first()
+
+    def test_list_endpoints(self):
+        with self.assertQueryBudget(2):
+            self.client.get(reverse('vendor-list-create'))
+        with self.assertQueryBudget(2):
+            self.client.get(reverse('purchase-order-list-create'), {'vendor': self.vendor.pk})
+
+    def test_detail_endpoints(self):
+        with self.assertQueryBudget(2):
+            self.client.get(reverse('vendor-retrieve-update-destroy', args=[self.vendor.pk]))
+        with self.assertQueryBudget(2):
+            self.client.get(reverse('purchase-order-retrieve-update-destroy', args=[self.purchase_order.pk]))
+
+    def test_performance_endpoints(self):
+        with self.assertQueryBudget(5):
+            self.client.get(reverse('vendor-performance', args=[self.vendor.pk]))
+        with self.assertQueryBudget(4):
+            self.client.get(reverse('vendor-performance-history', args=[self.vendor.pk]))
+
+    def test_write_endpoints(self):
+        with self.assertQueryBudget(12):
+            self.client.post(reverse('purchase-order-acknowledge', args=[self.purchase_order.pk]))
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_token_cache()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('vendor-list-create')
+
+    def test_cached_token_needs_no_auth_query(self):
+        with self.assertNumQueries(2):
+            # Token lookup, then the vendor list
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE_TIMEOUT=0)
+    def test_expired_entry_is_looked_up_again(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get(self.url)
+        # Another process starts with an empty in-process cache but shares the cache backend
+        clear_local_token_cache()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        clear_local_token_cache()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_invalidation_reaches_the_memory_of_other_processes(self):
+        self.client.get(self.url)
+        other_process = dict(_local_tokens)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        # Another process still holds the token in memory; the bumped generation in the shared cache makes it stale
+        _local_tokens.update(other_process)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_request_between_save_and_commit_does_not_outlive_the_deactivation(self):
+        active = Token.objects.select_related('user').get(key=self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # A concurrent request still reads the committed, active user and caches it before the save commits
+            with mock.patch('rest_framework.authentication.TokenAuthentication.authenticate_credentials', return_value=(active.user, active)):
+                self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_concurrent_requests_get_their_own_user(self):
+        authentication = CachedTokenAuthentication()
+        first, first_token = authentication.authenticate_credentials(self.token.key)
+        second, second_token = authentication.authenticate_credentials(self.token.key)
+        clear_local_token_cache()
+        third, third_token = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertEqual(len({id(first), id(second), id(third)}), 3)
+        self.assertIs(second_token.user, second)
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=1)
+    def test_lru_is_bounded(self):
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=User.objects.create_user(username='other')).key)
+        self.client.get(self.url)
+        other.get(self.url)
+        # The first token was evicted by the second
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+
+class BatchAcknowledgePurchaseOrderAPIViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.issue_date = timezone.now() - timedelta(hours=2)
+        self.purchase_orders = [
+            PurchaseOrder.objects.create(
+                po_number=f'PO-{i}', vendor=self.vendor, order_date=self.issue_date, delivery_date=self.issue_date,
+                items=[], quantity=1, status='completed', issue_date=self.issue_date,
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('purchase-order-batch-acknowledge')
+
+    def test_acknowledge_by_ids(self):
+        first, second, third = self.purchase_orders
+        third.acknowledgment_date = self.issue_date + timedelta(hours=1)
+        third.save()
+        response = self.client.post(self.url, {'ids': [first.pk, second.pk, third.pk, 999, first.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['acknowledged'], 2)
+        self.assertEqual(response.data['results'], [
+            {'id': first.pk, 'status': 'acknowledged'},
+            {'id': second.pk, 'status': 'acknowledged'},
+            {'id': third.pk, 'status': 'already_acknowledged'},
+            {'id': 999, 'status': 'not_found'},
+        ])
+        self.assertEqual(PurchaseOrder.objects.filter(acknowledgment_date__isnull=False).count(), 3)
+        third.refresh_from_db()
+        self.assertEqual(third.acknowledgment_date, self.issue_date + timedelta(hours=1))
+        # The vendor's metrics and running totals took the two acknowledgments as deltas
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.average_response_time, calculate_average_response_time(self.vendor))
+        self.assertEqual(VendorMetricAggregate.objects.get(vendor=self.vendor).acknowledged_pos, 3)
+
+    def test_acknowledge_by_po_numbers(self):
+        response = self.client.post(self.url, {'po_numbers': ['PO-1', 'PO-404']}, format='json')
+        self.assertEqual(response.data['results'], [{'po_number': 'PO-1', 'status': 'acknowledged'}, {'po_number': 'PO-404', 'status': 'not_found'}])
+
+    def test_query_count_does_not_grow_with_orders(self):
+        def acknowledge(ids):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(self.url, {'ids': ids}, format='json')
+            return len(queries)
+        # Warm up the token cache first
+        self.client.post(self.url, {'ids': [999]}, format='json')
+        self.assertEqual(acknowledge([self.purchase_orders[0].pk]), acknowledge([po.pk for po in self.purchase_orders[1:]]))
+
+    def test_invalid_body(self):
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'ids': [1], 'po_numbers': ['PO-1']}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'ids': ['x']}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeFeedAPIViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('change-feed')
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.now = timezone.now()
+
+    def create_purchase_order(self, po_number):
+        return PurchaseOrder.objects.create(
+            po_number=po_number, vendor=self.vendor, order_date=self.now, delivery_date=self.now, items=[],
+            quantity=1, status='pending', issue_date=self.now,
+        )
+
+    def changes(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_creates_updates_and_deletes_are_logged_in_order(self):
+        cursor = self.changes()['latest']
+        purchase_order = self.create_purchase_order('PO-1')
+        purchase_order.quantity = 5
+        purchase_order.save()
+        purchase_order_id = purchase_order.pk
+        purchase_order.delete()
+        feed = self.changes(since=cursor, type='purchase_order')
+        self.assertEqual([(change['id'], change['action']) for change in feed['changes']], [
+            (purchase_order_id, 'create'), (purchase_order_id, 'update'), (purchase_order_id, 'delete'),
+        ])
+        # The object no longer exists, so no entry carries its data
+        self.assertEqual([change['data'] for change in feed['changes']], [None, None, None])
+        self.assertEqual(self.changes(since=feed['next'], type='purchase_order')['changes'], [])
+
+    def test_changes_carry_current_state(self):
+        cursor = self.changes()['latest']
+        self.create_purchase_order('PO-1')
+        feed = self.changes(since=cursor)
+        created = [change for change in feed['changes'] if change['type'] == 'purchase_order']
+        self.assertEqual(created[0]['data']['po_number'], 'PO-1')
+        # Recomputing the vendor's metrics logged a vendor update too
+        self.assertIn(('vendor', self.vendor.pk, 'update'), [(change['type'], change['id'], change['action']) for change in feed['changes']])
+
+    def test_pages_are_bounded(self):
+        cursor = self.changes()['latest']
+        for i in range(5):
+            self.create_purchase_order(f'PO-{i}')
+        seen = []
+        while True:
+            feed = self.changes(since=cursor, limit=2, type='purchase_order')
+            self.assertLessEqual(len(feed['changes']), 2)
+            seen.extend(change['data']['po_number'] for change in feed['changes'])
+            cursor = feed['next']
+            if not feed['has_more']:
+                break
+        self.assertEqual(seen, [f'PO-{i}' for i in range(5)])
+
+    def test_bulk_paths_are_logged(self):
+        cursor = self.changes()['latest']
+        rows = [{
+            'po_number': f'BULK-{i}', 'vendor': self.vendor.pk, 'order_date': '2024-04-30T12:00:00Z', 'delivery_date': '2024-05-05T12:00:00Z',
+            'items': [], 'quantity': 1, 'status': 'pending', 'issue_date': '2024-04-30T12:00:00Z',
+        } for i in range(3)]
+        self.client.post(reverse('purchase-order-bulk-ingest'), rows, format='json')
+        ids = list(PurchaseOrder.objects.filter(po_number__startswith='BULK-').values_list('pk', flat=True))
+        self.client.post(reverse('purchase-order-batch-acknowledge'), {'ids': ids[:2]}, format='json')
+        actions = [(change['id'], change['action']) for change in self.changes(since=cursor, type='purchase_order')['changes']]
+        self.assertEqual(actions, [(pk, 'create') for pk in ids] + [(pk, 'update') for pk in ids[:2]])
+
+    def test_pruned_cursor_is_gone(self):
+        self.create_purchase_order('PO-1')
+        self.create_purchase_order('PO-2')
+        ChangeLogEntry.objects.update(changed_at=self.now - timedelta(days=30))
+        call_command('prune_change_log', '--days', '7', stdout=StringIO())
+        # Only the newest entry is kept
+        self.assertEqual(ChangeLogEntry.objects.count(), 1)
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        latest = response.data['latest']
+        self.assertEqual(self.changes(since=latest)['changes'], [])
+        self.assertEqual(self.changes(since=latest - 1)['next'], latest)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'since': -1}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'limit': 5000}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'type': 'invoice'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RollingWindowMetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST002')
+        self.now = timezone.now()
+        self.url = reverse('vendor-performance', args=[self.vendor.pk])
+
+    def create_purchase_order(self, po_number, days_ago, **kwargs):
+        issue_date = self.now - timedelta(days=days_ago)
+        data = {
+            'po_number': po_number, 'vendor': self.vendor, 'order_date': issue_date, 'delivery_date': issue_date,
+            'items': [], 'quantity': 1, 'status': 'completed', 'issue_date': issue_date, **kwargs,
+        }
+        return PurchaseOrder.objects.create(**data)
+
+    def assertBucketsMatchPurchaseOrders(self):
+        stored = {
+            (bucket.vendor_id, bucket.day): {field: getattr(bucket, field) for field in METRIC_TOTAL_FIELDS}
+            for bucket in VendorDailyMetrics.objects.all()
+        }
+        expected = calculate_daily_totals([self.vendor.pk, self.other_vendor.pk])
+        # Buckets emptied by moves and deletes stay behind as zero rows
+        zero = normalize_metric_totals({})
+        self.assertEqual({key: totals for key, totals in stored.items() if totals != zero}, expected)
+
+    def test_buckets_follow_every_write(self):
+        first = self.create_purchase_order('PO-1', 3, quality_rating=4)
+        second = self.create_purchase_order('PO-2', 3, status='pending')
+        third = self.create_purchase_order('PO-3', 40, acknowledgment_date=self.now)
+        self.assertBucketsMatchPurchaseOrders()
+        # Change of state within the bucket, move to another day, move to another vendor, delete
+        second.status = 'completed'
+        second.save()
+        first.issue_date = self.now - timedelta(days=5)
+        first.save()
+        third.vendor = self.other_vendor
+        third.save()
+        second.delete()
+        self.assertBucketsMatchPurchaseOrders()
+
+    def test_window_parameter(self):
+        self.create_purchase_order('PO-1', 10, quality_rating=5)
+        self.create_purchase_order('PO-2', 60, quality_rating=3)
+        self.create_purchase_order('PO-3', 200, quality_rating=1)
+        self.create_purchase_order('PO-4', 400, quality_rating=1)
+        averages = {window: self.client.get(self.url, {'window': window}).data['quality_rating_avg'] for window in (30, 90, 365)}
+        self.assertEqual(averages, {30: 5, 90: 4, 365: 3})
+        response = self.client.get(self.url, {'window': 90})
+        self.assertEqual(response.data['total_pos'], 2)
+        self.assertEqual(response.data['window'], 90)
+
+    def test_window_results_are_cached_and_invalidated(self):
+        purchase_order = self.create_purchase_order('PO-1', 10, quality_rating=5)
+        self.client.get(self.url, {'window': 30})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'window': 30})
+        purchase_order.quality_rating = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase_order.save()
+        with self.assertNumQueries(6):
+            # The vendor, then in one savepoint the on-time cutoff, one sum over at most `window` bucket rows and
+            # the POs delivered since the cutoff
+            response = self.client.get(self.url, {'window': 30})
+        self.assertEqual(response.data['quality_rating_avg'], 2)
+
+    def test_window_and_all_time_agree_on_time_before_the_cutoff_advances(self):
+        # Delivered after the cutoff was last advanced: the stored totals do not count it as on time yet
+        OnTimeCutoff.objects.update_or_create(pk=1, defaults={'as_of': self.now - timedelta(days=1)})
+        self.create_purchase_order('PO-1', 3, delivery_date=self.now - timedelta(hours=1))
+        self.create_purchase_order('PO-2', 3, delivery_date=self.now + timedelta(days=1))
+        window = self.client.get(self.url, {'window': 30}).data['on_time_delivery_rate']
+        all_time = self.client.get(self.url).data['on_time_delivery_rate']
+        self.assertEqual((window, all_time), (50, 50))
+
+    def test_invalid_window(self):
+        self.assertEqual(self.client.get(self.url, {'window': 45}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'window': 'month'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backfill_command(self):
+        self.create_purchase_order('PO-1', 3, quality_rating=4)
+        self.create_purchase_order('PO-2', 50)
+        VendorDailyMetrics.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_daily_metrics', stdout=out)
+        self.assertIn('Wrote 2 daily bucket(s)', out.getvalue())
+        self.assertBucketsMatchPurchaseOrders()
+
+
+class VendorLeaderboardAPIViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('vendor-leaderboard')
+        now = timezone.now()
+        # (ratings, response hours) per vendor; B and C tie on quality, D has a single rated order
+        plans = {'A': ([3, 3], [10, 10]), 'B': ([5, 4], [2, 2]), 'C': ([4.5, 4.5], [1, 5]), 'D': ([5], [0.5]), 'E': ([], [])}
+        self.vendors = {}
+        for code, (ratings, hours) in plans.items():
+            vendor = Vendor.objects.create(name=f'Vendor {code}', contact_details='test@example.com', address='Test Address', vendor_code=code)
+            self.vendors[code] = vendor
+            for i, (rating, hour) in enumerate(zip(ratings, hours)):
+                PurchaseOrder.objects.create(
+                    po_number=f'{code}-{i}', vendor=vendor, order_date=now, delivery_date=now - timedelta(days=1), items=[],
+                    quantity=1, status='completed', quality_rating=rating, issue_date=now, acknowledgment_date=now + timedelta(hours=hour),
+                )
+
+    def codes(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['vendor_code'] for row in response.data['results']]
+
+    def test_ranking_thresholds_and_ties(self):
+        # B and C tie at 4.5 and are ordered by id; E has no rated orders and is never ranked
+        self.assertEqual(self.codes(metric='quality_rating_avg'), ['D', 'B', 'C', 'A'])
+        self.assertEqual(self.codes(metric='quality_rating_avg', min_pos=2), ['B', 'C', 'A'])
+        # Lower response times rank first
+        self.assertEqual(self.codes(metric='average_response_time', min_pos=2, limit=2), ['B', 'C'])
+
+    def test_results_are_cached(self):
+        params = {'metric': 'quality_rating_avg', 'min_pos': 2}
+        first = self.client.get(self.url, params)
+        self.assertEqual(first.data['results'][0]['sample_size'], 2)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, params)
+        self.assertEqual(second.data, first.data)
+
+    def test_leaderboard_uses_the_metric_index(self):
+        plan = Vendor.objects.filter(metric_aggregate__rated_pos__gte=1).order_by('-quality_rating_avg', 'id')[:20].explain()
+        self.assertIn('vendor_quality_rank_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'metric': 'name'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'metric': 'fulfillment_rate', 'min_pos': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FleetAnalyticsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        rng = random.Random(7)
+        self.now = timezone.now()
+        self.vendors = [
+            Vendor.objects.create(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'FLEET{i:03}')
+            for i in range(4)
+        ]
+        # The last vendor only has pending orders, so its rates and percentiles are empty
+        for i in range(80):
+            vendor = self.vendors[i % 3] if i < 76 else self.vendors[3]
+            po_status = rng.choice(['completed', 'completed', 'pending', 'canceled']) if i < 76 else 'pending'
+            issue_date = self.now - timedelta(days=rng.uniform(1, 90))
+            PurchaseOrder.objects.create(
+                po_number=f'PO-{i}', vendor=vendor, order_date=issue_date, delivery_date=issue_date + timedelta(days=rng.uniform(-5, 120)),
+                items=[], quantity=1, status=po_status,
+                quality_rating=round(rng.uniform(0, 5), 1) if po_status == 'completed' and rng.random() < 0.7 else None,
+                issue_date=issue_date,
+                acknowledgment_date=issue_date + timedelta(seconds=rng.uniform(60, 200000)) if rng.random() < 0.8 else None,
+            )
+
+    def test_matches_the_utils_helpers_exactly(self):
+        report = fleet_report(now=timezone.now())
+        self.assertEqual(len(report['vendors']), 4)
+        for row in report['vendors']:
+            vendor = Vendor.objects.get(pk=row['vendor'])
+            self.assertEqual(row['on_time_delivery_rate'], calculate_on_time_delivery_rate(vendor))
+            self.assertEqual(row['quality_rating_avg'], calculate_quality_rating_avg(vendor))
+            self.assertEqual(row['average_response_time'], calculate_average_response_time(vendor))
+            self.assertEqual(row['fulfillment_rate'], calculate_fulfillment_rate(vendor))
+
+    def test_distributions(self):
+        report = fleet_report(now=self.now)
+        completed = PurchaseOrder.objects.filter(status='completed')
+        hours = [(po.acknowledgment_date - po.issue_date).total_seconds() / 3600 for po in completed.exclude(acknowledgment_date=None)]
+        self.assertEqual(report['response_time_hours']['p90'], round(percentile(hours, 90), 2))
+        vendor_hours = [
+            (po.acknowledgment_date - po.issue_date).total_seconds() / 3600
+            for po in completed.filter(vendor=self.vendors[1]).exclude(acknowledgment_date=None)
+        ]
+        self.assertEqual(report['vendors'][1]['response_time_p50'], round(percentile(vendor_hours, 50), 2))
+        self.assertIsNone(report['vendors'][3]['response_time_p50'])
+        self.assertEqual(sum(row['count'] for row in report['quality_rating_histogram']), completed.exclude(quality_rating=None).count())
+        self.assertEqual(sum(row['completed'] for row in report['on_time_rate_by_month']), completed.count())
+
+    def test_endpoint_runs_one_query(self):
+        url = reverse('fleet-analytics')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'vendor': self.vendors[0].pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['vendor'] for row in response.data['vendors']], [self.vendors[0].pk])
+        self.assertEqual(self.client.get(url, {'status': 'lost'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_endpoint_is_cached_per_filter_and_admin_only(self):
+        url = reverse('fleet-analytics')
+        response = self.client.get(url, {'vendor': self.vendors[0].pk})
+        PurchaseOrder.objects.filter(vendor=self.vendors[0]).delete()
+        with self.assertNumQueries(0):
+            # Served from cache until FLEET_REPORT_CACHE_TIMEOUT passes, even though the orders changed
+            self.assertEqual(self.client.get(url, {'vendor': self.vendors[0].pk}).data, response.data)
+        self.assertEqual(self.client.get(url, {'vendor': self.vendors[1].pk}).data['vendors'][0]['vendor'], self.vendors[1].pk)
+        self.user.is_staff = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_empty_database(self):
+        PurchaseOrder.objects.all().delete()
+        report = fleet_report()
+        self.assertEqual(report['vendors'], [])
+        self.assertEqual(report['response_time_hours']['p50'], None)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('fleet_report', '--benchmark', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['benchmark']['vendors'], 4)
+
+
+class ExportAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST002')
+        now = timezone.now()
+        for i, (vendor, po_status) in enumerate([(self.vendor, 'completed'), (self.vendor, 'pending'), (self.other_vendor, 'completed')]):
+            PurchaseOrder.objects.create(
+                po_number=f'PO-{i}', vendor=vendor, order_date=now, delivery_date=now, items=[{'name': 'Item', 'quantity': 1}],
+                quantity=1, status=po_status, issue_date=now,
+            )
+        self.url = reverse('purchase-order-export')
+
+    def test_csv_export_is_streamed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="purchase_orders.csv"')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['po_number'] for row in rows], ['PO-0', 'PO-1', 'PO-2'])
+        self.assertEqual(json.loads(rows[0]['items']), [{'name': 'Item', 'quantity': 1}])
+        self.assertEqual(rows[0]['quality_rating'], '')
+
+    def test_ndjson_export_with_filters(self):
+        response = self.client.get(self.url, {'output': 'ndjson', 'vendor': self.vendor.pk, 'status': 'completed'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['po_number'], 'PO-0')
+        self.assertEqual(rows[0]['vendor'], self.vendor.pk)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'status': 'lost'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_csv_export_can_be_ingested(self):
+        body = b''.join(self.client.get(self.url).streaming_content).decode().replace('PO-', 'COPY-')
+        response = self.client.post(reverse('purchase-order-bulk-ingest'), body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 3)
+
+    def test_vendor_export(self):
+        response = self.client.get(reverse('vendor-export'), {'output': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['vendor_code'] for row in rows], ['TEST001', 'TEST002'])
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_data', 'purchase_orders', '--output', 'ndjson', '--vendor', str(self.other_vendor.pk), stdout=out)
+        self.assertEqual([json.loads(line)['po_number'] for line in out.getvalue().splitlines()], ['PO-2'])
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'purchase_orders', '--order-date-after', 'yesterday', stdout=StringIO())
+
+
+class AdminChangelistTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='password'))
+        self.now = timezone.now()
+        self.vendors = []
+
+    def create_rows(self, count):
+        start = len(self.vendors)
+        vendors = Vendor.objects.bulk_create([
+            Vendor(name=f'Vendor {i}', contact_details='test@example.com', address='Test Address', vendor_code=f'ADM{i:03}')
+            for i in range(start, start + count)
+        ])
+        self.vendors.extend(vendors)
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                po_number=f'PO-ADM-{vendor.pk}', vendor=vendor, order_date=self.now, delivery_date=self.now,
+                items=[], quantity=1, issue_date=self.now,
+            )
+            for vendor in vendors
+        ])
+        VendorPerformanceMetrics.objects.bulk_create([
+            VendorPerformanceMetrics(vendor=vendor, date=self.now, on_time_delivery_rate=0, quality_rating_avg=0, average_response_time=0, fulfillment_rate=0)
+            for vendor in vendors
+        ])
+
+    def assertConstantQueries(self, url, expected):
+        # Same query count with 3 and 30 rows: no per-row vendor lookups
+        for count in (3, 27):
+            self.create_rows(count)
+            with self.assertNumQueries(expected):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_purchase_order_changelist(self):
+        # Session, user, capped count, rows joined with their vendor
+        self.assertConstantQueries(reverse('admin:vendor_management_purchaseorder_changelist'), 4)
+
+    def test_performance_history_changelist(self):
+        self.assertConstantQueries(reverse('admin:vendor_management_vendorperformancemetrics_changelist'), 4)
+
+    def test_change_forms_do_not_list_vendors(self):
+        self.create_rows(30)
+        for url in (
+            reverse('admin:vendor_management_purchaseorder_add'),
+            reverse('admin:vendor_management_vendorperformancemetrics_add'),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # The autocomplete widget loads vendors on demand instead of rendering every one as an option
+            self.assertNotContains(response, '>Vendor 29</option>')
+
+    def test_search_uses_exact_matches(self):
+        self.create_rows(3)
+        url = reverse('admin:vendor_management_purchaseorder_changelist')
+        purchase_order = PurchaseOrder.objects.get(vendor=self.vendors[1])
+        response = self.client.get(url, {'q': purchase_order.po_number})
+        self.assertEqual([row.pk for row in response.context['cl'].result_list], [purchase_order.pk])
+        response = self.client.get(url, {'q': 'ADM002'})
+        self.assertEqual([row.vendor.vendor_code for row in response.context['cl'].result_list], ['ADM002'])
+        # Substrings no longer match, since they cannot use an index
+        response = self.client.get(url, {'q': 'ADM'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_count_is_capped(self):
+        self.create_rows(5)
+        paginator = CappedCountPaginator(PurchaseOrder.objects.order_by('pk'), 2)
+        paginator.count_cap = 3
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.is_capped)
+        # Pages go on past the capped count for as long as they have rows, and are never cut short at it
+        pks = list(PurchaseOrder.objects.order_by('pk').values_list('pk', flat=True))
+        self.assertEqual([row.pk for row in paginator.page(2)], pks[2:4])
+        self.assertEqual([row.pk for row in paginator.page(3)], pks[4:])
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+        self.assertEqual(list(paginator.get_elided_page_range(1)), [1, 2, 3])
+
+    def test_count_below_the_cap_is_exact(self):
+        self.create_rows(3)
+        paginator = CappedCountPaginator(PurchaseOrder.objects.order_by('pk'), 2)
+        paginator.count_cap = 3
+        self.assertEqual((paginator.count, paginator.num_pages, paginator.is_capped), (3, 2, False))
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+
+    def test_changelist_pages_past_the_cap(self):
+        self.create_rows(5)
+        url = reverse('admin:vendor_management_purchaseorder_changelist')
+        with mock.patch.object(CappedCountPaginator, 'count_cap', 3), mock.patch.object(PurchaseOrderAdmin, 'list_per_page', 2):
+            response = self.client.get(url, {'p': 3})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['cl'].result_list), 1)
+            self.assertContains(response, '3+ purchase orders')
+            self.assertRedirects(self.client.get(url, {'p': 4}), f'{url}?e=1', fetch_redirect_response=False)
+
+
+class SQLiteProfileTestCase(TransactionTestCase):
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size'])
+
+    def test_lock_errors_are_retried(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'written'
+
+        retries = lock_retry_stats()['retries']
+        self.assertEqual(run_with_lock_retry(write, delay=0), 'written')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(lock_retry_stats()['retries'], retries + 2)
+
+    def test_other_errors_and_inner_transactions_are_not_retried(self):
+        def write():
+            calls.append(1)
+            raise OperationalError(message)
+
+        for message, atomic in (('no such table: x', False), ('database is locked', True)):
+            calls = []
+            with self.assertRaises(OperationalError):
+                if atomic:
+                    with transaction.atomic():
+                        run_with_lock_retry(write, delay=0)
+                else:
+                    run_with_lock_retry(write, delay=0)
+            self.assertEqual(len(calls), 1)
+
+    def test_retries_are_bounded(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            run_with_lock_retry(write, attempts=3, delay=0)
+        self.assertEqual(len(calls), 3)
+
+    def test_benchmark_needs_a_database_file(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_sqlite', '--seconds', '0.1', stdout=StringIO())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG_CHECK_INTERVAL=60)
+class ReadReplicaRoutingTestCase(TransactionTestCase):
+    # In tests the replica is a mirror of the default database, so it always holds the same rows
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        forget_replica_lags()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='password'))
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+
+    def request_queries(self, method, url, data=None):
+        # Measure the replica lag up front, so only the request's own queries are counted
+        healthy_replicas()
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, data, **({'format': 'json'} if method != 'get' else {}))
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, len(primary), len(replica)
+
+    def test_reads_go_to_the_replica(self):
+        response, primary, replica = self.request_queries('get', reverse('vendor-retrieve-update-destroy', args=[self.vendor.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(replica, 0)
+        # Streamed responses keep reading from the replica after the view has returned
+        response, primary, replica = self.request_queries('get', reverse('vendor-export'))
+        self.assertEqual((primary, replica), (0, 1))
+
+    def test_client_that_wrote_reads_from_the_primary(self):
+        data = {'name': 'New Vendor', 'contact_details': 'new@example.com', 'address': 'New Address', 'vendor_code': 'NEW001'}
+        response, primary, replica = self.request_queries('post', reverse('vendor-list-create'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica, 0)
+        self.assertIn('replica_pin', response.cookies)
+        response, primary, replica = self.request_queries('get', reverse('vendor-list-create'))
+        self.assertEqual(replica, 0)
+
+    def test_cached_computations_read_from_the_primary(self):
+        cache.clear()
+        for url, params in (
+            (reverse('vendor-performance', args=[self.vendor.pk]), {}),
+            (reverse('vendor-performance', args=[self.vendor.pk]), {'window': 30}),
+            (reverse('vendor-leaderboard'), {'metric': 'fulfillment_rate'}),
+        ):
+            response, primary, replica = self.request_queries('get', url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(replica, 0, url)
+            # The snapshot the performance endpoint writes does not pin the client to the primary
+            self.assertNotIn('replica_pin', response.cookies)
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Vendor), 'replica')
+            # Authentication data is never read from a copy
+            self.assertEqual(router.db_for_read(User), 'default')
+            # Nor are the models whose writes the change log lag cannot see
+            for model in (VendorMetricAggregate, VendorDailyMetrics, OnTimeCutoff, VendorPerformanceMetrics, VendorMetricsQueueEntry):
+                self.assertEqual(router.db_for_read(model), 'default', model)
+            self.vendor.save()
+            self.assertEqual(router.db_for_read(Vendor), 'default')
+        # Outside requests everything uses the primary
+        self.assertEqual(router.db_for_read(Vendor), 'default')
+
+    def test_lagging_or_unreachable_replicas_are_skipped(self):
+        with replica_reads():
+            for lag in (60, None):
+                forget_replica_lags()
+                with mock.patch('vendor_management.routers.measure_replica_lag', return_value=lag):
+                    self.assertEqual(router.db_for_read(Vendor), 'default')
+
+    def test_replica_lag_dates_the_oldest_unseen_change(self):
+        now = timezone.now()
+        entries = list(ChangeLogEntry.objects.order_by('id'))
+        self.assertEqual(measure_replica_lag('replica', now), 0)
+        self.assertEqual(change_log_lag(entries[-1].id, now), 0)
+        self.assertEqual(change_log_lag(entries[0].id - 1, now), (now - entries[0].changed_at).total_seconds())
+
+    def test_sync_copies_the_primary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            sync_sqlite_replica(path)
+            with closing(sqlite3.connect(path)) as replica:
+                self.assertEqual(replica.execute('SELECT vendor_code FROM vendor_management_vendor').fetchall(), [('TEST001',)])
+        self.assertFalse(router.allow_migrate('replica', 'vendor_management'))
+
+
+class PurchaseOrderLineItemTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='password'))
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        self.other_vendor = Vendor.objects.create(name='Other Vendor', contact_details='other@example.com', address='Other Address', vendor_code='TEST002')
+        self.now = datetime(2024, 5, 15, 12, tzinfo=dt_timezone.utc)
+
+    def create_purchase_order(self, po_number, items, vendor=None, order_date=None):
+        return PurchaseOrder.objects.create(
+            po_number=po_number, vendor=vendor or self.vendor, order_date=order_date or self.now, delivery_date=self.now,
+            items=items, quantity=1, issue_date=self.now,
+        )
+
+    def stored_lines(self, purchase_order):
+        return list(purchase_order.line_items.order_by('position').values_list('vendor_id', 'position', 'sku', 'quantity', 'price'))
+
+    def test_parse_line_items(self):
+        self.assertEqual(parse_line_items([
+            {'sku': 'A', 'quantity': 2, 'price': 1.5},
+            {'name': 'B', 'quantity': '3', 'unit_price': '0.125'},
+            'C',
+            {'name': 'D', 'quantity': 'many'},
+            {'quantity': 1},
+            42,
+        ]), [(0, 'A', 2, Decimal('1.50')), (1, 'B', 3, Decimal('0.12')), (2, 'C', 1, None)])
+        self.assertEqual(parse_line_items({'name': 'A'}), [(0, 'A', 1, None)])
+        self.assertEqual(parse_line_items(None), [])
+
+    def test_saves_keep_line_items_in_step(self):
+        purchase_order = self.create_purchase_order('PO-1', [{'name': 'A', 'quantity': 2, 'price': 10}, 'B'])
+        self.assertEqual(self.stored_lines(purchase_order), [(self.vendor.pk, 0, 'A', 2, Decimal('10.00')), (self.vendor.pk, 1, 'B', 1, None)])
+        loaded = PurchaseOrder.objects.get(pk=purchase_order.pk)
+        loaded.quantity = 5
+        with self.assertNumQueries(2):
+            # Only the PO update itself and its change log entry
+            loaded.save()
+        loaded.items = [{'name': 'C', 'quantity': 4}]
+        loaded.save()
+        self.assertEqual(self.stored_lines(loaded), [(self.vendor.pk, 0, 'C', 4, None)])
+        loaded.vendor = self.other_vendor
+        loaded.save()
+        self.assertEqual(self.stored_lines(loaded), [(self.other_vendor.pk, 0, 'C', 4, None)])
+        loaded.delete()
+        self.assertFalse(PurchaseOrderItem.objects.exists())
+
+    def test_items_are_only_parsed_when_saved(self):
+        purchase_order = self.create_purchase_order('PO-1', [{'name': 'A', 'quantity': 2}])
+        with mock.patch('vendor_management.line_items.parse_line_items', wraps=parse_line_items) as parse:
+            loaded = list(PurchaseOrder.objects.all())[0]
+            self.assertFalse(parse.called)
+            # An edit made to the loaded list in place still rewrites the lines
+            loaded.items[0]['quantity'] = 6
+            loaded.save()
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(self.stored_lines(purchase_order), [(self.vendor.pk, 0, 'A', 6, None)])
+
+    def test_bulk_ingest_and_backfill(self):
+        now = self.now.isoformat()
+        rows = [
+            {'po_number': f'PO-{i}', 'vendor': self.vendor.pk, 'order_date': now, 'delivery_date': now, 'items': [{'name': 'A', 'quantity': i}],
+             'quantity': 1, 'issue_date': now}
+            for i in range(1, 6)
+        ]
+        response = self.client.post(reverse('purchase-order-bulk-ingest'), rows, format='json')
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(PurchaseOrderItem.objects.aggregate(total=models.Sum('quantity'))['total'], 15)
+
+        # Rows written before the table existed, or with items changed by update(), are rebuilt by the backfill
+        PurchaseOrderItem.objects.all().delete()
+        PurchaseOrder.objects.filter(po_number='PO-5').update(items=[{'name': 'B', 'quantity': 7}])
+        out = StringIO()
+        call_command('backfill_line_items', '--batch-size', '2', stdout=out)
+        self.assertIn('Wrote 5 line item(s) for 5 purchase order(s)', out.getvalue())
+        self.assertEqual(dict(PurchaseOrderItem.objects.values_list('sku').annotate(models.Sum('quantity'))), {'A': 10, 'B': 7})
+        # Rerunning it replaces the lines instead of duplicating them
+        call_command('backfill_line_items', stdout=StringIO())
+        self.assertEqual(PurchaseOrderItem.objects.count(), 5)
+
+    def test_summary_endpoint(self):
+        self.create_purchase_order('PO-1', [{'name': 'A', 'quantity': 2, 'price': 10}, {'name': 'B', 'quantity': 1, 'price': 3}])
+        self.create_purchase_order('PO-2', [{'name': 'A', 'quantity': 3}], vendor=self.other_vendor)
+        self.create_purchase_order('PO-3', [{'name': 'A', 'quantity': 5, 'price': 1}], order_date=self.now - timedelta(days=120))
+        url = reverse('line-item-summary')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'sku': 'A', 'group_by': 'vendor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['vendor'], row['lines'], row['purchase_orders'], row['total_quantity'], row['total_value']) for row in response.data['results']],
+            [(self.vendor.pk, 2, 2, 7, Decimal('25.00')), (self.other_vendor.pk, 1, 1, 3, None)],
+        )
+        # Total quantity of SKU A ordered from one vendor this quarter
+        response = self.client.get(url, {'sku': 'A', 'vendor': self.vendor.pk, 'order_date_after': '2024-04-01T00:00:00Z'})
+        self.assertEqual([(row['sku'], row['total_quantity']) for row in response.data['results']], [('A', 2)])
+        response = self.client.get(url, {'ordering': 'total_value', 'limit': 1})
+        self.assertEqual([row['sku'] for row in response.data['results']], ['A'])
+        self.assertEqual(self.client.get(url, {'group_by': 'day'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'order_date_after': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trend_endpoint(self):
+        self.create_purchase_order('PO-1', [{'name': 'A', 'quantity': 2}])
+        self.create_purchase_order('PO-2', [{'name': 'A', 'quantity': 3}], order_date=self.now + timedelta(days=1))
+        self.create_purchase_order('PO-3', [{'name': 'A', 'quantity': 5}], order_date=self.now - timedelta(days=60))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('line-item-trend'), {'sku': 'A'})
+        self.assertEqual(
+            [(row['bucket'].month, row['total_quantity']) for row in response.data['series']],
+            [(3, 5), (5, 5)],
+        )
+        self.assertEqual(self.client.get(reverse('line-item-trend')).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_totals_use_the_sku_indexes(self):
+        queryset = PurchaseOrderItem.objects.filter(sku='A', vendor=self.vendor)
+        plan = queryset.order_by().values('sku').annotate(total=models.Sum('quantity')).explain()
+        self.assertIn('po_item_sku_vendor_idx', plan)
+        self.assertEqual(line_item_totals(queryset), [])
+
+
+class SparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='password'))
+        self.vendor = Vendor.objects.create(name='Test Vendor', contact_details='test@example.com', address='Test Address', vendor_code='TEST001')
+        now = timezone.now()
+        self.purchase_order = PurchaseOrder.objects.create(
+            po_number='PO-1', vendor=self.vendor, order_date=now, delivery_date=now, items=[{'name': 'Item', 'quantity': 1}],
+            quantity=1, issue_date=now,
+        )
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_list_endpoints_trim_output_and_columns(self):
+        response, sql = self.get(reverse('vendor-list-create'), {'fields': 'vendor_code,id'})
+        self.assertEqual(response.data['results'], [{'id': self.vendor.pk, 'vendor_code': 'TEST001'}])
+        self.assertNotIn('contact_details', sql)
+        response, sql = self.get(reverse('purchase-order-list-create'), {'exclude': 'items,quantity', 'vendor': self.vendor.pk})
+        result = response.data['results'][0]
+        self.assertNotIn('items', result)
+        self.assertEqual((result['po_number'], result['vendor']), ('PO-1', self.vendor.pk))
+        self.assertNotIn('"items"', sql)
+
+    def test_detail_endpoints(self):
+        response, sql = self.get(reverse('purchase-order-retrieve-update-destroy', args=[self.purchase_order.pk]), {'fields': 'status'})
+        self.assertEqual(response.data, {'status': 'pending'})
+        self.assertNotIn('"items"', sql)
+        response, sql = self.get(reverse('vendor-retrieve-update-destroy', args=[self.vendor.pk]), {'exclude': 'contact_details,address'})
+        self.assertNotIn('address', response.data)
+        self.assertNotIn('address', sql)
+        # Writes ignore the parameters and return the whole object
+        data = {'name': 'Renamed', 'contact_details': 'test@example.com', 'address': 'Test Address', 'vendor_code': 'TEST001'}
+        response = self.client.put(reverse('vendor-retrieve-update-destroy', args=[self.vendor.pk]) + '?fields=id', data, format='json')
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertIn('address', response.data)
+
+    def test_performance_endpoint(self):
+        url = reverse('vendor-performance', args=[self.vendor.pk])
+        response = self.client.get(url, {'fields': 'vendor,fulfillment_rate'})
+        self.assertEqual(response.data, {'vendor': self.vendor.pk, 'fulfillment_rate': 0})
+        # The cached result is trimmed the same way
+        self.assertEqual(self.client.get(url, {'fields': 'vendor,fulfillment_rate'}).data, response.data)
+        self.assertIn('date', self.client.get(url).data)
+        response = self.client.get(url, {'window': 30, 'fields': 'window,total_pos'})
+        self.assertEqual(response.data, {'window': 30, 'total_pos': 1})
+
+    def test_export_columns(self):
+        response = self.client.get(reverse('purchase-order-export'), {'fields': 'po_number,status'})
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), ['po_number,status', 'PO-1,pending'])
+
+    def test_invalid_parameters(self):
+        url = reverse('vendor-list-create')
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.data['fields'][0])
+        self.assertEqual(self.client.get(url, {'fields': 'id', 'exclude': 'name'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('vendor-export'), {'exclude': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('vendor-performance', args=[self.vendor.pk]), {'fields': 'window'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    def test_seed_synthetic_data(self):
+        out = StringIO()
+        call_command('seed_synthetic_data', '--vendors', '5', '--purchase-orders', '200', '--seed', '7', '--batch-size', '64', stdout=out)
+        self.assertEqual(Vendor.objects.count(), 5)
+        self.assertEqual(PurchaseOrder.objects.count(), 200)
+        statuses = set(PurchaseOrder.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, {'pending', 'completed', 'canceled'})
+        # Metrics are recomputed after the bulk inserts
+        vendor = Vendor.objects.order_by('pk').first()
+        self.assertEqual(vendor.quality_rating_avg, calculate_vendor_metrics(vendor)['quality_rating_avg'])
+
+    def test_benchmark_covers_every_endpoint(self):
+        call_command('seed_synthetic_data', '--vendors', '3', '--purchase-orders', '20', '--seed', '1', stdout=StringIO())
+        scenario_names = {name.split(':')[0] for name in benchmark_scenarios()}
+        self.assertEqual(scenario_names, {pattern.name for pattern in urls.urlpatterns})
+
+    def test_run_benchmark_report(self):
+        call_command('seed_synthetic_data', '--vendors', '3', '--purchase-orders', '20', '--seed', '1', stdout=StringIO())
+        out = StringIO()
+        call_command('run_benchmark', '--requests', '2', '--concurrency', '1', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['dataset']['purchase_orders'] >= 20, True)
+        self.assertGreater(report['peak_rss_bytes'], 0)
+        for name, result in report['endpoints'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(set(result['latency_ms']), {'mean', 'p50', 'p95', 'p99'})
+            self.assertIsNotNone(result['queries'], name)
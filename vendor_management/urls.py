@@ -5,14 +5,40 @@ from .views import *
 urlpatterns = [
     # Endpoint for listing and creating vendors
     path('vendors/', VendorListCreateAPIView.as_view(), name='vendor-list-create'),
+    # Endpoint for streaming all vendors as CSV or NDJSON
+    path('vendors/export/', VendorExportAPIView.as_view(), name='vendor-export'),
     # Endpoint for retrieving, updating, and deleting a specific vendor
     path('vendors/<int:pk>/', VendorRetrieveUpdateDestroyAPIView.as_view(), name='vendor-retrieve-update-destroy'),
+    # Endpoint for the hit/miss counters of the vendor performance cache (admin only)
+    path('vendors/performance/cache/', VendorPerformanceCacheStatsAPIView.as_view(), name='vendor-performance-cache-stats'),
+    # Endpoint for the depth, lag and processing time of the vendor metrics queue (admin only)
+    path('vendors/performance/queue/', VendorMetricsQueueStatsAPIView.as_view(), name='vendor-metrics-queue-stats'),
+    # Endpoint for the top vendors by a performance metric
+    path('vendors/leaderboard/', VendorLeaderboardAPIView.as_view(), name='vendor-leaderboard'),
     # Endpoint for retrieving performance metrics of a specific vendor
     path('vendors/<int:pk>/performance/', VendorPerformanceMetricsAPIView.as_view(), name='vendor-performance'),
+    # Endpoint for the downsampled performance history of a specific vendor
+    path('vendors/<int:pk>/performance/history/', VendorPerformanceHistoryAPIView.as_view(), name='vendor-performance-history'),
     # Endpoint for listing and creating purchase orders
     path('purchase_orders/', PurchaseOrderListCreateAPIView.as_view(), name='purchase-order-list-create'),
+    # Endpoint for creating purchase orders in bulk from a JSON array, NDJSON or CSV body
+    path('purchase_orders/bulk/', PurchaseOrderBulkIngestAPIView.as_view(), name='purchase-order-bulk-ingest'),
+    # Endpoint for acknowledging many purchase orders at once
+    path('purchase_orders/acknowledge/', BatchAcknowledgePurchaseOrderAPIView.as_view(), name='purchase-order-batch-acknowledge'),
+    # Endpoint for streaming purchase orders as CSV or NDJSON, with the list filters
+    path('purchase_orders/export/', PurchaseOrderExportAPIView.as_view(), name='purchase-order-export'),
     # Endpoint for retrieving, updating, and deleting a specific purchase order
     path('purchase_orders/<int:pk>/', PurchaseOrderRetrieveUpdateDestroyAPIView.as_view(), name='purchase-order-retrieve-update-destroy'),
     # Endpoint for acknowledging a specific purchase order
     path('purchase_orders/<int:pk>/acknowledge/', AcknowledgePurchaseOrderAPIView.as_view(), name='purchase-order-acknowledge'),
+    # Endpoint for fleet-wide analytics over all purchase orders
+    path('analytics/fleet/', FleetAnalyticsAPIView.as_view(), name='fleet-analytics'),
+    # Endpoint for purchase order line item totals grouped by SKU and/or vendor
+    path('items/summary/', LineItemSummaryAPIView.as_view(), name='line-item-summary'),
+    # Endpoint for one SKU's line item totals per order date bucket
+    path('items/trend/', LineItemTrendAPIView.as_view(), name='line-item-trend'),
+    # Endpoint for the feed of purchase order and vendor changes after a cursor
+    path('changes/', ChangeFeedAPIView.as_view(), name='change-feed'),
+    # Endpoint for per-route request timing percentiles (admin only)
+    path('stats/requests/', RequestStatsAPIView.as_view(), name='request-stats'),
 ]
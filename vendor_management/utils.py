@@ -1,5 +1,8 @@
 from django.db import models
 from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+import json
+from math import isclose
 from django.utils import timezone
 
 # Function to calculate the on-time delivery rate for a vendor
@@ -54,3 +57,158 @@ def calculate_fulfillment_rate(vendor):
     # Calculate the fulfillment rate as a percentage
     fulfillment_rate = (successfully_fulfilled_pos.count() / total_pos) * 100
     return round(fulfillment_rate, 2)  # Round the result to two decimal places
+
+# Purchase order fields that feed the vendor performance metrics
+METRIC_STATE_FIELDS = ('vendor_id', 'status', 'delivery_date', 'quality_rating', 'issue_date', 'acknowledgment_date')
+
+# Running totals the vendor performance metrics are derived from
+METRIC_TOTAL_FIELDS = ('total_pos', 'completed_pos', 'on_time_pos', 'rated_pos', 'quality_rating_sum', 'acknowledged_pos', 'response_time_sum')
+
+# Performance metric fields stored on Vendor and VendorPerformanceMetrics
+VENDOR_METRIC_FIELDS = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+
+# Function to build the aggregate expressions for a vendor's metric totals (usable with aggregate() or annotate())
+def metric_totals_expressions(now=None):
+    now = now or timezone.now()
+    completed = models.Q(status='completed')
+    rated = completed & models.Q(quality_rating__isnull=False)
+    acknowledged = completed & models.Q(acknowledgment_date__isnull=False)
+    response_time = models.ExpressionWrapper(models.F('acknowledgment_date') - models.F('issue_date'), output_field=models.DurationField())
+    return {
+        'total_pos': models.Count('id'),
+        'completed_pos': models.Count('id', filter=completed),
+        'on_time_pos': models.Count('id', filter=completed & models.Q(delivery_date__lte=now)),
+        'rated_pos': models.Count('id', filter=rated),
+        'quality_rating_sum': models.Sum('quality_rating', filter=rated),
+        'acknowledged_pos': models.Count('id', filter=acknowledged),
+        'response_time_sum': models.Sum(response_time, filter=acknowledged),
+    }
+
+# Function to replace the NULLs returned by empty aggregates with zero totals
+def normalize_metric_totals(totals):
+    return {
+        field: totals.get(field) or (timedelta() if field == 'response_time_sum' else 0)
+        for field in METRIC_TOTAL_FIELDS
+    }
+
+# Function to add two sets of metric totals (or contributions) field by field
+def add_metric_totals(totals, other):
+    return {field: totals[field] + other[field] for field in METRIC_TOTAL_FIELDS}
+
+# Function to compare two sets of metric totals, allowing for float sums added up in a different order
+def metric_totals_match(stored, expected):
+    return all(
+        isclose(stored[field], expected[field], rel_tol=1e-9, abs_tol=1e-9) if field == 'quality_rating_sum' else stored[field] == expected[field]
+        for field in METRIC_TOTAL_FIELDS
+    )
+
+# Function to derive the four vendor performance metrics from metric totals, rounded like the calculate_* helpers
+def metrics_from_totals(totals):
+    completed_pos = totals['completed_pos']
+    rated_pos = totals['rated_pos']
+    acknowledged_pos = totals['acknowledged_pos']
+    total_pos = totals['total_pos']
+    return {
+        'on_time_delivery_rate': round((totals['on_time_pos'] / completed_pos) * 100, 2) if completed_pos > 0 else 0,
+        'quality_rating_avg': round(totals['quality_rating_sum'] / rated_pos, 2) if rated_pos > 0 else 0,
+        'average_response_time': round(totals['response_time_sum'].total_seconds() / 3600 / acknowledged_pos, 2) if acknowledged_pos > 0 else 0,
+        # Fulfilled purchase orders are the completed ones without a quality rating
+        'fulfillment_rate': round(((completed_pos - rated_pos) / total_pos) * 100, 2) if total_pos > 0 else 0,
+    }
+
+# Function to capture the metric-relevant field values of a purchase order, coerced to their Python types
+# (fields deferred on the instance are taken from stored, since reading them would query each one)
+def purchase_order_metric_state(purchase_order, stored=None):
+    opts = purchase_order._meta
+    deferred = purchase_order.get_deferred_fields() if stored is not None else set()
+    return {
+        name: stored[name] if name in deferred
+        else purchase_order.vendor_id if name == 'vendor_id'
+        else opts.get_field(name).to_python(getattr(purchase_order, name))
+        for name in METRIC_STATE_FIELDS
+    }
+
+# Function to compute what a single purchase order state contributes to its vendor's metric totals
+def metric_contribution(state, now=None):
+    contribution = normalize_metric_totals({'total_pos': 1})
+    if state['status'] != 'completed':
+        return contribution
+    now = now or timezone.now()
+    contribution['completed_pos'] = 1
+    if state['delivery_date'] is not None and state['delivery_date'] <= now:
+        contribution['on_time_pos'] = 1
+    if state['quality_rating'] is not None:
+        contribution['rated_pos'] = 1
+        contribution['quality_rating_sum'] = state['quality_rating']
+    if state['acknowledgment_date'] is not None:
+        contribution['acknowledged_pos'] = 1
+        contribution['response_time_sum'] = state['acknowledgment_date'] - state['issue_date']
+    return contribution
+
+# Function to calculate all four performance metrics for a vendor in a single aggregate query
+def calculate_vendor_metrics(vendor, now=None):
+    totals = vendor.purchaseorder_set.aggregate(**metric_totals_expressions(now))
+    return metrics_from_totals(normalize_metric_totals(totals))
+
+# Purchase order fields its line items are built from
+LINE_ITEM_SOURCE_FIELDS = ('vendor_id', 'order_date', 'items')
+
+# Longest SKU and largest unit price a line item can store
+LINE_ITEM_SKU_MAX_LENGTH = 255
+LINE_ITEM_MAX_PRICE = Decimal('9999999999.99')
+
+# Function to turn a unit price from the items JSON into a two-place Decimal, or None when it is missing or unusable
+def parse_line_item_price(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+    return price if price.is_finite() and 0 <= price <= LINE_ITEM_MAX_PRICE else None
+
+# Function to parse a purchase order's items JSON into (position, sku, quantity, price) lines
+# (entries are objects with a "sku" or "name", an optional integer "quantity" (default 1) and an optional "price"
+# or "unit_price", or bare SKU strings; entries without a usable SKU or quantity are skipped)
+def parse_line_items(items):
+    if not isinstance(items, list):
+        items = [items]
+    lines = []
+    for position, entry in enumerate(items):
+        if isinstance(entry, str):
+            entry = {'sku': entry}
+        if not isinstance(entry, dict):
+            continue
+        sku = entry.get('sku', entry.get('name'))
+        quantity = entry.get('quantity', 1)
+        if isinstance(sku, int) and not isinstance(sku, bool):
+            sku = str(sku)
+        if isinstance(quantity, str) and quantity.strip().isdigit():
+            quantity = int(quantity)
+        if not isinstance(sku, str) or not sku.strip() or len(sku.strip()) > LINE_ITEM_SKU_MAX_LENGTH:
+            continue
+        if isinstance(quantity, bool) or not isinstance(quantity, int):
+            continue
+        lines.append((position, sku.strip(), quantity, parse_line_item_price(entry.get('price', entry.get('unit_price')))))
+    return lines
+
+# Function to capture what a purchase order's line items are built from: its vendor, order date and items JSON.
+# The items are kept serialized rather than parsed into lines: that is cheap enough for every loaded purchase order,
+# and edits made to the loaded list in place still show up as a change
+def line_item_state(purchase_order):
+    return {
+        'vendor_id': purchase_order.vendor_id,
+        'order_date': purchase_order._meta.get_field('order_date').to_python(purchase_order.order_date),
+        'items': json.dumps(purchase_order.items, cls=purchase_order._meta.get_field('items').encoder),
+    }
+
+# Function to split an iterable into lists of at most size items
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
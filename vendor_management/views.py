@@ -1,89 +1,227 @@
-from django.db.models import F, ExpressionWrapper, fields
-from rest_framework.permissions import IsAuthenticated
+import codecs
+import csv
+import json
+import time
+from django.db.models import F, ExpressionWrapper, Max, Min, Sum, fields
+from django.db.models.functions import Trunc
+from django.http import StreamingHttpResponse
+from datetime import timedelta
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.db.models.functions import Coalesce
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from django.dispatch import receiver
 from django.utils import timezone
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from .serializers import *
 from .models import *
 from .utils import *
+from .metrics import *
+from .caching import *
+from .metrics_queue import *
+from .middleware import route_timing_stats
+from .routers import primary_reads
+from .filters import filter_line_items, filter_purchase_orders
+from .fieldsets import SparseFieldsetMixin, pick_fields, requested_fields
+from .exports import EXPORT_OUTPUTS, PURCHASE_ORDER_EXPORT_COLUMNS, VENDOR_EXPORT_COLUMNS, stream_export
+from .pagination import IdCursorPagination
+from .changes import change_log_bounds, read_changes, record_changes
+from .analytics import fleet_report
+from .line_items import create_line_items, line_item_totals, line_item_trend
+from .sqlite import run_with_lock_retry
+from .signals import purchase_order_metrics_changed
 
 
 def calculate_performance_metrics(vendor):
-    # Perform calculations to calculate performance metrics
-    # For example:
-    on_time_delivery_rate = calculate_on_time_delivery_rate(vendor)
-    quality_rating_avg = calculate_quality_rating_avg(vendor)
-    average_response_time = calculate_average_response_time(vendor)
-    fulfillment_rate = calculate_fulfillment_rate(vendor)
-
-    # Return the calculated performance metrics as a dictionary
-    return {
-        'on_time_delivery_rate': on_time_delivery_rate,
-        'quality_rating_avg': quality_rating_avg,
-        'average_response_time': average_response_time,
-        'fulfillment_rate': fulfillment_rate,
-    }
+    # All four metrics come from one conditional aggregate query over the vendor's purchase orders
+    return calculate_vendor_metrics(vendor)
 
-# Signal handler to update performance metrics when a PurchaseOrder is saved
-@receiver(post_save, sender=PurchaseOrder)
-def update_performance_metrics(sender, instance, **kwargs):
-    if instance.status == 'completed' and instance.acknowledgment_date:
-        vendor = instance.vendor
-        with transaction.atomic():
-            try:
-                # Calculate average response time
-                completed_pos_with_acknowledgment = vendor.purchaseorder_set.filter(
-                    status='completed', acknowledgment_date__isnull=False
-                )
-                response_times = []
-                for po in completed_pos_with_acknowledgment:
-                    response_time = (po.acknowledgment_date - po.issue_date).total_seconds() / 3600
-                    response_times.append(response_time)
-                
-                if response_times:
-                    avg_response_time = sum(response_times) / len(response_times)
-                else:
-                    avg_response_time = 0
-                
-                vendor.average_response_time = avg_response_time
-                vendor.save()
-            except Exception as e:
-                print(f"Error updating performance metrics: {e}")
+# Function to bring the vendor metrics up to date with purchase order changes given as (previous, current) states,
+# inside the transaction that wrote them
+def update_metrics_for_changes(changes):
+    vendor_ids = {state['vendor_id'] for change in changes for state in change if state is not None}
+    if metrics_queue_enabled():
+        # Leave the recomputation to the queue workers; repeated saves coalesce per vendor
+        enqueue_vendor_metrics(vendor_ids)
+        return
+    invalidate_vendor_performance(*vendor_ids)
+    # Apply only the change in the POs' contributions to the vendors' running totals. Errors propagate, so a
+    # failed update rolls back the purchase order writes with it instead of leaving the totals behind
+    record_purchase_order_changes(changes)
+
+# Signal handler to update performance metrics when a PurchaseOrder save or delete changed its metric fields
+@receiver(purchase_order_metrics_changed, sender=PurchaseOrder)
+def update_performance_metrics(sender, change, **kwargs):
+    # Deleting the vendor cascades to its aggregates as well, so there is nothing to maintain
+    origin = change.origin
+    if change.current is None and (isinstance(origin, Vendor) or getattr(origin, 'model', None) is Vendor):
+        return
+    update_metrics_for_changes([(change.previous, change.current)])
+
+# Signal handler to drop the cached performance result of a deleted Vendor
+@receiver(post_delete, sender=Vendor)
+def invalidate_deleted_vendor_performance(sender, instance, **kwargs):
+    invalidate_vendor_performance(instance.pk)
+
+# View to report the depth, lag and processing time of the vendor metrics queue
+class VendorMetricsQueueStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(vendor_metrics_queue_stats())
+
+# View to report per-route request timing percentiles recorded by RequestTimingMiddleware
+class RequestStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(route_timing_stats())
 
 # View to retrieve performance metrics for a specific vendor
 class VendorPerformanceMetricsAPIView(generics.RetrieveAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorPerformanceMetricsSerializer
 
+    # Fields of the ?window= response, which has no serializer
+    window_fields = ['vendor', 'window', 'date', 'total_pos', *VENDOR_METRIC_FIELDS]
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        # The full result is computed and cached either way; ?fields= / ?exclude= only trim what is returned
+        if 'window' in request.query_params:
+            fields = requested_fields(request.query_params, self.window_fields)
+            return self.retrieve_window(request, kwargs['pk'], request.query_params['window'], fields)
+        fields = requested_fields(request.query_params, list(self.get_serializer().fields))
 
-        # Calculate performance metrics here
-        # Assuming you have a function to calculate the performance metrics
-        performance_metrics = calculate_performance_metrics(instance)
+        # Serve the cached result until a purchase order of this vendor changes
+        data = get_cached_performance(kwargs['pk'])
+        if data is not None:
+            return Response(pick_fields(data, fields))
 
-        # Create or update VendorPerformanceMetrics record
-        try:
-            performance_history = VendorPerformanceMetrics.objects.create(
-                vendor=instance,
-                date=timezone.now(),  # You may need to adjust this based on your requirements
-                on_time_delivery_rate=performance_metrics['on_time_delivery_rate'],
-                quality_rating_avg=performance_metrics['quality_rating_avg'],
-                average_response_time=performance_metrics['average_response_time'],
-                fulfillment_rate=performance_metrics['fulfillment_rate']
-            )
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # The result is cached and snapshotted, so it is computed from the primary, never from a lagging replica
+        with primary_reads():
+            instance = self.get_object()
+            performance_metrics = calculate_performance_metrics(instance)
+
+            # Record a VendorPerformanceMetrics snapshot only when the values changed or the minimum interval passed
+            try:
+                performance_history = record_performance_snapshot(instance, performance_metrics)
+            except Exception as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Serialize and return the performance data
-        serializer = self.get_serializer(performance_history)
-        return Response(serializer.data)
+        # Serialize, cache and return the performance data
+        data = dict(self.get_serializer(performance_history).data)
+        set_cached_performance(instance.pk, data)
+        return Response(pick_fields(data, fields))
+
+    # Metrics over the purchase orders issued in the last `window` days, summed from the vendor's daily buckets
+    def retrieve_window(self, request, pk, window, fields=None):
+        windows = getattr(settings, 'VENDOR_PERFORMANCE_WINDOWS', (30, 90, 365))
+        if not window.isdigit() or int(window) not in windows:
+            return Response({'error': f"window must be one of: {', '.join(map(str, windows))}."}, status=status.HTTP_400_BAD_REQUEST)
+        window = int(window)
+        data = get_cached_performance(pk, window)
+        if data is not None:
+            return Response(pick_fields(data, fields))
+
+        now = timezone.now()
+        with primary_reads():
+            instance = self.get_object()
+            totals = calculate_window_totals(instance.pk, window, now)
+        data = {
+            'vendor': instance.pk,
+            'window': window,
+            'date': now,
+            'total_pos': totals['total_pos'],
+            **metrics_from_totals(totals),
+        }
+        set_cached_performance(instance.pk, data, window)
+        return Response(pick_fields(data, fields))
+
+# View to report the hit/miss counters of the vendor performance cache
+class VendorPerformanceCacheStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(performance_cache_stats())
+
+# View to rank the top vendors by a performance metric, served from cache for VENDOR_LEADERBOARD_CACHE_TIMEOUT seconds
+class VendorLeaderboardAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = VendorLeaderboardQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        metric, limit, min_pos = (params.validated_data[key] for key in ('metric', 'limit', 'min_pos'))
+        data = get_cached_leaderboard(metric, limit, min_pos)
+        if data is None:
+            with primary_reads():
+                results = vendor_leaderboard(metric, limit, min_pos)
+            data = {
+                'metric': metric,
+                'min_pos': min_pos,
+                'generated_at': timezone.now(),
+                'results': results,
+            }
+            set_cached_leaderboard(metric, limit, min_pos, data)
+        return Response(data, status=status.HTTP_200_OK)
+
+# View to stream a vendor's performance history downsampled into time buckets
+class VendorPerformanceHistoryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    # Buckets are folded into the "last" values in chunks of this many
+    chunk_size = 500
+
+    def get(self, request, pk):
+        vendor = get_object_or_404(Vendor, pk=pk)
+        params = VendorPerformanceHistoryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bucket = params.validated_data['bucket']
+        end = params.validated_data.get('to') or timezone.now()
+        start = params.validated_data.get('from') or end - timedelta(days=30)
+
+        snapshots = VendorPerformanceMetrics.objects.filter(vendor=vendor, date__gte=start, date__lt=end)
+        # min/avg/max per metric and the time of the last snapshot are computed per bucket by the database
+        aggregates = {}
+        for field in VENDOR_METRIC_FIELDS:
+            aggregates[f'{field}_min'] = Min(field)
+            # Compacted summary rows weigh as many samples as they replaced
+            aggregates[f'{field}_avg'] = Sum(F(field) * F('sample_count')) / Sum('sample_count')
+            aggregates[f'{field}_max'] = Max(field)
+        buckets = (
+            snapshots.annotate(bucket=Trunc('date', bucket))
+            .order_by()
+            .values('bucket')
+            .annotate(samples=Sum('sample_count'), last_date=Max('date'), **aggregates)
+            .order_by('bucket')
+        )
+
+        columns = ['bucket', 'samples']
+        for field in VENDOR_METRIC_FIELDS:
+            columns.extend(f'{field}_{stat}' for stat in ('min', 'avg', 'max', 'last'))
+        header = {'vendor': vendor.pk, 'bucket': bucket, 'from': start.isoformat(), 'to': end.isoformat(), 'columns': columns}
+
+        def stream():
+            yield json.dumps(header)[:-1] + ', "series": ['
+            first = True
+            for chunk in chunked(buckets.iterator(chunk_size=self.chunk_size), self.chunk_size):
+                # The "last" values come from the latest snapshot of each bucket, fetched once per chunk
+                last = {
+                    row['date']: row
+                    for row in snapshots.filter(date__in=[row['last_date'] for row in chunk]).values('date', *VENDOR_METRIC_FIELDS)
+                }
+                for row in chunk:
+                    values = [row['bucket'].isoformat(), row['samples']]
+                    for field in VENDOR_METRIC_FIELDS:
+                        values.extend([row[f'{field}_min'], round(row[f'{field}_avg'], 4), row[f'{field}_max'], last[row['last_date']][field]])
+                    yield ('' if first else ',') + json.dumps(values)
+                    first = False
+            yield ']}'
+
+        return StreamingHttpResponse(stream(), content_type='application/json')
 
 # View to acknowledge a purchase order
 class AcknowledgePurchaseOrderAPIView(APIView):
@@ -96,14 +234,316 @@ class AcknowledgePurchaseOrderAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+# View to acknowledge many purchase orders with one UPDATE, applying their metric deltas in the same transaction
+class BatchAcknowledgePurchaseOrderAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PurchaseOrderBatchAcknowledgeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        key = 'id' if 'ids' in serializer.validated_data else 'po_number'
+        requested = list(dict.fromkeys(serializer.validated_data['ids' if key == 'id' else 'po_numbers']))
+
+        now = timezone.now()
+
+        def acknowledge():
+            with transaction.atomic():
+                found = {
+                    row[key]: row
+                    for row in PurchaseOrder.objects.select_for_update()
+                    .filter(**{f'{key}__in': requested})
+                    .values('id', 'po_number', *METRIC_STATE_FIELDS)
+                }
+                pending = [row for row in found.values() if row['acknowledgment_date'] is None]
+                # Already acknowledged orders keep their original date, so response times are not rewritten
+                PurchaseOrder.objects.filter(id__in=[row['id'] for row in pending], acknowledgment_date__isnull=True).update(acknowledgment_date=now)
+                record_changes('purchase_order', [row['id'] for row in pending], 'update', now)
+                # update() sends no signals, so each row's change is applied here, from the state it was locked in
+                update_metrics_for_changes([
+                    ({name: row[name] for name in METRIC_STATE_FIELDS}, {**{name: row[name] for name in METRIC_STATE_FIELDS}, 'acknowledgment_date': now})
+                    for row in pending
+                ])
+            return found, {row['id'] for row in pending}
+
+        found, pending = run_with_lock_retry(acknowledge)
+
+        results = []
+        for value in requested:
+            row = found.get(value)
+            if row is None:
+                outcome = 'not_found'
+            elif row['id'] in pending:
+                outcome = 'acknowledged'
+            else:
+                outcome = 'already_acknowledged'
+            results.append({key: value, 'status': outcome})
+
+        return Response({
+            'acknowledgment_date': now,
+            'acknowledged': len(pending),
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+
+# Function to parse one NDJSON line or CSV items cell, turning malformed JSON into a per-row error
+def parse_ingest_json(text):
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+# Function to yield the rows of a bulk ingest body (JSON array, NDJSON or CSV); malformed rows are yielded as ValueError
+def iter_ingest_rows(request):
+    content_type = request.content_type.split(';')[0].strip().lower()
+    stream = request.stream
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        for line in stream or ():
+            line = line.strip()
+            if line:
+                yield parse_ingest_json(line)
+    elif content_type == 'text/csv':
+        for row in csv.DictReader(codecs.iterdecode(stream or (), 'utf-8')):
+            # Empty cells mean "not provided"; items is a JSON document inside its cell
+            row = {key: value for key, value in row.items() if value not in ('', None)}
+            if 'items' in row:
+                row['items'] = parse_ingest_json(row['items'])
+                if isinstance(row['items'], ValueError):
+                    row = row['items']
+            yield row
+    elif content_type == 'application/json':
+        rows = json.load(stream) if stream is not None else []
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of purchase orders.")
+        yield from rows
+    else:
+        raise ValueError(f"Unsupported content type '{content_type}'. Use application/json, application/x-ndjson or text/csv.")
 
-# Generic views for Vendor and PurchaseOrder CRUD operations
-class VendorListCreateAPIView(generics.ListCreateAPIView):
+# View to create many purchase orders in one request, applying their metric deltas batch by batch
+class PurchaseOrderBulkIngestAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_batch_size = 1000
+    max_batch_size = 5000
+
+    def post(self, request):
+        started = time.perf_counter()
+        try:
+            batch_size = int(request.query_params.get('batch_size', self.default_batch_size))
+        except ValueError:
+            return Response({'error': "batch_size must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        batch_size = min(max(batch_size, 1), self.max_batch_size)
+
+        self.errors = []
+        self.created = 0
+        self.seen_po_numbers = set()
+        rows = 0
+        batch = []
+        try:
+            for rows, row in enumerate(iter_ingest_rows(request), start=1):
+                batch.append((rows, row))
+                if len(batch) >= batch_size:
+                    self.ingest_batch(batch)
+                    batch = []
+            if batch:
+                self.ingest_batch(batch)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        elapsed = time.perf_counter() - started
+        return Response({
+            'rows': rows,
+            'created': self.created,
+            'failed': len(self.errors),
+            'errors': self.errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed else None,
+        }, status=status.HTTP_200_OK)
+
+    def ingest_batch(self, batch):
+        # Preload vendors and existing po_numbers so row validation runs without queries
+        vendor_keys = set()
+        po_numbers = set()
+        for row_number, row in batch:
+            if isinstance(row, dict):
+                if str(row.get('vendor', '')).isdigit():
+                    vendor_keys.add(int(row['vendor']))
+                if row.get('po_number') is not None:
+                    po_numbers.add(str(row['po_number']))
+        vendors = Vendor.objects.in_bulk(vendor_keys)
+        existing = set(PurchaseOrder.objects.filter(po_number__in=po_numbers).values_list('po_number', flat=True))
+
+        pending = []
+        for row_number, row in batch:
+            if isinstance(row, ValueError):
+                self.errors.append({'row': row_number, 'errors': {'non_field_errors': [str(row)]}})
+                continue
+            if not isinstance(row, dict):
+                self.errors.append({'row': row_number, 'errors': {'non_field_errors': ["Expected an object."]}})
+                continue
+            serializer = PurchaseOrderIngestSerializer(data=row, context={'request': self.request, 'vendors': vendors})
+            if not serializer.is_valid():
+                self.errors.append({'row': row_number, 'errors': serializer.errors})
+                continue
+            po_number = serializer.validated_data['po_number']
+            if po_number in existing or po_number in self.seen_po_numbers:
+                self.errors.append({'row': row_number, 'errors': {'po_number': ["purchase order with this po number already exists."]}})
+                continue
+            self.seen_po_numbers.add(po_number)
+            pending.append((row_number, PurchaseOrder(**serializer.validated_data)))
+
+        def create():
+            with transaction.atomic():
+                purchase_orders = PurchaseOrder.objects.bulk_create([purchase_order for row_number, purchase_order in pending])
+                # bulk_create sends no signals, so the line items, change log entries and metric deltas are written here
+                create_line_items(purchase_orders)
+                record_changes('purchase_order', [purchase_order.pk for purchase_order in purchase_orders], 'create')
+                update_metrics_for_changes([(None, purchase_order_metric_state(purchase_order)) for purchase_order in purchase_orders])
+
+        try:
+            run_with_lock_retry(create)
+        except IntegrityError as e:
+            # A concurrent writer took one of the po_numbers; the whole batch was rolled back
+            self.errors.extend({'row': row_number, 'errors': {'non_field_errors': [str(e)]}} for row_number, purchase_order in pending)
+            return
+        self.created += len(pending)
+
+# View to report per-vendor metrics and fleet-wide distributions computed with NumPy over one columnar extract
+class FleetAnalyticsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    # Takes the purchase order list filters to narrow the report (e.g. to a date range)
+    def get(self, request):
+        # Filters are validated before the cache is consulted, so invalid ones never get a cache entry
+        queryset = filter_purchase_orders(PurchaseOrder.objects.all(), request.query_params)
+        # The report scans every matching purchase order, so it is served from cache for FLEET_REPORT_CACHE_TIMEOUT seconds
+        params = list(request.query_params.lists())
+        data = get_cached_fleet_report(params)
+        if data is None:
+            data = fleet_report(queryset)
+            set_cached_fleet_report(params, data)
+        return Response(data, status=status.HTTP_200_OK)
+
+# View to total the purchase order line items matching the filters by SKU, vendor or both, in one grouped query
+class LineItemSummaryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = LineItemSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = filter_line_items(PurchaseOrderItem.objects.all(), request.query_params)
+        return Response({
+            'group_by': params.validated_data['group_by'],
+            'results': line_item_totals(queryset, **params.validated_data),
+        }, status=status.HTTP_200_OK)
+
+# View to total one SKU's line items per order date bucket, optionally for one vendor and date range
+class LineItemTrendAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = LineItemTrendQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = filter_line_items(PurchaseOrderItem.objects.all(), request.query_params)
+        return Response({
+            'sku': params.validated_data['sku'],
+            'bucket': params.validated_data['bucket'],
+            'series': line_item_trend(queryset, params.validated_data['bucket']),
+        }, status=status.HTTP_200_OK)
+
+# View to page through the change log after a cursor, with the current state of each changed object
+class ChangeFeedAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    object_serializers = {
+        'purchase_order': (PurchaseOrder, PurchaseOrderSerializer),
+        'vendor': (Vendor, VendorSerializer),
+    }
+
+    def get(self, request):
+        params = ChangeFeedQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        pruned, latest = change_log_bounds()
+        since = params.validated_data.get('since', pruned)
+        if since < pruned:
+            # Changes after this cursor were removed by the retention policy; the consumer has to resync from the exports
+            return Response({
+                'error': "This cursor has expired. Re-download the full data and continue from 'latest'.",
+                'oldest_cursor': pruned,
+                'latest': latest,
+            }, status=status.HTTP_410_GONE)
+
+        entries, has_more = read_changes(since, params.validated_data['limit'], params.validated_data.get('type'))
+        # One query per object type for the current state of every object on the page (deleted objects have none)
+        data = {}
+        for object_type, (model, serializer_class) in self.object_serializers.items():
+            object_ids = {entry.object_id for entry in entries if entry.object_type == object_type}
+            objects = model.objects.in_bulk(object_ids) if object_ids else {}
+            data[object_type] = {pk: serializer_class(instance).data for pk, instance in objects.items()}
+
+        return Response({
+            'changes': [
+                {
+                    'cursor': entry.id,
+                    'type': entry.object_type,
+                    'id': entry.object_id,
+                    'action': entry.action,
+                    'changed_at': entry.changed_at,
+                    'data': data[entry.object_type].get(entry.object_id) if entry.action != 'delete' else None,
+                }
+                for entry in entries
+            ],
+            'next': entries[-1].id if entries else since,
+            'has_more': has_more,
+            'latest': latest,
+        }, status=status.HTTP_200_OK)
+
+# Base view streaming a queryset as CSV or NDJSON (?output=csv|ndjson), reading it from the database in chunks;
+# ?fields= / ?exclude= choose the columns, and only those are selected
+class ExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    queryset = None
+    columns = None
+    filename = None
+    chunk_size = 2000
+
+    # A fresh copy of the declared queryset for each request, as the DRF generic views build it
+    def get_queryset(self):
+        assert self.queryset is not None, f"'{self.__class__.__name__}' should include a `queryset` attribute."
+        return self.queryset.all()
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_OUTPUTS:
+            return Response({'error': f"output must be one of: {', '.join(EXPORT_OUTPUTS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        fields = requested_fields(request.query_params, [name for name, lookup in self.columns])
+        columns = self.columns if fields is None else [(name, lookup) for name, lookup in self.columns if name in fields]
+        # Built (and its filters validated) before the first byte is sent
+        queryset = self.get_queryset()
+        response = StreamingHttpResponse(stream_export(queryset, columns, output, self.chunk_size), content_type=EXPORT_OUTPUTS[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{output}"'
+        return response
+
+# View to export purchase orders, filtered like the purchase order list
+class PurchaseOrderExportAPIView(ExportAPIView):
+    queryset = PurchaseOrder.objects.all()
+    columns = PURCHASE_ORDER_EXPORT_COLUMNS
+    filename = 'purchase_orders'
+
+    def get_queryset(self):
+        return filter_purchase_orders(super().get_queryset(), self.request.query_params)
+
+# View to export vendors with their current performance metrics
+class VendorExportAPIView(ExportAPIView):
+    queryset = Vendor.objects.all()
+    columns = VENDOR_EXPORT_COLUMNS
+    filename = 'vendors'
+
+# Generic views for Vendor and PurchaseOrder CRUD operations; reads take ?fields= / ?exclude=
+class VendorListCreateAPIView(SparseFieldsetMixin, generics.ListCreateAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
 
-class VendorRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class VendorRetrieveUpdateDestroyAPIView(SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [IsAuthenticated]
@@ -111,15 +551,21 @@ class VendorRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     def partial_update(self, request, *args, **kwargs):
         return Response({"message": "PATCH method is not allowed. Use PUT for updates."}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-class PurchaseOrderListCreateAPIView(generics.ListCreateAPIView):
+class PurchaseOrderListCreateAPIView(SparseFieldsetMixin, generics.ListCreateAPIView):
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
+
+    # Filter by vendor, status and order/delivery date ranges (each backed by a composite index)
+    def get_queryset(self):
+        return filter_purchase_orders(super().get_queryset(), self.request.query_params)
+
     # Override the partial update method to disallow PATCH requests
     def partial_update(self, request, *args, **kwargs):
         return Response({"message": "PATCH method is not allowed. Use PUT for updates."}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-class PurchaseOrderRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class PurchaseOrderRetrieveUpdateDestroyAPIView(SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated]
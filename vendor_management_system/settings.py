@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,13 +47,17 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'vendor_management.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     )
 }
 
 MIDDLEWARE = [
+    # First, so its timings and query counts cover every other middleware
+    'vendor_management.middleware.RequestTimingMiddleware',
+    # Before anything that reads models, so those reads can be routed to a replica
+    'vendor_management.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,9 +95,126 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open across requests instead of reconnecting (and re-running the pragmas) every time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds a statement waits for a competing writer's lock before failing with "database is locked"
+            'timeout': 20,
+        },
+    },
+    # Local read replica: a copy of db.sqlite3 kept up to date by `manage.py sync_replica`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Reads of read-only API requests go to these DATABASES aliases (vendor_management/routers.py); writes and
+# everything outside requests use the primary
+DATABASE_ROUTERS = ['vendor_management.routers.ReadReplicaRouter']
+DATABASE_REPLICAS = ['replica']
+# A replica whose oldest unseen primary change is older than this (seconds) is skipped; lag is re-measured this often
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_LAG_CHECK_INTERVAL = 1
+# After writing, a client reads from the primary for this many seconds (cookie), so it sees its own writes
+REPLICA_PIN_COOKIE = 'replica_pin'
+REPLICA_PIN_SECONDS = 5
+
+# Pragmas run on every new SQLite connection (vendor_management/sqlite.py); a database can override them with its own
+# 'PRAGMAS' entry. WAL lets readers and a writer work at the same time; synchronous=NORMAL is durable across crashes
+# of the application in WAL mode and only risks the last transactions on power loss
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -65536,  # KiB, so 64 MiB of page cache per connection
+    'mmap_size': 268435456,  # 256 MiB of the file read through memory mapping
+    'temp_store': 'memory',
+}
+
+# Attempts and first backoff delay (seconds, doubled per attempt) of write transactions failing on SQLite lock contention
+DATABASE_LOCK_RETRY_ATTEMPTS = 5
+DATABASE_LOCK_RETRY_DELAY = 0.05
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Cache alias and lifetime (seconds) of the vendor performance results
+VENDOR_PERFORMANCE_CACHE_ALIAS = 'default'
+VENDOR_PERFORMANCE_CACHE_TIMEOUT = 300
+# Rolling windows (days) the performance endpoint accepts as ?window=
+VENDOR_PERFORMANCE_WINDOWS = (30, 90, 365)
+
+# Minimum seconds between two identical VendorPerformanceMetrics snapshots of a vendor
+VENDOR_PERFORMANCE_SNAPSHOT_INTERVAL = 3600
+
+# Seconds a vendor leaderboard is served from cache before it is ranked again
+VENDOR_LEADERBOARD_CACHE_TIMEOUT = 30
+
+# Seconds a fleet analytics report (per set of filters) is served from cache before it is computed again
+FLEET_REPORT_CACHE_TIMEOUT = 60
+
+# 'sync' applies metric changes inside the request; 'queue' marks the vendor dirty for process_metrics_queue workers
+VENDOR_METRICS_UPDATE_MODE = 'sync'
+# Seconds after which a claimed but unfinished queue entry is handed to another worker
+VENDOR_METRICS_QUEUE_CLAIM_TIMEOUT = 300
+
+# Days of raw snapshots and of daily summaries kept by compact_performance_history (older data becomes monthly)
+VENDOR_PERFORMANCE_RAW_RETENTION_DAYS = 30
+VENDOR_PERFORMANCE_DAILY_RETENTION_DAYS = 365
+
+# Days of purchase order and vendor changes kept for the change feed; older cursors get 410 Gone
+CHANGE_LOG_RETENTION_DAYS = 7
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.0/topics/logging/
+
+# One JSON line per request (queries, DB/render/total time) from RequestTimingMiddleware; quiet under `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'vendor_management.requests': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Requests per route kept in memory for the percentiles of the request stats endpoint
+REQUEST_TIMING_SAMPLES = 1000
+
+# Token authentication cache: seconds an authenticated token is trusted without a database lookup,
+# tokens kept in each process's LRU, and an optional cache alias shared by all processes (None = in-process only;
+# other processes then accept a revoked token until their copy expires, so set it when running several processes)
+TOKEN_AUTH_CACHE_TIMEOUT = 60
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_SHARED_CACHE_ALIAS = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators